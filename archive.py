@@ -0,0 +1,259 @@
+"""
+Archivo local de scripts, direccionado por contenido.
+
+Reemplaza las copias scraped_scripts/<título>.lua (dos títulos iguales se
+pisaban y los errores de escritura se tragaban en silencio):
+
+- objects/ab/<sha256>.z: el código (UTF-8) comprimido con zlib, uno por
+  contenido distinto. El mismo script visto en dos fuentes ocupa una vez y
+  escribir nunca pisa otra cosa; la escritura es atómica (tmp + rename).
+  writer() arma el objeto en streaming (sha256 y zlib incrementales) para
+  usarlo como sink de fetch_raw_code, sin otra copia del código entero.
+- index.db (SQLite): (fuente, id) -> título, juego, fecha y hash, con
+  índices por hash y por juego para el dedup y las herramientas de backfill.
+
+    python archive.py                      # resumen
+    python archive.py rscripts <id>        # imprime el código de un item
+"""
+
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "scraped_scripts")
+COMPRESS_LEVEL = 6
+
+_FIELDS = ("source", "item_id", "title", "game", "hash", "ts")
+
+
+def content_hash(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+class ObjectWriter:
+    """
+    Objeto en construcción: write() recibe el código en pedazos (UTF-8) y
+    los va hasheando y comprimiendo a un tmp. Un error de disco no corta la
+    descarga: queda en `error` y put() lo reporta.
+    """
+
+    def __init__(self, root: str):
+        self._root = root
+        self._sha = hashlib.sha256()
+        self._zip = zlib.compressobj(COMPRESS_LEVEL)
+        self.size = 0
+        self.stored = 0
+        self.error = None
+        self._tmp = os.path.join(root, "objects", f"incoming.{threading.get_ident()}.{id(self)}.tmp")
+        try:
+            self._file = open(self._tmp, "wb")
+        except OSError as e:
+            self._file, self.error = None, e
+
+    def write(self, data: bytes):
+        if self.error is not None:
+            return
+        self._sha.update(data)
+        self.size += len(data)
+        try:
+            packed = self._zip.compress(data)
+            self._file.write(packed)
+            self.stored += len(packed)
+        except OSError as e:
+            self.error = e
+
+    def finish(self, path_of):
+        """Cierra el objeto y lo mueve a su lugar. Retorna (hash, bytes guardados o None si ya estaba)."""
+        digest = self._sha.hexdigest()
+        if self.error is None:
+            try:
+                packed = self._zip.flush()
+                self._file.write(packed)
+                self.stored += len(packed)
+                self._file.close()
+                path = path_of(digest)
+                if os.path.exists(path):
+                    os.remove(self._tmp)
+                    return digest, None
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(self._tmp, path)
+                return digest, self.stored
+            except OSError as e:
+                self.error = e
+        self.abort()
+        raise self.error
+
+    def abort(self):
+        if self._file is not None:
+            self._file.close()
+        try:
+            os.remove(self._tmp)
+        except OSError:
+            pass
+
+
+class ScriptArchive:
+    def __init__(self, root: str = ARCHIVE_DIR):
+        self.root = root
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, "index.db"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                source TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                title TEXT,
+                game TEXT,
+                hash TEXT NOT NULL,
+                ts INTEGER,
+                PRIMARY KEY (source, item_id)
+            );
+            CREATE INDEX IF NOT EXISTS entries_hash ON entries (hash);
+            CREATE INDEX IF NOT EXISTS entries_game ON entries (game);
+            CREATE TABLE IF NOT EXISTS objects (
+                hash TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                stored INTEGER NOT NULL
+            );
+            """
+        )
+        self._db.commit()
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], f"{digest[2:]}.z")
+
+    def _write_object(self, digest: str, data: bytes) -> int | None:
+        """Escribe el objeto si no existe. Retorna los bytes guardados (None si ya estaba)."""
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            return None
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        packed = zlib.compress(data, COMPRESS_LEVEL)
+        # tmp único por thread: dos workers pueden guardar el mismo contenido a la vez
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(packed)
+        os.replace(tmp, path)
+        return len(packed)
+
+    def writer(self) -> ObjectWriter:
+        """Objeto nuevo escrito en streaming; se cierra con put(..., writer=w) o w.abort()."""
+        return ObjectWriter(self.root)
+
+    def put(self, code: str, source: str, item_id, title: str, game: str | None = None,
+            writer: ObjectWriter | None = None):
+        """
+        Archiva el código y lo indexa bajo (source, item_id). Si se pasa un
+        writer que ya recibió el código (sink de fetch_raw_code) se usa ese
+        objeto en vez de volver a codificarlo y comprimirlo. Retorna el hash,
+        o None si falló.
+        """
+        if writer is not None and not writer.size:
+            # El fetch no escribió en el sink: archivar desde el string
+            writer.abort()
+            writer = None
+        try:
+            if writer is not None:
+                size = writer.size
+                digest, stored = writer.finish(self._object_path)
+            else:
+                data = code.encode("utf-8")
+                size, digest = len(data), content_hash(code)
+                stored = self._write_object(digest, data)
+        except OSError as e:
+            print(f"Warning: Could not archive '{title[:60]}': {e}")
+            return None
+        with self._lock, self._db:
+            if stored is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO objects VALUES (?, ?, ?)", (digest, size, stored)
+                )
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (source, str(item_id), title, game, digest, int(time.time())),
+            )
+        return digest
+
+    def set_game(self, source: str, item_id, game: str):
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE entries SET game = ? WHERE source = ? AND item_id = ?",
+                (game, source, str(item_id)),
+            )
+
+    # ── lectura ──
+    def get(self, digest: str) -> str | None:
+        try:
+            with open(self._object_path(digest), "rb") as f:
+                return zlib.decompress(f.read()).decode("utf-8")
+        except FileNotFoundError:
+            return None
+
+    def lookup(self, source: str, item_id) -> dict | None:
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(_FIELDS)} FROM entries WHERE source = ? AND item_id = ?",
+                (source, str(item_id)),
+            ).fetchone()
+        return dict(zip(_FIELDS, row)) if row else None
+
+    def by_hash(self, digest: str) -> list:
+        """Todos los items (de cualquier fuente) con este contenido."""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(_FIELDS)} FROM entries WHERE hash = ? ORDER BY ts", (digest,)
+            ).fetchall()
+        return [dict(zip(_FIELDS, r)) for r in rows]
+
+    def by_game(self, game: str) -> list:
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(_FIELDS)} FROM entries WHERE game = ? ORDER BY ts", (game,)
+            ).fetchall()
+        return [dict(zip(_FIELDS, r)) for r in rows]
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            objects, raw, stored = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored), 0) FROM objects"
+            ).fetchone()
+        return {"entries": entries, "objects": objects, "raw_bytes": raw, "stored_bytes": stored}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_archive() -> ScriptArchive:
+    global _archive
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                _archive = ScriptArchive()
+    return _archive
+
+
+if __name__ == "__main__":
+    archive = get_archive()
+    if len(sys.argv) == 3:
+        entry = archive.lookup(sys.argv[1], sys.argv[2])
+        if entry is None:
+            sys.exit(f"[ARCHIVE] {sys.argv[1]}/{sys.argv[2]} no está archivado")
+        print(archive.get(entry["hash"]))
+    else:
+        st = archive.stats()
+        ratio = st["stored_bytes"] / st["raw_bytes"] if st["raw_bytes"] else 0
+        print(f"[ARCHIVE] {st['entries']} items | {st['objects']} objetos | "
+              f"{st['raw_bytes']} -> {st['stored_bytes']} bytes ({ratio:.0%})")
+    archive.close()
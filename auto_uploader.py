@@ -1,10 +1,27 @@
+import functools
+import hashlib
+import json
 import os
 import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 import requests
 
+import dedup
+import game_matcher
+import http_client
+import metrics
+import resolution_cache
+from game_matcher import FuzzyMatcher
+
 CATEGORY_API = "https://uploadcategory-4v2s5sfrtq-uc.a.run.app"
 SCRIPT_API = "https://uploadscript-4v2s5sfrtq-uc.a.run.app"
+OPENAI_API_URL = os.getenv("OPENAI_API_URL", "https://api.openai.com/v1/chat/completions")
+
+# Títulos por request en la identificación batch de juegos (resolve_games_batch)
+AI_BATCH_SIZE = int(os.getenv("AI_BATCH_SIZE", "20"))
 
 # Términos prohibidos en título/descripción (regex, case-insensitive).
 # Motivo: contenido amigable para anunciantes / mejor CPM.
@@ -78,27 +95,72 @@ FORBIDDEN_WORDS = [
 ]
 
 
+def _trigger_literal(pattern: str) -> str:
+    """
+    Literal obligatorio al inicio del patrón ('\\bsilent\\s+aim' -> 'silent').
+    Si el título no lo contiene, el patrón no puede matchear y se salta su re.sub.
+    Los reemplazos solo insertan espacios, así que nunca crean un literal nuevo.
+    """
+    body = pattern[2:] if pattern.startswith(r"\b") else pattern
+    lit = ""
+    for ch in body:
+        if not (ch.isascii() and ch.isalnum()):
+            if ch in "?*{":
+                lit = lit[:-1]  # el último char es opcional: 'scripts?' -> 'script'
+            break
+        lit += ch
+    return lit
+
+
+# Compilados una sola vez. _ANY_FORBIDDEN recorre el título en una pasada:
+# si no matchea nada, ningún re.sub puede cambiarlo y se saltan todos.
+_FORBIDDEN_RES = [
+    (re.compile(p, re.IGNORECASE), _trigger_literal(p)) for p in FORBIDDEN_PATTERNS
+]
+_ANY_FORBIDDEN = re.compile(
+    "|".join(f"(?:{p})" for p in FORBIDDEN_PATTERNS), re.IGNORECASE
+)
+_EMPTY_BRACKETS_RE = re.compile(r"[\(\[\{]\s*[\)\]\}]")
+_SPACE_BEFORE_SEP_RE = re.compile(r"\s+([,;|])")
+_REPEATED_SEP_RE = re.compile(r"([,;|/\\\-]\s*){2,}")
+_WHITESPACE_RE = re.compile(r"\s+")
+_EDGE_SEP_RE = re.compile(r"^[\s\-|:•·,.;/\\\(\[\{]+|[\s\-|:•·,.;/\\\)\]\}]+$")
+
+
+@functools.lru_cache(maxsize=8192)
 def sanitize_title(title: str) -> str:
-    """Remueve términos prohibidos y limpia separadores residuales."""
+    """Remueve términos prohibidos y limpia separadores residuales (memoizado)."""
     if not title:
         return title
     cleaned = title
-    for pat in FORBIDDEN_PATTERNS:
-        cleaned = re.sub(pat, " ", cleaned, flags=re.IGNORECASE)
+    if _ANY_FORBIDDEN.search(cleaned):
+        # re.IGNORECASE matchea 'ı' (dotless) e 'İ' con 'i', pero casefold()
+        # deja la 'ı' igual y convierte la 'İ' en 'i' + punto combinante
+        folded = cleaned.casefold().replace("ı", "i").replace("i\u0307", "i")
+        # El orden importa: cada patrón ve el resultado del anterior
+        for rx, lit in _FORBIDDEN_RES:
+            if lit and lit not in folded:
+                continue
+            cleaned = rx.sub(" ", cleaned)
     # Brackets/paréntesis con solo whitespace dentro: "[ ]", "(  )"
-    cleaned = re.sub(r"[\(\[\{]\s*[\)\]\}]", " ", cleaned)
+    cleaned = _EMPTY_BRACKETS_RE.sub(" ", cleaned)
     # "word , word" → "word, word" (whitespace antes del separador)
-    cleaned = re.sub(r"\s+([,;|])", r"\1", cleaned)
+    cleaned = _SPACE_BEFORE_SEP_RE.sub(r"\1", cleaned)
     # Colapsar separadores repetidos (",,", " - - ", "| |", etc.)
-    cleaned = re.sub(r"([,;|/\\\-]\s*){2,}", lambda m: m.group(0)[0] + " ", cleaned)
+    cleaned = _REPEATED_SEP_RE.sub(lambda m: m.group(0)[0] + " ", cleaned)
     # Whitespace múltiple → uno
-    cleaned = re.sub(r"\s+", " ", cleaned)
+    cleaned = _WHITESPACE_RE.sub(" ", cleaned)
     # Quitar separadores sueltos al inicio/fin
-    cleaned = re.sub(r"^[\s\-|:•·,.;/\\\(\[\{]+|[\s\-|:•·,.;/\\\)\]\}]+$", "", cleaned)
+    cleaned = _EDGE_SEP_RE.sub("", cleaned)
     cleaned = cleaned.strip()
     return cleaned or title
 
 
+def sanitize_titles(titles) -> list:
+    """Versión batch de sanitize_title (backfills). Comparte el mismo cache."""
+    return [sanitize_title(t) for t in titles]
+
+
 # Prompt que se envía al backend para que genere título y descripción
 # optimizados para CPM/SEO y libres de términos demonetizables.
 TITLE_DESCRIPTION_PROMPT = (
@@ -144,6 +206,15 @@ KNOWN_GAMES = {
     "king legacy": 3224257968,
 }
 
+# Siglas de uso común que el matcher difuso resuelve sin IA (sigla -> KNOWN_GAMES)
+GAME_ABBREVIATIONS = {
+    "bf": "blox fruits",
+    "mm2": "murder mystery 2",
+    "psx": "pet simulator x",
+    "ps99": "pet simulator 99",
+    "toh": "tower of hell",
+}
+
 
 def format_category_name(name: str) -> str:
     """
@@ -167,14 +238,134 @@ def format_category_name(name: str) -> str:
     return result
 
 
+_TOKEN_RE = re.compile(r"[^\W_]+")
+_ANNOTATION_RE = re.compile(r"[\(\[\{][^\)\]\}]*[\)\]\}]")
+# Tokens de fin de nombre dentro del trie (los tokens reales nunca son vacíos)
+_END = ""
+
+
+def _game_tokens(name: str) -> tuple:
+    """'Rivals [❄️freeze ray❄️]' -> ('rivals',). Sin anotaciones, emojis ni signos."""
+    return tuple(_TOKEN_RE.findall(_ANNOTATION_RE.sub(" ", name).lower()))
+
+
+class GameIndex:
+    """
+    Trie de tokens con todos los nombres de juegos conocidos.
+    find() recorre el título una vez y devuelve el match más largo (más
+    específico): 'pet simulator 99' gana sobre 'pet simulator'.
+    Los mismos nombres alimentan el matcher difuso (self.fuzzy, ver
+    game_matcher) para typos, siglas y variantes.
+    """
+
+    def __init__(self):
+        self._root = {}
+        self.size = 0
+        self.fuzzy = FuzzyMatcher()
+
+    def add(self, name: str, placeid: int, display: str | None = None) -> bool:
+        tokens = _game_tokens(name)
+        # Nombres de una sola palabra muy corta dan demasiados falsos positivos
+        if not tokens or (len(tokens) == 1 and len(tokens[0]) < 4):
+            return False
+        node = self._root
+        for tok in tokens:
+            node = node.setdefault(tok, {})
+        if _END not in node:
+            self.size += 1
+        node[_END] = (display or format_category_name(name), placeid)
+        self.fuzzy.add(tokens, node[_END][0], placeid)
+        return True
+
+    def find(self, text: str):
+        """Retorna (nombre_categoria, placeid) del match más largo o None."""
+        tokens = _TOKEN_RE.findall(text.lower())
+        best, best_len = None, 0
+        for i in range(len(tokens)):
+            node = self._root
+            j = i
+            while j < len(tokens):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+                if _END in node and j - i > best_len:
+                    best, best_len = node[_END], j - i
+        return best
+
+
+_GAME_INDEX = GameIndex()
+
+
+def build_game_index(known_categories: dict | None = None) -> GameIndex:
+    """
+    (Re)construye el índice desde las categorías persistidas en last_run.json
+    y KNOWN_GAMES. Las categorías se devuelven con su nombre tal cual está
+    persistido, para que ensure_category_exists las encuentre sin re-crearlas.
+    """
+    global _GAME_INDEX
+    index = GameIndex()
+    for name, placeid in (known_categories or {}).items():
+        if placeid:
+            index.add(name, placeid, display=name)
+    # KNOWN_GAMES (y sus alias) tienen prioridad sobre las categorías
+    for game_key, placeid in list(KNOWN_GAMES.items()):
+        index.add(game_key, placeid)
+    for abbr, game_key in GAME_ABBREVIATIONS.items():
+        index.fuzzy.add_abbreviation(abbr, _game_tokens(game_key))
+    _GAME_INDEX = index
+    return index
+
+
+def local_match(title: str):
+    """(nombre_categoria, placeid) sin salir a la red: índice exacto y después difuso."""
+    match = _GAME_INDEX.find(title)
+    if match:
+        return match
+    fuzzy = _GAME_INDEX.fuzzy.match(title)
+    return fuzzy[:2] if fuzzy else None
+
+
+def game_matcher_report(labelled: list | None = None) -> dict:
+    """
+    Precisión del matcher local sobre el set etiquetado (game_matcher): el
+    camino completo (exacto + difuso) y el difuso solo, sobre los títulos
+    que el índice exacto no reconoce.
+    """
+    labelled = game_matcher.load_labelled() if labelled is None else labelled
+    unmatched = [(t, p) for t, p in labelled if not _GAME_INDEX.find(t)]
+
+    def fuzzy_only(title):
+        found = _GAME_INDEX.fuzzy.match(title)
+        return found[:2] if found else None
+
+    return {
+        "threshold": game_matcher.FUZZY_THRESHOLD,
+        "local": game_matcher.evaluate(local_match, labelled),
+        "fuzzy": game_matcher.evaluate(fuzzy_only, unmatched),
+    }
+
+
+def register_game(name: str, placeid: int, display: str | None = None):
+    """Agrega un juego/alias resuelto en runtime a KNOWN_GAMES y al índice."""
+    KNOWN_GAMES[name.lower()] = placeid
+    _GAME_INDEX.add(name, placeid, display=display)
+
+
+build_game_index()
+
+
 def _ask_ai_game_name(title: str, openai_key: str) -> str | None:
     """
     Le pregunta a OpenAI cual es el juego de Roblox del script a partir del titulo.
-    Retorna el nombre del juego o None si no lo identifica.
+    Retorna el nombre del juego, None si no lo identifica o
+    resolution_cache.FAILED si el request falló (no es un negativo).
     """
     try:
-        resp = requests.post(
-            "https://api.openai.com/v1/chat/completions",
+        resp = http_client.post(
+            OPENAI_API_URL,
+            kind="openai",
+            retry_unsafe=True,  # repetir la pregunta no tiene efectos
             headers={
                 "Authorization": f"Bearer {openai_key}",
                 "Content-Type": "application/json",
@@ -199,18 +390,113 @@ def _ask_ai_game_name(title: str, openai_key: str) -> str | None:
                 "max_tokens": 20,
                 "temperature": 0,
             },
-            timeout=15,
         )
         if resp.status_code == 200:
             game_name = resp.json()["choices"][0]["message"]["content"].strip()
             if game_name.upper() != "UNKNOWN" and len(game_name) > 1:
                 print(f"  [AI] Juego identificado: '{game_name}'")
                 return game_name
-        else:
-            print(f"  [AI] Error OpenAI: {resp.status_code} - {resp.text[:100]}")
+            return None
+        print(f"  [AI] Error OpenAI: {resp.status_code} - {resp.text[:100]}")
     except Exception as e:
         print(f"  [AI] Excepcion: {e}")
-    return None
+    return resolution_cache.FAILED
+
+
+def _ask_ai_game_names(titles: list, openai_key: str) -> dict:
+    """
+    Versión batch de _ask_ai_game_name: un solo request para varios títulos,
+    pidiendo un JSON {"<indice>": "<juego>|UNKNOWN"}.
+    Retorna {titulo: nombre, None o FAILED}. Si el request falla (transporte
+    o status != 200) todo el batch es FAILED: reintentar título por título
+    contra el mismo endpoint caído solo multiplica los requests. Si la
+    respuesta llega pero no se puede parsear, los títulos sin respuesta
+    válida caen al request individual.
+    """
+    results = {}
+    listing = "\n".join(f"{i}: {t}" for i, t in enumerate(titles))
+    try:
+        resp = http_client.post(
+            OPENAI_API_URL,
+            kind="openai",
+            retry_unsafe=True,  # repetir la pregunta no tiene efectos
+            headers={
+                "Authorization": f"Bearer {openai_key}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "model": "gpt-4o-mini",
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": (
+                            "You are an expert in Roblox games. "
+                            "You receive numbered script titles from scriptpastebin.com. "
+                            "For each one extract ONLY the Roblox game name. "
+                            'Reply with STRICT JSON only: {"0": "<game name>", "1": "..."} '
+                            "with one key per title number. "
+                            "If you cannot determine the game, use UNKNOWN."
+                        ),
+                    },
+                    {"role": "user", "content": f"Titles:\n{listing}"},
+                ],
+                "max_tokens": 20 * len(titles) + 20,
+                "temperature": 0,
+                "response_format": {"type": "json_object"},
+            },
+        )
+    except Exception as e:
+        print(f"  [AI] Excepcion (batch): {e}")
+        return dict.fromkeys(titles, resolution_cache.FAILED)
+    if resp.status_code != 200:
+        print(f"  [AI] Error OpenAI (batch): {resp.status_code} - {resp.text[:100]}")
+        return dict.fromkeys(titles, resolution_cache.FAILED)
+    try:
+        answers = json.loads(resp.json()["choices"][0]["message"]["content"])
+        if not isinstance(answers, dict):
+            raise ValueError("la respuesta no es un objeto JSON")
+    except Exception as e:
+        print(f"  [AI] Batch no parseable, fallback individual: {e}")
+        answers = {}
+
+    for i, title in enumerate(titles):
+        game_name = answers.get(str(i))
+        if not isinstance(game_name, str):
+            results[title] = _ask_ai_game_name(title, openai_key)
+            continue
+        game_name = game_name.strip()
+        if game_name.upper() != "UNKNOWN" and len(game_name) > 1:
+            results[title] = game_name
+        else:
+            results[title] = None
+    found = sum(1 for v in results.values() if isinstance(v, str))
+    print(f"  [AI] Batch: {found}/{len(titles)} juegos identificados")
+    return results
+
+
+def resolve_games_batch(titles) -> int:
+    """
+    Resuelve en pocos requests batch (AI_BATCH_SIZE títulos c/u) los títulos
+    que el índice no reconoce y que no están en el cache persistente.
+    Solo precarga resolution_cache: detect_game luego los encuentra ahí.
+    Retorna cuántos títulos se consultaron a la IA.
+    """
+    cache = resolution_cache.get_cache()
+    pending = []
+    for title in dict.fromkeys(titles):
+        if not title or cache.contains_game(title) or local_match(title):
+            continue
+        pending.append(title)
+    if not pending:
+        return 0
+
+    openai_key = os.getenv("OPENAI_KEY", "")
+    for start in range(0, len(pending), AI_BATCH_SIZE):
+        batch = pending[start : start + AI_BATCH_SIZE]
+        for title, game_name in _ask_ai_game_names(batch, openai_key).items():
+            if game_name is not resolution_cache.FAILED:
+                cache.put_game(title, game_name)
+    return len(pending)
 
 
 _ROBLOX_HEADERS = {
@@ -225,117 +511,284 @@ _ROBLOX_HEADERS = {
 }
 
 
-def _search_roblox_placeid(game_name: str) -> int:
+class LookupFailed(Exception):
+    """El endpoint respondió mal (status != 200) o no respondió."""
+
+
+def _roblox_omni_search(game_name: str) -> int:
+    # omni-search (la búsqueda que usa la home de Roblox).
+    # Devuelve grupos por contentGroupType; el primero con type=Game tiene rootPlaceId.
+    url = (
+        "https://apis.roblox.com/search-api/omni-search"
+        f"?searchQuery={requests.utils.quote(game_name)}"
+        "&pageType=all&sessionId=00000000-0000-0000-0000-000000000000"
+    )
+    r = http_client.get(url, kind="roblox", headers=_ROBLOX_HEADERS)
+    if r.status_code != 200:
+        raise LookupFailed(f"HTTP {r.status_code}")
+    for group in r.json().get("searchResults", []):
+        if group.get("contentGroupType") in ("Game", "game", "Games"):
+            for entry in group.get("contents", []):
+                place_id = entry.get("rootPlaceId")
+                if place_id:
+                    name = entry.get("name", "?")
+                    print(
+                        f"  [Roblox] '{game_name}' -> '{name}' "
+                        f"placeid: {place_id} (omni-search)"
+                    )
+                    return int(place_id)
+            break
+    return 0
+
+
+def _roblox_universes(game_name: str) -> int:
+    # search/v1/search/universes -> games?universeIds=
+    url1 = (
+        "https://apis.roblox.com/search/v1/search/universes"
+        f"?keyword={requests.utils.quote(game_name)}"
+        "&sessionId=00000000-0000-0000-0000-000000000000&limit=1"
+    )
+    r1 = http_client.get(url1, kind="roblox", headers=_ROBLOX_HEADERS)
+    if r1.status_code != 200:
+        raise LookupFailed(f"HTTP {r1.status_code}")
+    universe_id = (r1.json().get("data") or [{}])[0].get("id")
+    if not universe_id:
+        return 0
+    r2 = http_client.get(
+        f"https://games.roblox.com/v1/games?universeIds={universe_id}",
+        kind="roblox",
+        headers=_ROBLOX_HEADERS,
+    )
+    if r2.status_code != 200:
+        raise LookupFailed(f"HTTP {r2.status_code}")
+    place_id = (r2.json().get("data") or [{}])[0].get("rootPlaceId")
+    if place_id:
+        print(f"  [Roblox] '{game_name}' -> placeid: {place_id} (universes)")
+        return int(place_id)
+    return 0
+
+
+def _roblox_legacy(game_name: str) -> int:
+    # games/list legacy
+    r = http_client.get(
+        "https://games.roblox.com/v1/games/list",
+        kind="roblox",
+        params={"keyword": game_name, "maxRows": 1, "startRows": 0},
+        headers=_ROBLOX_HEADERS,
+    )
+    if r.status_code != 200:
+        raise LookupFailed(f"HTTP {r.status_code}")
+    games = r.json().get("games") or []
+    if games:
+        place_id = games[0].get("PlaceID") or games[0].get("placeId")
+        if place_id:
+            print(f"  [Roblox] '{game_name}' -> placeid: {place_id} (legacy)")
+            return int(place_id)
+    return 0
+
+
+# Estrategias en su orden original (el orden real lo decide EndpointHealth)
+_ROBLOX_STRATEGIES = [
+    ("omni-search", _roblox_omni_search),
+    ("universes", _roblox_universes),
+    ("legacy", _roblox_legacy),
+]
+# Si la mejor estrategia no contestó en este tiempo se lanza la siguiente en paralelo
+ROBLOX_HEDGE_DELAY = float(os.getenv("ROBLOX_HEDGE_DELAY", "1.5"))
+# Fallas seguidas que abren el circuito de un endpoint, y segundos que queda
+# abierto antes de dejar pasar un request de prueba (half-open)
+ROBLOX_BREAKER_FAILURES = int(os.getenv("ROBLOX_BREAKER_FAILURES", "3"))
+ROBLOX_BREAKER_COOLDOWN = float(os.getenv("ROBLOX_BREAKER_COOLDOWN", "600"))
+
+
+class EndpointHealth:
     """
-    Busca el placeId del juego en Roblox con varios endpoints en cadena.
-    Retorna 0 si no encuentra nada.
+    Éxitos, fallas y latencia (EWMA) por estrategia de búsqueda en Roblox.
+    Una respuesta 200 sin resultados cuenta como éxito (el endpoint anda).
+    Tras ROBLOX_BREAKER_FAILURES fallas seguidas el circuito se abre y la
+    estrategia no se usa por ROBLOX_BREAKER_COOLDOWN segundos; después pasa
+    un request de prueba (half-open): si anda se cierra, si no, otro
+    cooldown. Así en modo daemon una racha de fallas no la apaga para siempre.
     """
-    # Intento 1: omni-search (la búsqueda que usa la home de Roblox).
-    # Devuelve grupos por contentGroupType; el primero con type=Game tiene rootPlaceId.
-    try:
-        url = (
-            "https://apis.roblox.com/search-api/omni-search"
-            f"?searchQuery={requests.utils.quote(game_name)}"
-            "&pageType=all&sessionId=00000000-0000-0000-0000-000000000000"
-        )
-        r = requests.get(url, headers=_ROBLOX_HEADERS, timeout=10)
-        if r.status_code == 200:
-            for group in r.json().get("searchResults", []):
-                if group.get("contentGroupType") in ("Game", "game", "Games"):
-                    for entry in group.get("contents", []):
-                        place_id = entry.get("rootPlaceId")
-                        if place_id:
-                            name = entry.get("name", "?")
-                            print(
-                                f"  [Roblox] '{game_name}' -> '{name}' "
-                                f"placeid: {place_id} (omni-search)"
-                            )
-                            return int(place_id)
-                    break
-    except Exception as e:
-        print(f"  [Roblox] omni-search fallo: {e}")
 
-    # Intento 2: search/v1/search/universes -> games?universeIds=
-    try:
-        url1 = (
-            "https://apis.roblox.com/search/v1/search/universes"
-            f"?keyword={requests.utils.quote(game_name)}"
-            "&sessionId=00000000-0000-0000-0000-000000000000&limit=1"
+    def __init__(self, breaker_failures: int = ROBLOX_BREAKER_FAILURES,
+                 cooldown: float = ROBLOX_BREAKER_COOLDOWN):
+        self.breaker_failures = breaker_failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _get(self, name):
+        return self._stats.setdefault(
+            name,
+            {"ok": 0, "failed": 0, "streak": 0, "latency": None, "open": False, "opened_at": 0.0},
         )
-        r1 = requests.get(url1, headers=_ROBLOX_HEADERS, timeout=10)
-        if r1.status_code == 200:
-            universe_id = (r1.json().get("data") or [{}])[0].get("id")
-            if universe_id:
-                r2 = requests.get(
-                    f"https://games.roblox.com/v1/games?universeIds={universe_id}",
-                    headers=_ROBLOX_HEADERS,
-                    timeout=10,
-                )
-                if r2.status_code == 200:
-                    place_id = (r2.json().get("data") or [{}])[0].get("rootPlaceId")
-                    if place_id:
-                        print(f"  [Roblox] '{game_name}' -> placeid: {place_id} (universes)")
-                        return int(place_id)
-    except Exception as e:
-        print(f"  [Roblox] universes fallo: {e}")
 
-    # Intento 3: games/list legacy
+    def _blocked(self, st) -> bool:
+        return st["open"] and time.monotonic() - st["opened_at"] < self.cooldown
+
+    def record(self, name: str, ok: bool, latency: float):
+        with self._lock:
+            st = self._get(name)
+            st["latency"] = latency if st["latency"] is None else 0.7 * st["latency"] + 0.3 * latency
+            if ok:
+                st["ok"] += 1
+                st["streak"] = 0
+                if st["open"]:
+                    st["open"] = False
+                    print(f"  [Roblox] circuito cerrado para '{name}' (volvió a responder)")
+            else:
+                st["failed"] += 1
+                st["streak"] += 1
+                if st["streak"] >= self.breaker_failures and not self._blocked(st):
+                    # Recién abierto, o falló el request de prueba: otro cooldown
+                    st["open"] = True
+                    st["opened_at"] = time.monotonic()
+                    print(f"  [Roblox] circuito abierto para '{name}' ({st['streak']} fallas seguidas)")
+
+    def is_open(self, name: str) -> bool:
+        """True mientras el circuito está abierto y no venció el cooldown."""
+        with self._lock:
+            return self._blocked(self._get(name))
+
+    def ranked(self, strategies: list) -> list:
+        """Estrategias con circuito cerrado, de mejor a peor (tasa de éxito, latencia)."""
+
+        def score(item):
+            position, (name, _) = item
+            st = self._get(name)
+            success = (st["ok"] + 1) / (st["ok"] + st["failed"] + 2)
+            latency = st["latency"] if st["latency"] is not None else 0.0
+            return (-round(success, 1), latency, position)
+
+        with self._lock:
+            alive = [
+                (i, s) for i, s in enumerate(strategies) if not self._blocked(self._get(s[0]))
+            ]
+            return [s for _, s in sorted(alive, key=score)]
+
+
+_ROBLOX_HEALTH = EndpointHealth()
+_ROBLOX_POOL = ThreadPoolExecutor(max_workers=6, thread_name_prefix="roblox")
+
+
+def _run_roblox_strategy(name: str, fn, game_name: str) -> int | None:
+    """placeId, 0 si el endpoint respondió sin resultados o None si falló."""
+    t0 = time.monotonic()
     try:
-        r = requests.get(
-            "https://games.roblox.com/v1/games/list",
-            params={"keyword": game_name, "maxRows": 1, "startRows": 0},
-            headers=_ROBLOX_HEADERS,
-            timeout=10,
-        )
-        if r.status_code == 200:
-            games = r.json().get("games") or []
-            if games:
-                place_id = games[0].get("PlaceID") or games[0].get("placeId")
-                if place_id:
-                    print(f"  [Roblox] '{game_name}' -> placeid: {place_id} (legacy)")
-                    return int(place_id)
+        place_id = fn(game_name)
     except Exception as e:
-        print(f"  [Roblox] legacy fallo: {e}")
+        _ROBLOX_HEALTH.record(name, False, time.monotonic() - t0)
+        print(f"  [Roblox] {name} fallo: {e}")
+        return None
+    _ROBLOX_HEALTH.record(name, True, time.monotonic() - t0)
+    return place_id
 
-    print(f"  [Roblox] Sin resultados para '{game_name}' tras 3 intentos.")
+
+def _search_roblox_placeid(game_name: str) -> int:
+    """
+    Busca el placeId del juego en Roblox. Las estrategias se prueban en el
+    orden que da EndpointHealth (éxito reciente y latencia, sin las de
+    circuito abierto); si la que va primero no contesta en ROBLOX_HEDGE_DELAY
+    segundos se lanza la siguiente en paralelo y gana el primer placeId válido.
+    Retorna 0 si los endpoints que respondieron no lo encuentran, o
+    resolution_cache.FAILED si ninguno respondió (no es un negativo).
+    """
+    order = _ROBLOX_HEALTH.ranked(_ROBLOX_STRATEGIES)
+    if not order:
+        print(f"  [Roblox] Todos los endpoints con circuito abierto; se omite '{game_name}'.")
+        return resolution_cache.FAILED
+
+    pending = list(order)
+    running = {}
+    answered = False
+
+    def launch():
+        name, fn = pending.pop(0)
+        running[_ROBLOX_POOL.submit(_run_roblox_strategy, name, fn, game_name)] = name
+
+    launch()
+    while running:
+        timeout = ROBLOX_HEDGE_DELAY if pending else None
+        done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            running.pop(future)
+            place_id = future.result()
+            if place_id:
+                # Las que siguen corriendo terminan solas (y actualizan su salud)
+                return place_id
+            answered = answered or place_id is not None
+        # Sin respuesta a tiempo (hedge) o sin resultado: lanzar la siguiente
+        if pending:
+            launch()
+
+    if not answered:
+        print(f"  [Roblox] Ningún endpoint respondió para '{game_name}'; se reintenta otro run.")
+        return resolution_cache.FAILED
+    print(f"  [Roblox] Sin resultados para '{game_name}' tras {len(order)} intentos.")
     return 0
 
 
 def detect_game(title: str):
     """
     Estrategia en 3 pasos:
-    1. Match directo en KNOWN_GAMES (sin llamadas externas)
+    1. Match en el índice de juegos conocidos (sin llamadas externas):
+       exacto y, si no, difuso (typos, siglas; ver game_matcher)
     2. Preguntar a OpenAI que juego es y verificar en KNOWN_GAMES
     3. Si sigue sin encontrarse, buscar el placeid en la API de Roblox
+    Los pasos 2 y 3 consultan antes el cache persistente (resolution_cache).
 
-    Retorna (nombre_formateado, placeid) o (None, None).
+    Retorna (nombre_formateado, placeid) o (None, None). Si OpenAI o Roblox
+    no respondieron lanza LookupFailed (no se cachea: se reintenta otro run).
     """
     openai_key = os.getenv(
         "OPENAI_KEY","")
-    title_lower = title.lower()
-
-    # Paso 1: match directo en KNOWN_GAMES
-    for game_key, placeid in KNOWN_GAMES.items():
-        if game_key in title_lower:
-            return format_category_name(game_key), placeid
 
-    # Paso 2: preguntar a la IA
-    ai_game_name = _ask_ai_game_name(title, openai_key)
+    # Paso 1: match en el índice (KNOWN_GAMES + categorías persistidas)
+    match = _GAME_INDEX.find(title)
+    if match:
+        return match
+    cache = resolution_cache.get_cache()
+    fuzzy = _GAME_INDEX.fuzzy.match(title)
+    if fuzzy:
+        metrics.incr("game_fuzzy_matches")
+        if not cache.contains_game(title):
+            metrics.incr("ai_calls_avoided")
+        return fuzzy[:2]
+
+    # Paso 2: preguntar a la IA (o reusar lo que respondió en un run anterior)
+    ai_game_name = cache.get_game(title)
+    if ai_game_name is resolution_cache.MISS:
+        ai_game_name = _ask_ai_game_name(title, openai_key)
+        if ai_game_name is resolution_cache.FAILED:
+            raise LookupFailed("OpenAI no respondió")
+        cache.put_game(title, ai_game_name)
     if not ai_game_name:
         return None, None
 
     ai_game_lower = ai_game_name.lower()
 
     # Verificar si la IA identifico un juego ya conocido
-    for game_key, placeid in KNOWN_GAMES.items():
-        if game_key in ai_game_lower or ai_game_lower in game_key:
-            KNOWN_GAMES[ai_game_lower] = placeid  # Guardar alias en cache
-            return format_category_name(game_key), placeid
+    match = local_match(ai_game_name)
+    if not match:
+        # La IA a veces responde un nombre parcial ('Blox' -> 'blox fruits')
+        for game_key, placeid in list(KNOWN_GAMES.items()):
+            if ai_game_lower in game_key:
+                match = (format_category_name(game_key), placeid)
+                break
+    if match:
+        register_game(ai_game_name, match[1], display=match[0])  # Guardar alias en cache
+        return match
 
     # Paso 3: juego nuevo, buscar placeid en Roblox
-    placeid = _search_roblox_placeid(ai_game_name)
+    placeid = cache.get_placeid(ai_game_name)
+    if placeid is resolution_cache.MISS:
+        placeid = _search_roblox_placeid(ai_game_name)
+        if placeid is resolution_cache.FAILED:
+            raise LookupFailed("Roblox no respondió")
+        cache.put_placeid(ai_game_name, placeid)
     if placeid:
-        KNOWN_GAMES[ai_game_lower] = placeid
+        register_game(ai_game_name, placeid)
         return format_category_name(ai_game_name), placeid
 
     print(f"  [detect_game] No se pudo obtener placeid para '{ai_game_name}'")
@@ -347,7 +800,7 @@ def create_category(name: str, placeid: int) -> bool:
     formatted = format_category_name(name)
     payload = {"name": formatted, "placeid": placeid}
     try:
-        resp = requests.post(CATEGORY_API, json=payload, timeout=30)
+        resp = http_client.post(CATEGORY_API, kind="category", json=payload)
         if resp.status_code in (200, 201):
             print(f"  [API] Categoria '{formatted}' creada (placeid: {placeid}).")
             return True
@@ -359,12 +812,19 @@ def create_category(name: str, placeid: int) -> bool:
         return False
 
 
-def upload_script(title: str, categories: list, code: str) -> bool:
-    """Sube un script via API con título sanitizado y prompt CPM-friendly."""
+def idempotency_key(source: str, item_id=None, code: str | None = None) -> str:
+    """
+    Clave determinística de una subida: source + id, o source + hash del
+    código normalizado si no hay id estable. Un reintento (o un re-run) con
+    la misma clave nunca debe crear un script duplicado en el backend.
+    """
+    ident = f"id:{item_id}" if item_id else f"code:{dedup.code_hash(code or '')}"
+    return hashlib.sha256(f"{source}|{ident}".encode("utf-8")).hexdigest()[:32]
+
+
+def build_script_payload(title: str, categories: list, code: str, key: str) -> dict:
     safe_title = sanitize_title(title)
-    if safe_title != title:
-        print(f"  [SANITIZE] '{title}' -> '{safe_title}'")
-    payload = {
+    return {
         "baseTitle": safe_title,
         "originalTitle": title,
         "categories": categories,
@@ -372,9 +832,25 @@ def upload_script(title: str, categories: list, code: str) -> bool:
         "prompt": TITLE_DESCRIPTION_PROMPT,
         "forbiddenWords": FORBIDDEN_WORDS,
         "openaiKey": os.environ.get("OPENAI_KEY", ""),
+        "idempotencyKey": key,
     }
+
+
+def upload_script(title: str, categories: list, code: str, key: str | None = None) -> bool:
+    """
+    Sube un script via API con título sanitizado y prompt CPM-friendly.
+    La clave de idempotencia va en el header Idempotency-Key y en el payload;
+    por defecto se deriva del código.
+    """
+    safe_title = sanitize_title(title)
+    if safe_title != title:
+        print(f"  [SANITIZE] '{title}' -> '{safe_title}'")
+    key = key or idempotency_key("upload", code=code)
+    payload = build_script_payload(title, categories, code, key)
     try:
-        resp = requests.post(SCRIPT_API, json=payload, timeout=60)
+        resp = http_client.post(
+            SCRIPT_API, kind="upload", json=payload, headers={"Idempotency-Key": key}
+        )
         if resp.status_code in (200, 201):
             print(f"  [API] Script '{safe_title}' subido correctamente.")
             return True
@@ -0,0 +1,236 @@
+"""
+Microbenchmarks de los caminos calientes del pipeline (solo CPU, sin red).
+
+    python bench.py [--rounds N] [--out archivo.json] [--compare base.json]
+
+Casos:
+- sanitize_title frío (cache vacío) y tibio (cada título 3 veces)
+- format_category_name sobre las categorías persistidas (+ variantes con
+  anotaciones tipo '[UPD]' como las que trae la API)
+- detect_game con la IA y Roblox stubbeados (cache de resolución temporal)
+- extracción de scrape_detail / scrape_tertiary / homepage sobre los dumps HTML
+
+Corpus: las categorías de last_run.json y títulos sintéticos armados sobre
+ellas (test_sanitize._corpus); las páginas son los .html del repo.
+
+Por defecto guarda los resultados en bench_results/<commit>.json. Con
+--compare marca como regresión todo caso cuya mediana empeore más de
+--threshold (10%) y sale con código 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime, timezone
+
+import auto_uploader
+import extract
+import resolution_cache
+from test_extract import FIXTURES, _read, detail_pages
+from test_sanitize import _corpus
+
+RESULTS_DIR = "bench_results"
+
+
+def _categories():
+    with open("last_run.json", encoding="utf-8") as f:
+        return dict(json.load(f)["known_categories"])
+
+
+def _commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+# ───── casos ─────
+
+
+def _sanitize_cases(titles):
+    warm = [t for t in titles for _ in range(3)]
+    return [
+        ("sanitize_title/frio", auto_uploader.sanitize_title.cache_clear,
+         lambda: auto_uploader.sanitize_titles(titles), len(titles)),
+        ("sanitize_title/tibio", auto_uploader.sanitize_title.cache_clear,
+         lambda: auto_uploader.sanitize_titles(warm), len(warm)),
+    ]
+
+
+def _format_cases(categories):
+    names = list(categories)
+    names += [f"{n} [UPD]" for n in names] + [f"({n}) {{BETA}} Update 2" for n in names]
+
+    def run():
+        for n in names:
+            auto_uploader.format_category_name(n)
+
+    return [("format_category_name", None, run, len(names))]
+
+
+def _detect_cases(categories, titles, tmpdir):
+    known = dict(auto_uploader.KNOWN_GAMES)
+
+    def ai_stub(title, key):
+        # La "IA" reconoce la mitad de los títulos (por hash), el resto no
+        return "Benchmark Game" if zlib.crc32(title.encode()) % 2 else None
+
+    def setup():
+        auto_uploader.KNOWN_GAMES.clear()
+        auto_uploader.KNOWN_GAMES.update(known)
+        auto_uploader.build_game_index(categories)
+        path = os.path.join(tmpdir, "game_cache.json")
+        if os.path.exists(path):
+            os.remove(path)
+        resolution_cache._cache = resolution_cache.ResolutionCache(path)
+
+    # Títulos sin juego conocido: fuerzan el camino cache -> IA -> Roblox
+    unknown = [f"Unknown Experience {i} Auto Farm" for i in range(len(titles) // 10)]
+    mixed = titles + unknown
+
+    def run():
+        for t in mixed:
+            auto_uploader.detect_game(t)
+
+    auto_uploader._ask_ai_game_name = ai_stub
+    auto_uploader._search_roblox_placeid = lambda name: 4242
+    return [("detect_game", setup, run, len(mixed))]
+
+
+def _extract_cases():
+    details = list(detail_pages()) + [_read(p) for p in FIXTURES]
+    pages = [_read(p) for p in FIXTURES]
+    home = _read("page_dump_home.html")
+
+    def detail():
+        for html in details:
+            extract.extract_detail(html)
+
+    def tertiary():
+        for html in pages:
+            extract.extract_tertiary_code(html)
+
+    return [
+        ("extract/detail", None, detail, len(details)),
+        ("extract/tertiary", None, tertiary, len(pages)),
+        ("extract/homepage", None, lambda: extract.extract_homepage_links(home), 1),
+    ]
+
+
+# ───── harness ─────
+
+
+def _measure(setup, fn, rounds):
+    times = []
+    for _ in range(rounds):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def run_suite(rounds=5, n_titles=3000, only=None):
+    """Corre todos los casos y retorna el dict de resultados (sin guardarlo)."""
+    categories = _categories()
+    titles = _corpus(n_titles, seed=42)
+    originals = (auto_uploader._ask_ai_game_name, auto_uploader._search_roblox_placeid,
+                 dict(auto_uploader.KNOWN_GAMES), resolution_cache._cache)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cases = (
+            _sanitize_cases(titles)
+            + _format_cases(categories)
+            + _detect_cases(categories, titles, tmpdir)
+            + _extract_cases()
+        )
+        try:
+            for name, setup, fn, items in cases:
+                if only and not any(o in name for o in only):
+                    continue
+                times = _measure(setup, fn, rounds)
+                median = statistics.median(times)
+                results[name] = {
+                    "rounds": rounds,
+                    "items": items,
+                    "min_s": min(times),
+                    "median_s": median,
+                    "mean_s": statistics.fmean(times),
+                    "stdev_s": statistics.pstdev(times),
+                    "us_per_item": median / items * 1e6,
+                }
+        finally:
+            ai, roblox, known, cache = originals
+            auto_uploader._ask_ai_game_name = ai
+            auto_uploader._search_roblox_placeid = roblox
+            auto_uploader.KNOWN_GAMES.clear()
+            auto_uploader.KNOWN_GAMES.update(known)
+            auto_uploader.build_game_index()
+            resolution_cache._cache = cache
+    return {
+        "commit": _commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "results": results,
+    }
+
+
+def compare(base: dict, current: dict, threshold: float = 0.10) -> list:
+    """Retorna [(caso, ratio)] de los casos cuya mediana empeoró más que threshold."""
+    regressions = []
+    for name, cur in current["results"].items():
+        old = base.get("results", {}).get(name)
+        if not old:
+            continue
+        ratio = cur["median_s"] / old["median_s"]
+        mark = "REGRESION" if ratio > 1 + threshold else ""
+        print(f"  {name:<24} {old['us_per_item']:10.2f} -> {cur['us_per_item']:10.2f} "
+              f"us/item  x{ratio:.2f} {mark}")
+        if mark:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--titles", type=int, default=3000)
+    parser.add_argument("--only", nargs="*", help="correr solo los casos que contengan estos textos")
+    parser.add_argument("--out", help="archivo JSON de salida")
+    parser.add_argument("--compare", help="JSON de una corrida anterior")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.rounds, args.titles, args.only)
+    for name, r in report["results"].items():
+        print(f"{name:<24} mediana {r['median_s'] * 1000:9.2f} ms "
+              f"({r['items']} items, {r['us_per_item']:.2f} us/item)")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"[INFO] Resultados guardados en {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            base = json.load(f)
+        print(f"[INFO] Comparando contra {base.get('commit')} ({args.compare}):")
+        if compare(base, report, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
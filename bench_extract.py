@@ -0,0 +1,69 @@
+"""
+Benchmark de extracción: árbol html.parser completo vs parse dirigido.
+
+    python bench_extract.py [repeticiones]
+
+Usa los fixtures guardados (debug_tertiary.html, page_dump_*.html) y una
+página detail sintética armada sobre debug_tertiary.html. Reporta tiempo de
+CPU por página y pico de memoria (tracemalloc).
+"""
+
+import sys
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+import extract
+from test_extract import FIXTURES, _read, detail_pages
+
+
+def _measure(fn, html, reps):
+    t0 = time.process_time()
+    for _ in range(reps):
+        fn(html)
+    cpu = (time.process_time() - t0) / reps
+    tracemalloc.start()
+    fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, peak
+
+
+def _row(label, full_fn, fast_fn, html, reps):
+    cpu_full, mem_full = _measure(full_fn, html, reps)
+    cpu_fast, mem_fast = _measure(fast_fn, html, reps)
+    print(
+        f"{label:<28} full {cpu_full * 1000:7.2f} ms {mem_full / 1024:8.0f} KB | "
+        f"dirigido {cpu_fast * 1000:7.2f} ms {mem_fast / 1024:8.0f} KB | "
+        f"CPU x{cpu_full / cpu_fast:.1f}, mem x{mem_full / mem_fast:.1f}"
+    )
+
+
+def main():
+    reps = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    def full_parse(html):
+        return BeautifulSoup(html, "html.parser")
+
+    detail = next(detail_pages())
+    _row(
+        "detail (sintético)",
+        lambda h: extract.detail_from_soup(full_parse(h)),
+        extract.extract_detail,
+        detail,
+        reps,
+    )
+    for path in FIXTURES:
+        html = _read(path)
+        _row(
+            f"tertiary {path}",
+            lambda h: extract.tertiary_code_from_soup(full_parse(h)),
+            extract.extract_tertiary_code,
+            html,
+            reps,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Benchmark de sanitize_title: implementación original vs motor compilado.
+
+    python bench_sanitize.py [n_titulos]
+
+Mide un backfill "frío" (cache vacío, títulos únicos) y uno "tibio" donde
+cada título pasa 3 veces, como ocurre en save_script -> upload_script.
+"""
+
+import sys
+import time
+
+from auto_uploader import sanitize_title, sanitize_titles
+from test_sanitize import _corpus, legacy_sanitize_title
+
+
+def _timeit(fn, titles):
+    t0 = time.perf_counter()
+    fn(titles)
+    return time.perf_counter() - t0
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    titles = _corpus(n, seed=42)
+    warm = [t for t in titles for _ in range(3)]
+
+    legacy = lambda ts: [legacy_sanitize_title(t) for t in ts]  # noqa: E731
+
+    sanitize_title.cache_clear()
+    t_legacy = _timeit(legacy, titles)
+    t_new = _timeit(sanitize_titles, titles)
+    sanitize_title.cache_clear()
+    t_legacy_w = _timeit(legacy, warm)
+    t_new_w = _timeit(sanitize_titles, warm)
+
+    print(f"{n} títulos únicos:  legacy {t_legacy:.3f}s | nuevo {t_new:.3f}s "
+          f"| x{t_legacy / t_new:.1f}")
+    print(f"{len(warm)} llamadas (x3): legacy {t_legacy_w:.3f}s | nuevo {t_new_w:.3f}s "
+          f"| x{t_legacy_w / t_new_w:.1f}")
+
+
+if __name__ == "__main__":
+    main()
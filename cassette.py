@@ -0,0 +1,196 @@
+"""
+Grabación / reproducción de todo el tráfico HTTP (estilo "cassette").
+
+    HTTP_CASSETTE=run.cassette.json HTTP_CASSETTE_MODE=record python main.py
+    HTTP_CASSETTE=run.cassette.json python main.py          # replay (offline)
+
+Se engancha en http_client._send, así que cubre todas las llamadas de
+main.py, rscripts_source.py, auto_uploader.py y upload_client.py (scrape,
+API de rscripts, raw, OpenAI, Roblox y los endpoints de Cloud Run).
+
+- record: hace la request real y guarda status, headers, body y duración.
+  Los errores de conexión / timeout también se graban y se relanzan igual.
+- replay: no toca la red. Cada request se empareja por método + URL + hash
+  del body; si no hay match exacto, por método + URL. Las respuestas de una
+  misma clave se sirven en el orden grabado (la última se repite).
+  Una request sin grabación lanza CassetteMiss.
+
+Latencia inyectada en replay con HTTP_CASSETTE_LATENCY: milisegundos fijos
+por request, o "recorded" para dormir lo que tardó la request original.
+
+Con el cassette activo no se usa el cache HTTP en disco: un 304 grabado no
+sirve de nada si el cache de la corrida de replay no tiene el body.
+Para que el replay sea fiel, la corrida tiene que arrancar del mismo estado
+(state.db / last_run.json, game_cache.json, dedup.db) que la grabada.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+CASSETTE_FILE = os.getenv("HTTP_CASSETTE", "")
+CASSETTE_MODE = os.getenv("HTTP_CASSETTE_MODE", "replay")
+CASSETTE_LATENCY = os.getenv("HTTP_CASSETTE_LATENCY", "0")
+
+# requests ya descomprime el body: estos headers no aplican a lo grabado
+_DROP_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection"}
+_ERRORS = {"ConnectionError": requests.ConnectionError, "Timeout": requests.Timeout}
+
+
+class CassetteMiss(requests.RequestException):
+    """Request sin respuesta grabada (no se reintenta)."""
+
+
+def _full_url(method: str, url: str, params=None) -> str:
+    return requests.Request(method, url, params=params).prepare().url
+
+
+def _body_digest(kwargs: dict) -> str:
+    if kwargs.get("json") is not None:
+        body = json.dumps(kwargs["json"], sort_keys=True).encode()
+    else:
+        body = kwargs.get("data") or b""
+        if isinstance(body, dict):
+            body = json.dumps(body, sort_keys=True)
+        if isinstance(body, str):
+            body = body.encode()
+    return hashlib.sha1(body).hexdigest()[:16] if body else ""
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str = "replay", latency: str = "0"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"HTTP_CASSETTE_MODE inválido: {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.recorded = 0
+        self.played = 0
+        self.missed = 0
+        self._lock = threading.Lock()
+        self._interactions = []
+        self._exact = defaultdict(deque)
+        self._loose = defaultdict(deque)
+        if mode == "replay":
+            self._load()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            self._interactions = json.load(f)["interactions"]
+        for it in self._interactions:
+            self._exact[(it["method"], it["url"], it["body"])].append(it)
+            self._loose[(it["method"], it["url"])].append(it)
+
+    # ── replay ──
+    def _next(self, queue: deque):
+        it = queue[0]
+        if len(queue) > 1:
+            queue.popleft()
+        return it
+
+    def _sleep(self, it: dict):
+        if self.latency == "recorded":
+            time.sleep(it.get("elapsed", 0))
+        elif self.latency and float(self.latency) > 0:
+            time.sleep(float(self.latency) / 1000)
+
+    def play(self, method: str, url: str, **kwargs):
+        full_url = _full_url(method, url, kwargs.get("params"))
+        exact_key = (method.upper(), full_url, _body_digest(kwargs))
+        with self._lock:
+            queue = self._exact.get(exact_key) or self._loose.get(exact_key[:2])
+            if not queue:
+                self.missed += 1
+                raise CassetteMiss(f"cassette: sin grabación para {method.upper()} {full_url}")
+            it = self._next(queue)
+            self.played += 1
+        self._sleep(it)
+
+        if it.get("error"):
+            raise _ERRORS.get(it["error"], requests.ConnectionError)(it.get("message", ""))
+        resp = requests.Response()
+        resp.status_code = it["status"]
+        resp._content = base64.b64decode(it["content"])
+        resp._content_consumed = True  # iter_content() sirve desde _content
+        resp.headers = CaseInsensitiveDict(it["headers"])
+        resp.headers["Content-Length"] = str(len(resp._content))
+        resp.encoding = it.get("encoding")
+        resp.url = full_url
+        resp.reason = it.get("reason", "")
+        return resp
+
+    # ── record ──
+    def _append(self, method, url, kwargs, elapsed, **fields):
+        it = {
+            "method": method.upper(),
+            "url": _full_url(method, url, kwargs.get("params")),
+            "body": _body_digest(kwargs),
+            "elapsed": round(elapsed, 4),
+            **fields,
+        }
+        with self._lock:
+            self._interactions.append(it)
+            self.recorded += 1
+
+    def record(self, method: str, url: str, resp, elapsed: float, **kwargs):
+        """Guarda la respuesta (leyendo el body completo) y la devuelve usable."""
+        content = resp.content
+        headers = {k: v for k, v in resp.headers.items() if k.lower() not in _DROP_HEADERS}
+        self._append(
+            method, url, kwargs, elapsed,
+            status=resp.status_code,
+            reason=resp.reason,
+            headers=headers,
+            encoding=resp.encoding,
+            content=base64.b64encode(content).decode("ascii"),
+        )
+        return resp
+
+    def record_error(self, method: str, url: str, exc: Exception, elapsed: float, **kwargs):
+        name = "Timeout" if isinstance(exc, requests.Timeout) else "ConnectionError"
+        self._append(method, url, kwargs, elapsed, error=name, message=str(exc))
+
+    def save(self):
+        if self.mode != "record":
+            return
+        with self._lock:
+            data = {"version": 1, "interactions": list(self._interactions)}
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Warning: Could not save HTTP cassette: {e}")
+
+    def report(self) -> str:
+        if self.mode == "record":
+            return f"{self.recorded} requests grabadas en {self.path}"
+        return f"{self.played} respuestas reproducidas | {self.missed} sin grabación"
+
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette():
+    """Cassette global, o None si HTTP_CASSETTE no está configurado."""
+    global _cassette
+    if not CASSETTE_FILE:
+        return None
+    if _cassette is None:
+        with _cassette_lock:
+            if _cassette is None:
+                _cassette = Cassette(CASSETTE_FILE, CASSETTE_MODE, CASSETTE_LATENCY)
+    return _cassette
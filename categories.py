@@ -0,0 +1,126 @@
+"""
+Índice de categorías de Bublox por placeId.
+
+Antes las categorías se buscaban por el nombre formateado exacto, así que
+'Rivals' y 'Rivals [❄️freeze ray❄️]' (mismo placeId) terminaban siendo dos
+categorías y cada variante con emoji disparaba otro create_category. Acá:
+
+- by_place: placeId -> nombre canónico (una sola categoría por juego)
+- aliases:  nombre normalizado (sin emoji, anotaciones ni mayúsculas) -> placeId
+
+reconcile() colapsa en una pasada las categorías persistidas: por cada
+placeId se queda con el nombre más limpio y los demás pasan a ser alias.
+
+Las categorías nuevas no se crean al vuelo: request() las deja pendientes y
+main.create_pending_categories() las crea todas juntas al final del run (los
+uploads que las esperan quedan en la cola mientras tanto).
+"""
+
+import re
+import threading
+
+from auto_uploader import format_category_name
+
+_ANNOTATION_RE = re.compile(r"[\(\[\{][^\)\]\}]*[\)\]\}]")
+_TOKEN_RE = re.compile(r"[^\W_]+")
+# Un nombre "limpio": ya formateado y sin emoji ni símbolos decorativos
+_CLEAN_RE = re.compile(r"[\w\s'&:.,!?-]+")
+
+
+def normalize_category(name: str) -> str:
+    """'Rivals [❄️freeze ray❄️]', 'RIVALS 🔫' -> 'rivals'."""
+    stripped = _ANNOTATION_RE.sub(" ", name or "")
+    tokens = _TOKEN_RE.findall(stripped.lower())
+    if not tokens:
+        # Todo era anotación: usar lo de adentro
+        tokens = _TOKEN_RE.findall((name or "").lower())
+    return " ".join(tokens)
+
+
+def _is_clean(name: str) -> bool:
+    return format_category_name(name) == name and bool(_CLEAN_RE.fullmatch(name))
+
+
+class CategoryIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_place = {}
+        self.aliases = {}
+        self.collapsed = 0
+        self._pending = {}
+        self._failed = set()
+
+    @classmethod
+    def reconcile(cls, categories: dict, aliases: dict | None = None):
+        """
+        Arma el índice desde {nombre: placeId} (+ alias ya persistidos),
+        colapsando los nombres repetidos de un mismo placeId. `collapsed`
+        queda con la cantidad de nombres que pasaron a ser alias.
+        """
+        index = cls()
+        names_by_place = {}
+        for name, placeid in categories.items():
+            names_by_place.setdefault(int(placeid), []).append(name)
+        for placeid, names in names_by_place.items():
+            canonical = min(names, key=lambda n: (not _is_clean(n), len(n), n))
+            index.by_place[placeid] = canonical
+            index.collapsed += len(names) - 1
+            for name in names:
+                index.aliases[normalize_category(name)] = placeid
+        for alias, placeid in (aliases or {}).items():
+            if int(placeid) in index.by_place:
+                index.aliases.setdefault(alias, int(placeid))
+        return index
+
+    def categories(self) -> dict:
+        """{nombre canónico: placeId}"""
+        with self._lock:
+            return {name: placeid for placeid, name in self.by_place.items()}
+
+    def __len__(self):
+        return len(self.by_place)
+
+    def lookup(self, game_name: str, placeid=None) -> str | None:
+        """Nombre canónico de la categoría del juego, o None si no existe."""
+        with self._lock:
+            return self._lookup(game_name, placeid)
+
+    def _lookup(self, game_name, placeid):
+        if placeid and int(placeid) in self.by_place:
+            return self.by_place[int(placeid)]
+        alias_place = self.aliases.get(normalize_category(game_name))
+        return self.by_place.get(alias_place) if alias_place else None
+
+    def add(self, name: str, placeid: int):
+        with self._lock:
+            self.by_place.setdefault(int(placeid), name)
+            self.aliases[normalize_category(name)] = int(placeid)
+
+    # ── creación diferida ──
+    def request(self, game_name: str, placeid: int):
+        """
+        (nombre, estado): "ready" si la categoría existe, "pending" si queda
+        para crear al final del run, "failed" si ya falló su creación.
+        """
+        with self._lock:
+            name = self._lookup(game_name, placeid)
+            if name:
+                return name, "ready"
+            if int(placeid) in self._failed:
+                return None, "failed"
+            name = self._pending.setdefault(int(placeid), format_category_name(game_name))
+            return name, "pending"
+
+    def take_pending(self) -> dict:
+        """{placeId: nombre} pendientes de crear (y vacía la lista)."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            return pending
+
+    def mark_failed(self, placeid: int):
+        with self._lock:
+            self._failed.add(int(placeid))
+
+    def reset_failed(self):
+        with self._lock:
+            self._failed.clear()
@@ -0,0 +1,32 @@
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    """
+    Levanta un handler HTTP de prueba en 127.0.0.1 con un puerto libre:
+    stub_server(Handler) -> "http://127.0.0.1:<puerto>" (sin '/' final).
+    Silencia el log del handler y apaga los servidores al terminar el test;
+    stub_server.stop() los apaga antes (p.ej. para probar connection refused).
+    """
+    servers = []
+
+    def start(handler):
+        monkeypatch.setattr(handler, "log_message", lambda self, *args: None)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    def stop():
+        while servers:
+            server = servers.pop()
+            server.shutdown()
+            server.server_close()
+
+    start.stop = stop
+    yield start
+    stop()
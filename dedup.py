@@ -0,0 +1,212 @@
+"""
+Dedup de código Lua antes de subir (ambas fuentes).
+
+- Exacto: sha256 del código normalizado (sin comentarios, whitespace
+  colapsado), así un loader re-posteado con otro espaciado es el mismo.
+- Near-duplicate: MinHash (64 permutaciones sobre shingles de 5 tokens) +
+  LSH por bandas (16 x 4). Los candidatos que comparten alguna banda se
+  confirman con la similitud Jaccard estimada por sus firmas.
+
+El índice vive en SQLite (DEDUP_DB): solo guarda hashes y firmas (~300
+bytes por script), nunca el código, y las búsquedas van por índice, así
+que escala a cientos de miles de entradas sin cargarlas en memoria.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+
+DEDUP_DB = os.getenv("DEDUP_DB", "dedup.db")
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+
+_PRIME = (1 << 61) - 1
+_MASK32 = 0xFFFFFFFF
+# Coeficientes fijos: las firmas tienen que ser comparables entre runs
+_PERMS = [
+    (
+        int.from_bytes(hashlib.sha256(f"a{i}".encode()).digest()[:8], "big") % _PRIME | 1,
+        int.from_bytes(hashlib.sha256(f"b{i}".encode()).digest()[:8], "big") % _PRIME,
+    )
+    for i in range(NUM_PERM)
+]
+
+_BLOCK_COMMENT_RE = re.compile(r"--\[(=*)\[.*?\]\1\]", re.S)
+_LINE_COMMENT_RE = re.compile(r"--[^\n]*")
+_WHITESPACE_RE = re.compile(r"\s+")
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def normalize_code(code: str) -> str:
+    """Quita comentarios Lua y colapsa whitespace."""
+    code = _BLOCK_COMMENT_RE.sub(" ", code or "")
+    code = _LINE_COMMENT_RE.sub(" ", code)
+    return _WHITESPACE_RE.sub(" ", code).strip()
+
+
+def code_hash(code: str) -> str:
+    return hashlib.sha256(normalize_code(code).encode("utf-8")).hexdigest()
+
+
+def minhash(normalized: str) -> list:
+    tokens = _TOKEN_RE.findall(normalized)
+    if len(tokens) <= SHINGLE_SIZE:
+        shingles = {" ".join(tokens)}
+    else:
+        shingles = {
+            " ".join(tokens[i : i + SHINGLE_SIZE])
+            for i in range(len(tokens) - SHINGLE_SIZE + 1)
+        }
+    hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles]
+    return [min((a * h + b) % _PRIME for h in hashes) & _MASK32 for a, b in _PERMS]
+
+
+def _band_keys(sig: list) -> list:
+    keys = []
+    for band in range(BANDS):
+        chunk = struct.pack(f"<{ROWS}I", *sig[band * ROWS : (band + 1) * ROWS])
+        keys.append(int.from_bytes(hashlib.blake2b(chunk, digest_size=7).digest(), "big"))
+    return keys
+
+
+def _similarity(sig_a: list, sig_b: list) -> float:
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+class DedupIndex:
+    def __init__(self, path: str = DEDUP_DB):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # Sin WAL: los workflows commitean solo dedup.db (ver upload_queue)
+        self._db.execute("PRAGMA journal_mode=DELETE")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS scripts (
+                hash TEXT PRIMARY KEY,
+                sig BLOB NOT NULL,
+                source TEXT,
+                item_id TEXT,
+                title TEXT,
+                ts INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS lsh (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                hash TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS lsh_bucket ON lsh (band, bucket);
+            CREATE INDEX IF NOT EXISTS lsh_hash ON lsh (hash);
+            """
+        )
+        self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM scripts").fetchone()[0]
+
+    def _lookup(self, digest: str, sig: list):
+        """(tipo, entrada) con tipo 'exact' / 'near', o (None, None)."""
+        row = self._db.execute(
+            "SELECT source, item_id, title FROM scripts WHERE hash = ?", (digest,)
+        ).fetchone()
+        if row:
+            return "exact", row
+        candidates = set()
+        for band, bucket in enumerate(_band_keys(sig)):
+            for (h,) in self._db.execute(
+                "SELECT hash FROM lsh WHERE band = ? AND bucket = ?", (band, bucket)
+            ):
+                candidates.add(h)
+        for h in candidates:
+            row = self._db.execute(
+                "SELECT sig, source, item_id, title FROM scripts WHERE hash = ?", (h,)
+            ).fetchone()
+            if not row:
+                continue
+            other = struct.unpack(f"<{NUM_PERM}I", row[0])
+            if _similarity(sig, other) >= NEAR_DUP_THRESHOLD:
+                return "near", row[1:]
+        return None, None
+
+    def check(self, code: str):
+        """
+        Retorna ('exact' | 'near', (source, item_id, title)) si el código ya
+        se subió, o (None, None) si es nuevo.
+        """
+        normalized = normalize_code(code)
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        sig = minhash(normalized)
+        with self._lock:
+            return self._lookup(digest, sig)
+
+    def claim(self, code: str, source: str, item_id: str, title: str):
+        """
+        check() + add() atómico: dos workers con el mismo código no pueden
+        subirlo ambos. Si la subida falla hay que llamar a release().
+        """
+        normalized = normalize_code(code)
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        sig = minhash(normalized)
+        with self._lock:
+            found = self._lookup(digest, sig)
+            if found[0]:
+                return found
+            self._insert(digest, sig, source, item_id, title)
+            return None, None
+
+    def _insert(self, digest, sig, source, item_id, title):
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO scripts VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    digest,
+                    struct.pack(f"<{NUM_PERM}I", *sig),
+                    source,
+                    str(item_id),
+                    title,
+                    int(time.time()),
+                ),
+            )
+            self._db.execute("DELETE FROM lsh WHERE hash = ?", (digest,))
+            self._db.executemany(
+                "INSERT INTO lsh VALUES (?, ?, ?)",
+                [(band, bucket, digest) for band, bucket in enumerate(_band_keys(sig))],
+            )
+
+    def add(self, code: str, source: str, item_id: str, title: str):
+        normalized = normalize_code(code)
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        with self._lock:
+            self._insert(digest, minhash(normalized), source, item_id, title)
+
+    def release(self, code: str):
+        digest = code_hash(code)
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM scripts WHERE hash = ?", (digest,))
+            self._db.execute("DELETE FROM lsh WHERE hash = ?", (digest,))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> DedupIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = DedupIndex()
+    return _index
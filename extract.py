@@ -0,0 +1,176 @@
+"""
+Extracción dirigida para las páginas de scriptpastebin.
+
+En vez de armar el árbol completo de cada página, se parsean solo los
+elementos que usa cada paso (bs4 SoupStrainer sobre html.parser):
+- homepage: <article> y <h3>
+- detail:   <time>, <h1> y los <article> (el botón "Get Script" y los
+            hermanos que se miran para el título viven dentro del artículo)
+- tertiary: <textarea> y <pre>
+
+La lógica de extracción es la misma función para el árbol parcial y el
+completo. Si el árbol parcial no alcanza para garantizar el mismo resultado
+(no hay <article>, hay textos "Get Script" fuera de él, o el contenedor del
+botón queda fuera del artículo) se re-parsea la página completa.
+"""
+
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+_HOME_ONLY = SoupStrainer(["article", "h3"])
+_DETAIL_ONLY = SoupStrainer(["time", "h1", "article"])
+_TERTIARY_ONLY = SoupStrainer(["textarea", "pre"])
+
+_TITLE_TAGS = ["p", "div", "h4", "h3", "h2", "h1", "strong", "span"]
+_ARTICLE_RE = re.compile(r"<article\b.*?</article\s*>", re.S | re.I)
+
+
+def parse(html: str, only=None):
+    return BeautifulSoup(html, "html.parser", parse_only=only)
+
+
+# ───── homepage ─────
+
+
+def homepage_links_from_soup(soup) -> list:
+    article = soup.find("article")
+    headers = article.find_all("h3") if article else soup.find_all("h3")
+    links = []
+    for h in headers:
+        a = h.find("a")
+        if a:
+            links.append(a.get("href"))
+    return links
+
+
+def extract_homepage_links(html: str) -> list:
+    return homepage_links_from_soup(parse(html, _HOME_ONLY))
+
+
+# ───── tertiary ─────
+
+
+def tertiary_code_from_soup(soup) -> str | None:
+    code = None
+    for ta in soup.find_all("textarea"):
+        c = ta.get_text(strip=True)
+        if len(c) > 10:
+            code = c
+            break
+    if not code:
+        pres = soup.find_all("pre")
+        if pres:
+            code = pres[0].get_text(strip=True)
+    return code
+
+
+def extract_tertiary_code(html: str) -> str | None:
+    return tertiary_code_from_soup(parse(html, _TERTIARY_ONLY))
+
+
+# ───── detail ─────
+
+
+def _find_text_button(soup):
+    return soup.find("a", string=lambda t: t and "Get Script" in t)
+
+
+def _find_class_button(soup):
+    return soup.find(
+        "a", class_=lambda c: c and "button" in c and "wp-block-button__link" in c
+    )
+
+
+def _find_button(soup):
+    return _find_text_button(soup) or _find_class_button(soup)
+
+
+def _button_container(button):
+    container = button
+    for _ in range(3):
+        if container.parent and (
+            "buttons" in container.parent.get("class", [])
+            or "entry-content" in container.parent.get("class", [])
+        ):
+            break
+        container = container.parent
+    return container
+
+
+def detail_from_soup(soup) -> dict:
+    """
+    Retorna {"post_date", "button", "title", "title_source", "link"}:
+    - post_date: 'YYYY-MM-DD' del <time> o None
+    - button: si se encontró el botón "Get Script"
+    - title / title_source: título y de dónde salió ('above', 'h1' o None)
+    - link: href del botón (None si no hay botón)
+    """
+    result = {"post_date": None, "button": False, "title": "Unknown Script",
+              "title_source": None, "link": None}
+    time_tag = soup.find("time", class_="entry-date") or soup.find(
+        "time", class_="published"
+    )
+    if time_tag and time_tag.has_attr("datetime"):
+        result["post_date"] = time_tag["datetime"][:10]
+
+    button = _find_button(soup)
+    if button:
+        result["button"] = True
+        curr = _button_container(button)
+        limit = 5
+        while curr and limit > 0:
+            curr = curr.previous_sibling
+            if curr and curr.name in _TITLE_TAGS:
+                text = curr.get_text(strip=True)
+                if text and len(text) > 3 and "Step" not in text:
+                    result["title"] = text
+                    result["title_source"] = "above"
+                    break
+            limit -= 1
+        result["link"] = button.get("href")
+
+    if result["title_source"] is None:
+        h1 = soup.find("h1")
+        if h1:
+            result["title"] = h1.get_text(strip=True)
+            result["title_source"] = "h1"
+    return result
+
+
+def _outside(html: str, marker: str, spans: list) -> bool:
+    inside = sum(html.count(marker, start, end) for start, end in spans)
+    return html.count(marker) != inside
+
+
+def _partial_detail_is_exact(html: str, soup) -> bool:
+    """True si el árbol parcial da garantizado el mismo resultado que el completo."""
+    articles = [el for el in soup.contents if getattr(el, "name", None) == "article"]
+    spans = [m.span() for m in _ARTICLE_RE.finditer(html)]
+    if not articles or len(spans) != len(articles):
+        return False
+    # Un "Get Script" fuera de los <article> podría ser el primer match del árbol completo
+    if _outside(html, "Get Script", spans):
+        return False
+    button = _find_text_button(soup)
+    if button is None:
+        # Solo entonces se busca por clase (que suele aparecer en el CSS del <head>)
+        if _outside(html, "wp-block-button__link", spans):
+            return False
+        button = _find_class_button(soup)
+        if button is None:
+            return True
+    container = _button_container(button)
+    # El contenedor (y sus hermanos) tienen que quedar dentro de un <article>
+    return (
+        container is not None
+        and container.name != "article"
+        and container.find_parent("article") is not None
+    )
+
+
+def extract_detail(html: str) -> dict:
+    soup = parse(html, _DETAIL_ONLY)
+    if not _partial_detail_is_exact(html, soup):
+        soup = parse(html)
+    return detail_from_soup(soup)
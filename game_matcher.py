@@ -0,0 +1,185 @@
+"""
+Matcher difuso local de nombres de juegos (antes de preguntarle a la IA).
+
+GameIndex solo reconoce nombres exactos (por tokens). Acá se cubren los
+casos que antes terminaban en una llamada paga a OpenAI:
+
+- typos y variantes: 'Blox Frutis', 'Jailbrek', 'pet simulator99';
+- abreviaturas: solo las de la tabla explícita ('BF', 'MM2'). Las siglas
+  generadas de los nombres chocan con palabras comunes ('Mad City' ->
+  'Merge anime defender', 'Zoo Tycoon' -> 'Zoo or oof') y suben scripts a
+  la categoría equivocada sin pasar por la IA;
+- palabras de más alrededor del nombre ('NEW Blox Frutis Leaf Hub').
+
+Candidatos: índice invertido de trigramas de caracteres -> nombres. A cada
+candidato se lo compara (difflib ratio) contra las ventanas del título con
+su misma cantidad de tokens o una más (una menos solo si son exactamente
+los mismos caracteres con tokens pegados). Los números y sufijos de
+variante (2, iii, x) tienen que coincidir exactos: una secuela no es el
+juego original. El score es el de la mejor ventana; se acepta si supera
+FUZZY_THRESHOLD y le saca al segundo juego más de FUZZY_MARGIN (si dos
+juegos distintos empatan, se deja a la IA).
+
+evaluate() mide precisión y cobertura sobre un set etiquetado
+(labelled_titles.json); main.py lo agrega al reporte del run.
+"""
+
+import json
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+FUZZY_THRESHOLD = float(os.getenv("FUZZY_THRESHOLD", "0.86"))
+FUZZY_MARGIN = 0.03
+LABELLED_TITLES_FILE = os.getenv("LABELLED_TITLES_FILE", "labelled_titles.json")
+
+# Candidatos que se comparan a fondo por título (los de más trigramas en común)
+MAX_CANDIDATES = 25
+ABBREVIATION_SCORE = 0.95
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+_DIGITS_RE = re.compile(r"\d+")
+# Números romanos y letras sueltas ('x' de pet simulator x); 'a' es una palabra
+_VARIANT_RE = re.compile(r"[ivx]+|[b-hj-uwyz]")
+
+
+def _markers(tokens) -> tuple:
+    """Números y sufijos de variante de los tokens: ('2',), ('iii',), ('x',)."""
+    digits = [d for tok in tokens for d in _DIGITS_RE.findall(tok)]
+    suffixes = [tok for tok in tokens if _VARIANT_RE.fullmatch(tok)]
+    return tuple(sorted(digits)), tuple(sorted(suffixes))
+
+
+def _trigrams(text: str) -> set:
+    padded = f" {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyMatcher:
+    def __init__(self):
+        self._names = []  # [(texto, n_tokens, display, placeid)]
+        self._by_text = {}
+        self._grams = defaultdict(set)
+        self._abbrevs = {}  # sigla -> id de nombre
+        # register_game() agrega nombres desde los workers mientras otros
+        # hacen match(): el índice solo se toca con el lock tomado
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, tokens: tuple, display: str, placeid: int):
+        text = " ".join(tokens)
+        with self._lock:
+            if text in self._by_text:
+                # Mismo criterio que GameIndex: el último add gana
+                self._names[self._by_text[text]] = (text, len(tokens), display, placeid)
+                return
+            name_id = len(self._names)
+            self._names.append((text, len(tokens), display, placeid))
+            self._by_text[text] = name_id
+            for gram in _trigrams(text):
+                self._grams[gram].add(name_id)
+
+    def add_abbreviation(self, abbr: str, tokens: tuple) -> bool:
+        """Sigla de un nombre ya agregado ('mm2' -> murder mystery 2)."""
+        with self._lock:
+            name_id = self._by_text.get(" ".join(tokens))
+            if name_id is None:
+                return False
+            self._abbrevs[abbr.lower()] = name_id
+            return True
+
+    def match(self, text: str):
+        """(display, placeid, score) del mejor juego, o None si no llega al umbral."""
+        tokens = _TOKEN_RE.findall((text or "").lower())
+        if not tokens or not self._names:
+            return None
+
+        with self._lock:
+            for tok in tokens:
+                name_id = self._abbrevs.get(tok)
+                if name_id is not None:
+                    _, _, display, placeid = self._names[name_id]
+                    return display, placeid, ABBREVIATION_SCORE
+
+            shared = Counter()
+            for gram in _trigrams(" ".join(tokens)):
+                for name_id in self._grams.get(gram, ()):
+                    shared[name_id] += 1
+            # El scoring (lo caro) va fuera del lock, sobre una copia
+            candidates = [self._names[name_id] for name_id, _ in shared.most_common(MAX_CANDIDATES)]
+
+        # Scores por debajo de este piso no pueden ni ganar ni empatar
+        floor = FUZZY_THRESHOLD - FUZZY_MARGIN
+        best = {}  # placeid -> (score, display)
+        for name, size, display, placeid in candidates:
+            matcher = SequenceMatcher(None, "", name)  # seq2 fija: se analiza una vez
+            score = 0.0
+            compact = name.replace(" ", "")
+            markers = _markers(name.split())
+            for width in {max(1, size - 1), size, size + 1}:
+                for i in range(max(1, len(tokens) - width + 1)):
+                    window = tokens[i : i + width]
+                    # Secuelas y variantes ('2' / '3', 'ii' / 'iii', 'x') no se
+                    # aproximan: 'Murder Mystery 3' no es 'murder mystery 2'
+                    if _markers(window) != markers:
+                        continue
+                    if width < size:
+                        # Un token menos solo si es el nombre con tokens pegados
+                        # ('simulator99'), no si le falta una palabra
+                        if "".join(window) == compact:
+                            score = 1.0
+                        continue
+                    matcher.set_seq1(" ".join(window))
+                    if matcher.real_quick_ratio() < floor or matcher.quick_ratio() < floor:
+                        continue
+                    score = max(score, matcher.ratio())
+            if score > best.get(placeid, (0.0,))[0]:
+                best[placeid] = (score, display)
+
+        ranked = sorted(best.items(), key=lambda kv: kv[1][0], reverse=True)
+        if not ranked:
+            return None
+        placeid, (score, display) = ranked[0]
+        if score < FUZZY_THRESHOLD:
+            return None
+        if len(ranked) > 1 and score - ranked[1][1][0] < FUZZY_MARGIN:
+            return None
+        return display, placeid, round(score, 3)
+
+
+def load_labelled(path: str = LABELLED_TITLES_FILE) -> list:
+    """[(título, placeid o None)] del set etiquetado; [] si no existe."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [(it["title"], it["placeid"]) for it in json.load(f)]
+    except (OSError, ValueError, KeyError):
+        return []
+
+
+def evaluate(find, labelled: list) -> dict:
+    """
+    Mide un resolvedor local find(título) -> (nombre, placeid) | None sobre
+    [(título, placeid esperado o None)]. precision: aciertos / respuestas;
+    coverage: títulos con juego que se resolvieron sin IA.
+    """
+    answered = correct = positives = resolved = 0
+    for title, expected in labelled:
+        found = find(title)
+        if expected:
+            positives += 1
+        if found is None:
+            continue
+        answered += 1
+        if found[1] == expected:
+            correct += 1
+            resolved += 1
+    return {
+        "labelled": len(labelled),
+        "answered": answered,
+        "precision": round(correct / answered, 4) if answered else None,
+        "coverage": round(resolved / positives, 4) if positives else None,
+    }
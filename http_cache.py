@@ -0,0 +1,197 @@
+"""
+Cache HTTP en disco para las páginas scrapeadas (opcional).
+
+Se activa con HTTP_CACHE_DIR=<carpeta>. Para cada URL guarda el body y sus
+validadores (ETag / Last-Modified):
+- Cache-Control: max-age=N -> se sirve de disco sin request mientras esté fresco
+- Cache-Control: no-store  -> no se guarda
+- Resto -> GET condicional (If-None-Match / If-Modified-Since); un 304 se
+  responde con el body de disco.
+
+Tamaño máximo HTTP_CACHE_MAX_MB con desalojo LRU. report() resume los bytes
+que no hubo que descargar en el run.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", "")
+HTTP_CACHE_MAX_MB = float(os.getenv("HTTP_CACHE_MAX_MB", "200"))
+# Clases de endpoint (ver http_client.TIMEOUTS) que pasan por el cache
+CACHED_KINDS = frozenset({"scrape", "raw"})
+
+_MAX_AGE_RE = re.compile(r"max-age\s*=\s*(\d+)", re.I)
+# Headers que se guardan para reconstruir la respuesta
+_KEEP_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control")
+
+
+def _parse_cache_control(value: str):
+    """Retorna (no_store, no_cache, max_age)."""
+    value = (value or "").lower()
+    m = _MAX_AGE_RE.search(value)
+    return "no-store" in value, "no-cache" in value, int(m.group(1)) if m else 0
+
+
+class HttpCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0  # servidos de disco sin request (frescos)
+        self.revalidated = 0  # 304
+        self.misses = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(directory, "index.json")
+        self._index = {}
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self._index_path):
+            try:
+                with open(self._index_path, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except Exception as e:
+                print(f"Warning: Could not load HTTP cache index: {e}")
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.body")
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def lookup(self, url: str):
+        with self._lock:
+            entry = self._index.get(self.key_for(url))
+            return dict(entry) if entry else None
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() < entry.get("expires", 0)
+
+    def conditional_headers(self, entry: dict) -> dict:
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def response_from(self, entry: dict, url: str, revalidated: bool = False):
+        """Arma un requests.Response con el body de disco (None si se perdió)."""
+        key = self.key_for(url)
+        try:
+            with open(self._body_path(key), "rb") as f:
+                body = f.read()
+        except OSError:
+            with self._lock:
+                self._index.pop(key, None)
+            return None
+        resp = requests.Response()
+        resp.status_code = 200
+        resp._content = body
+        resp.headers = CaseInsensitiveDict(entry.get("headers") or {})
+        resp.encoding = entry.get("encoding")
+        resp.url = url
+        with self._lock:
+            if key in self._index:
+                self._index[key]["atime"] = time.time()
+            if revalidated:
+                self.revalidated += 1
+            else:
+                self.hits += 1
+            self.bytes_saved += len(body)
+        return resp
+
+    def refresh(self, url: str, resp):
+        """Tras un 304: renovar expiración con los headers nuevos."""
+        _, no_cache, max_age = _parse_cache_control(resp.headers.get("Cache-Control"))
+        with self._lock:
+            entry = self._index.get(self.key_for(url))
+            if entry:
+                entry["expires"] = 0 if no_cache else time.time() + max_age
+
+    def store(self, url: str, resp):
+        no_store, no_cache, max_age = _parse_cache_control(resp.headers.get("Cache-Control"))
+        with self._lock:
+            self.misses += 1
+        if no_store:
+            return
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        fresh_for = 0 if no_cache else max_age
+        if not (etag or last_modified or fresh_for):
+            return  # sin validadores ni max-age no hay cómo reusarlo
+        key = self.key_for(url)
+        body = resp.content
+        tmp = self._body_path(key) + ".tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, self._body_path(key))
+        except OSError as e:
+            print(f"Warning: Could not write HTTP cache entry: {e}")
+            return
+        with self._lock:
+            self._index[key] = {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "expires": time.time() + fresh_for,
+                "size": len(body),
+                "atime": time.time(),
+                "encoding": resp.encoding,
+                "headers": {h: resp.headers[h] for h in _KEEP_HEADERS if h in resp.headers},
+            }
+            self._evict()
+
+    def _evict(self):
+        total = sum(e.get("size", 0) for e in self._index.values())
+        if total <= self.max_bytes:
+            return
+        for key, entry in sorted(self._index.items(), key=lambda kv: kv[1].get("atime", 0)):
+            if total <= self.max_bytes:
+                break
+            total -= entry.get("size", 0)
+            del self._index[key]
+            try:
+                os.remove(self._body_path(key))
+            except OSError:
+                pass
+
+    def flush(self):
+        with self._lock:
+            data = dict(self._index)
+        tmp = self._index_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp, self._index_path)
+        except OSError as e:
+            print(f"Warning: Could not save HTTP cache index: {e}")
+
+    def report(self) -> str:
+        return (
+            f"{self.hits} frescos + {self.revalidated} revalidados (304) / "
+            f"{self.misses} descargas | {self.bytes_saved / 1024:.1f} KB ahorrados"
+        )
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """HttpCache global, o None si HTTP_CACHE_DIR no está configurado."""
+    global _cache
+    if not HTTP_CACHE_DIR:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = HttpCache(HTTP_CACHE_DIR, int(HTTP_CACHE_MAX_MB * 1024 * 1024))
+    return _cache
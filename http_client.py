@@ -0,0 +1,215 @@
+"""
+Cliente HTTP compartido por todos los módulos (scraper, rscripts, uploader).
+
+- Una sola requests.Session: keep-alive y pool de conexiones por host, así
+  las llamadas repetidas a Cloud Run / rscripts.net reusan conexiones tibias.
+- Reintentos con backoff exponencial + jitter ante errores de conexión,
+  timeouts y respuestas 429 / 5xx (con Retry-After se espera lo que pide
+  el host en vez del backoff). Los POST no se reintentan si el request pudo
+  haber llegado (timeout de lectura, conexión cortada, 5xx): una subida
+  puede haberse completado igual. Solo se reintentan si no se llegó a
+  conectar o con 429, salvo retry_unsafe=True.
+- Rate limit adaptativo por host antes de cada intento (ver rate_limit).
+- Timeouts por clase de endpoint (scrape, rscripts, raw, openai, roblox,
+  category, upload), sobreescribibles con HTTP_TIMEOUT_<CLASE>=segundos.
+
+Los GET de páginas scrapeadas pueden pasar por el cache en disco con GET
+condicional (ver http_cache). Todo el tráfico se puede grabar y reproducir
+offline con HTTP_CASSETTE (ver cassette).
+
+Los errores se comportan igual que con requests.get/post directo: si se
+agotan los reintentos se devuelve la última respuesta (el caller revisa
+status_code) o se relanza la última excepción.
+"""
+
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+import cassette
+import http_cache
+import metrics
+import rate_limit
+
+# Timeouts (segundos) por clase de endpoint
+TIMEOUTS = {
+    "default": 30,
+    "scrape": 30,
+    "rscripts": 15,
+    "raw": 20,
+    "openai": 15,
+    "roblox": 10,
+    "category": 30,
+    "upload": 60,
+}
+
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = 30.0
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Métodos que no se repiten a ciegas (ver _never_sent)
+UNSAFE_METHODS = frozenset({"POST", "PATCH"})
+
+# Conexiones vivas por host; alcanza para el crawl concurrente
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 32
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_timeout(kind: str) -> float:
+    env = os.getenv(f"HTTP_TIMEOUT_{kind.upper()}")
+    if env:
+        try:
+            return float(env)
+        except ValueError:
+            pass
+    return TIMEOUTS.get(kind, TIMEOUTS["default"])
+
+
+def get_session() -> requests.Session:
+    """Session global (lazy). urllib3 mantiene un pool por host dentro del adapter."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=POOL_CONNECTIONS,
+                    pool_maxsize=POOL_MAXSIZE,
+                    max_retries=0,  # los reintentos los maneja request()
+                )
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                _session = s
+    return _session
+
+
+def _backoff(attempt: int) -> float:
+    """Backoff exponencial con full jitter: U(0, base * 2^attempt)."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2**attempt)))
+
+
+def _never_sent(error: Exception) -> bool:
+    """True si el request no llegó al servidor (no se pudo conectar)."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _send(method: str, url: str, kind: str, retries: int | None, retry_unsafe: bool = False,
+          **kwargs):
+    retries = MAX_RETRIES if retries is None else retries
+    unsafe = method.upper() in UNSAFE_METHODS and not retry_unsafe
+    kwargs.setdefault("timeout", get_timeout(kind))
+    session = get_session()
+    tape = cassette.get_cassette()
+    stats = metrics.get_metrics()
+    host = urlparse(url).netloc.lower()
+    # En replay no hay red: no tiene sentido frenar
+    limiter = None if tape is not None and tape.replaying else rate_limit.get_limiter(host)
+
+    for attempt in range(retries + 1):
+        last = attempt >= retries
+        if limiter is not None:
+            waited = limiter.reserve()
+            if waited > 0:
+                with stats.stage("rate_limit_wait"):
+                    time.sleep(waited)
+        t0 = time.monotonic()
+        try:
+            if tape is not None and tape.replaying:
+                resp = tape.play(method, url, **kwargs)
+            else:
+                resp = session.request(method, url, **kwargs)
+                if tape is not None:
+                    resp = tape.record(method, url, resp, time.monotonic() - t0, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            elapsed = time.monotonic() - t0
+            stats.observe_http(host, elapsed)
+            if tape is not None and not tape.replaying:
+                tape.record_error(method, url, e, elapsed, **kwargs)
+            if last or (unsafe and not _never_sent(e)):
+                raise
+        else:
+            # Los bytes de las descargas en streaming los cuenta quien lee el body
+            nbytes = 0 if kwargs.get("stream") else len(resp.content or b"")
+            stats.observe_http(host, time.monotonic() - t0, resp.status_code, nbytes)
+            retry_after = None
+            if limiter is not None:
+                retry_after = limiter.feedback(resp.status_code, resp.headers.get("Retry-After"))
+            if resp.status_code not in RETRY_STATUSES or last:
+                return resp
+            if unsafe and resp.status_code != 429:
+                return resp  # el 5xx pudo llegar después de procesarlo
+            resp.close()
+            if retry_after is not None:
+                continue  # el próximo reserve() ya espera lo que pidió el host
+        time.sleep(_backoff(attempt))
+
+
+def _cached_get(cache, url: str, kind: str, retries: int | None, **kwargs):
+    """GET a través de http_cache: fresco -> disco, si no GET condicional."""
+    full_url = requests.Request("GET", url, params=kwargs.pop("params", None)).prepare().url
+    entry = cache.lookup(full_url)
+    if entry and cache.is_fresh(entry):
+        resp = cache.response_from(entry, full_url)
+        if resp is not None:
+            return resp
+        entry = None
+
+    headers = dict(kwargs.pop("headers", None) or {})
+    if entry:
+        headers.update(cache.conditional_headers(entry))
+    resp = _send("GET", full_url, kind, retries, headers=headers, **kwargs)
+
+    if resp.status_code == 304 and entry:
+        cache.refresh(full_url, resp)
+        cached = cache.response_from(entry, full_url, revalidated=True)
+        if cached is not None:
+            return cached
+        # El body se perdió del disco: repetir sin validadores
+        headers = {k: v for k, v in headers.items() if not k.startswith("If-")}
+        resp = _send("GET", full_url, kind, retries, headers=headers, **kwargs)
+    if resp.status_code == 200:
+        cache.store(full_url, resp)
+    return resp
+
+
+def request(method: str, url: str, kind: str = "default", retries: int | None = None,
+            retry_unsafe: bool = False, **kwargs):
+    """
+    Igual que requests.request pero con la Session compartida, timeout por
+    clase de endpoint y reintentos ante fallas transitorias. Los GET de las
+    clases en http_cache.CACHED_KINDS (salvo stream=True) pasan por el cache
+    en disco si está activado (HTTP_CACHE_DIR). retry_unsafe=True reintenta
+    un POST como cualquier otro request (solo si repetirlo es inofensivo).
+    """
+    # Las descargas en streaming no se cachean: el cache necesita el body entero.
+    # Con cassette activo tampoco (ver cassette.py).
+    if (
+        method.upper() == "GET"
+        and kind in http_cache.CACHED_KINDS
+        and not kwargs.get("stream")
+        and cassette.get_cassette() is None
+    ):
+        cache = http_cache.get_cache()
+        if cache is not None:
+            return _cached_get(cache, url, kind, retries, **kwargs)
+    return _send(method, url, kind, retries, retry_unsafe, **kwargs)
+
+
+def get(url: str, kind: str = "default", **kwargs):
+    return request("GET", url, kind=kind, **kwargs)
+
+
+def post(url: str, kind: str = "default", **kwargs):
+    return request("POST", url, kind=kind, **kwargs)
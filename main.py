@@ -1,359 +1,482 @@
-import json
+import argparse
 import os
-import re
+import signal
+import threading
 import time
-from datetime import datetime, timezone
-
-import requests
-from bs4 import BeautifulSoup
-
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import archive
+import cassette
+import dedup
+import http_cache
+import metrics
+import resolution_cache
+import upload_queue
+from categories import CategoryIndex, normalize_category
+from state_store import STATE_DB, StateStore
+from upload_client import UPLOAD_WORKERS, batch_size, upload_many
 from auto_uploader import (
+    AI_BATCH_SIZE,
+    build_game_index,
     create_category,
     detect_game,
-    format_category_name,
+    game_matcher_report,
+    register_game,
+    resolve_games_batch,
     sanitize_title,
-    upload_script,
 )
-from rscripts_source import fetch_raw_code, fetch_recent_verified
+from rscripts_source import RscriptsSource, fetch_raw_code
+from scriptpastebin_source import ScriptpastebinSource
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-}
+STATE_FILE = "last_run.json"
 
-OUTPUT_DIR = "scraped_scripts"
-if not os.path.exists(OUTPUT_DIR):
-    os.makedirs(OUTPUT_DIR)
+# Fuentes habilitadas (plugins, ver sources.py); corren en paralelo
+SOURCE_TYPES = [RscriptsSource, ScriptpastebinSource]
+# Records procesados a la vez por el pipeline compartido (todas las fuentes);
+# las subidas van por la cola con sus propios workers (UPLOAD_WORKERS)
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "8"))
 
-STATE_FILE = "last_run.json"
+# Categorías ya creadas en Bublox, por placeId (ver categories.py)
+# Se persiste en el StateStore para no re-crearlas en cada run
+CATEGORIES = CategoryIndex()
 
-# Categorias ya creadas en Bublox: {nombre_formateado -> placeid}
-# Se persiste en last_run.json para no re-crearlas en cada run
-KNOWN_CATEGORIES = {}
+# StateStore del run en curso (state.db); last_run.json es su snapshot
+STATE = None
 
 
 def load_state():
-    if os.path.exists(STATE_FILE):
-        try:
-            with open(STATE_FILE, "r") as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
+    """Abre state.db e importa last_run.json si cambió (migración / run en CI)."""
+    store = StateStore(STATE_DB)
+    if store.import_json(STATE_FILE):
+        print(f"[INFO] Estado importado desde {STATE_FILE} a {STATE_DB}.")
+    return store
 
 
-def save_state(data):
+def save_state(store):
+    """Exporta el snapshot compacto que commitean los workflows."""
     try:
-        with open(STATE_FILE, "w") as f:
-            json.dump(data, f, indent=2)
+        store.export_json(STATE_FILE)
     except Exception as e:
         print(f"Warning: Could not save state: {e}")
 
 
-def get_soup(url):
-    try:
-        response = requests.get(url, headers=HEADERS, timeout=30)
-        return BeautifulSoup(response.text, "html.parser")
-    except Exception as e:
-        print(f"    [ERROR] fetching {url}: {e}")
-        return None
-
-
-def ensure_category_exists(game_name: str, placeid: int) -> str:
+def ensure_category_exists(game_name: str, placeid: int):
     """
-    Verifica si la categoria existe localmente. Si no, la crea via API.
-    Retorna el nombre formateado de la categoria.
+    Busca la categoría del juego (por placeId o alias normalizado). Retorna
+    (nombre, estado): "ready", "pending" (se crea al final del run con
+    create_pending_categories) o "failed".
     """
-    formatted = format_category_name(game_name)
-    if formatted not in KNOWN_CATEGORIES:
-        print(f"      [NUEVA CAT]: '{formatted}' no existe, creando...")
-        ok = create_category(formatted, placeid)
+    name, status = CATEGORIES.request(game_name, placeid)
+    if status == "pending":
+        print(f"      [NUEVA CAT]: '{name}' no existe, se crea al final del run")
+    return name, status
+
+
+def create_pending_categories() -> int:
+    """Crea juntas (en paralelo) las categorías pedidas durante el run. Retorna cuántas."""
+    pending = CATEGORIES.take_pending()
+    if not pending:
+        return 0
+    print(f"[CAT] Creando {len(pending)} categorias nuevas...")
+    with metrics.stage("category"), ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as pool:
+        results = list(pool.map(lambda p: create_category(p[1], p[0]), pending.items()))
+    for (placeid, name), ok in zip(pending.items(), results):
         if ok:
-            KNOWN_CATEGORIES[formatted] = placeid
+            CATEGORIES.add(name, placeid)
+            if STATE is not None:
+                STATE.add_category(name, placeid)
+                STATE.add_category_alias(normalize_category(name), placeid)
+            register_game(name, placeid, display=name)
         else:
-            print(f"      [ERROR CAT]: No se pudo crear '{formatted}'")
-            return None
-    return formatted
+            print(f"      [ERROR CAT]: No se pudo crear '{name}'")
+            CATEGORIES.mark_failed(placeid)
+    return sum(results)
 
 
-def save_script(title, code):
-    clean_title = sanitize_title(title)
-    safe_title = re.sub(r'[<>:"/\\|?*]', "", clean_title).strip()
-    if len(safe_title) > 100:
-        safe_title = safe_title[:100]
-    filepath = os.path.join(OUTPUT_DIR, f"{safe_title}.lua")
-
-    try:
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(code)
-        print(f"      [SAVED]: {filepath}")
-    except:
-        pass
+# ───── pipeline compartido: código -> dedup -> juego -> categoría -> subida ─────
 
-    # Detectar el juego desde el titulo original (sin sanitizar) para no perder pistas
-    game_name, placeid = detect_game(title)
 
-    if not game_name:
-        print(f"      [SKIP]: No se reconocio ningun juego en '{title}'")
-        return
-
-    # Verificar/crear categoria antes de subir el script
-    category = ensure_category_exists(game_name, placeid)
-    if not category:
-        return
-
-    print(f"      [UPLOAD]: '{clean_title}' -> categoria '{category}'")
-    upload_script(title, [category], code)
-
-
-def scrape_tertiary(url, title):
-    if not url or (
-        url.startswith("https://scriptpastebin.com")
-        and "scriptpastebins.com" not in url
+def _prepare(source, record):
+    """
+    Resuelve código y juego de un record y lo encola para subir. Retorna el
+    outcome: "queued" o el motivo del descarte.
+    """
+    title = record["title"]
+    code = record["code"]
+    scripts = archive.get_archive()
+    writer = None
+    if not code:
+        # El raw se archiva mientras baja (sin recomprimir el string entero)
+        writer = scripts.writer()
+        try:
+            with metrics.stage("fetch"):
+                code = fetch_raw_code(record["code_url"], sink=writer)
+        except Exception:
+            writer.abort()
+            raise  # transitorio: "error", se reintenta
+    if not code:
+        if writer is not None:
+            writer.abort()
+        print(f"  [SKIP] '{title[:60]}': sin código (raw vacío, binario, enorme o borrado)")
+        return "no_code"
+    scripts.put(code, source.name, record["id"], title, record["game"], writer=writer)
+
+    index = dedup.get_index()
+    game_name, placeid = record["game"], record["place_id"]
+    if not game_name or not placeid:
+        # Dedup antes de gastar IA/Roblox en un script que ya subimos
+        with metrics.stage("dedup"):
+            kind, match = index.check(code)
+        if kind:
+            print(f"  [SKIP DUP {kind}] '{title[:60]}': ya subido como '{match[2]}' ({match[0]})")
+            return "duplicate"
+        # Detectar el juego desde el titulo original (sin sanitizar) para no perder pistas
+        with metrics.stage("detect"):
+            game_name, placeid = detect_game(title)
+        if not game_name:
+            print(f"  [SKIP] No se reconocio ningun juego en '{title}'")
+            return "no_game"
+        scripts.set_game(source.name, record["id"], game_name)
+
+    # claim: otro worker (u otra fuente) pudo haber subido el mismo código
+    with metrics.stage("dedup"):
+        kind, match = index.claim(code, source.name, record["id"], title)
+    if kind:
+        print(f"  [SKIP DUP {kind}] '{title[:60]}': ya subido como '{match[2]}' ({match[0]})")
+        return "duplicate"
+
+    # La categoría y la subida las hacen los workers de la cola
+    key = source.upload_key(record, code)
+    if not upload_queue.get_queue().enqueue(
+        key, source.name, record["id"], title, game_name, placeid, code
     ):
-        return
-    soup = get_soup(url)
-    if not soup:
-        return
+        index.release(code)
+        print(f"  [SKIP] '{title[:60]}': ya está en la cola de subidas")
+        return "duplicate"
+    print(f"  [QUEUED]: '{sanitize_title(title)[:80]}' -> '{game_name}'")
+    return "queued"
 
-    code = None
-    textareas = soup.find_all("textarea")
-    if textareas:
-        for ta in textareas:
-            c = ta.get_text(strip=True)
-            if len(c) > 10:
-                code = c
-                break
-    if not code:
-        pres = soup.find_all("pre")
-        if pres:
-            code = pres[0].get_text(strip=True)
 
-    if code:
-        save_script(title, code)
-    else:
-        print("      No code found on tertiary page.")
+def _safe_prepare(source, record):
+    try:
+        return _prepare(source, record)
+    except Exception as e:
+        # Un record roto no debe tumbar el resto de la fuente
+        print(f"  [ERROR] {source.name} '{record['title'][:60]}': {e}")
+        return "error"
 
 
-def scrape_detail(url):
-    soup = get_soup(url)
-    if not soup:
-        return
+def process_source(source, state, pool):
+    """
+    Corre una fuente completa: records() -> _prepare (hasta la cola de
+    subidas) en el pool compartido -> on_result() por record y finish().
+    Los records se mandan al pool a medida que la fuente los produce (la
+    fuente puede seguir paginando mientras tanto); los que no traen juego
+    se juntan de a AI_BATCH_SIZE para identificarlos con la IA en batch
+    (salvo que su código ya esté en el índice de dedup).
+    Retorna las estadísticas.
+    """
 
-    today_str = datetime.now().strftime("%Y-%m-%d")
-    post_date = None
-    time_tag = soup.find("time", class_="entry-date") or soup.find(
-        "time", class_="published"
+    def submit(batch):
+        return [(r, pool.submit(_safe_prepare, source, r)) for r in batch]
+
+    def resolve_and_submit(batch):
+        with metrics.stage("detect"):
+            asked = resolve_games_batch([r["title"] for r in batch])
+        if asked:
+            print(f"[AI] {asked} titulos resueltos en batch.")
+        return submit(batch)
+
+    with metrics.stage(source.name):
+        submitted, unknown = [], []
+        for r in source.records(state):
+            if r["game"] and r["place_id"]:
+                submitted += submit([r])
+                continue
+            if r["code"]:
+                with metrics.stage("dedup"):
+                    kind, _ = dedup.get_index().check(r["code"])
+                if kind:
+                    # Ya subido: _prepare lo descarta sin gastar la IA en su título
+                    submitted += submit([r])
+                    continue
+            unknown.append(r)
+            if len(unknown) >= AI_BATCH_SIZE:
+                submitted += resolve_and_submit(unknown)
+                unknown = []
+        if unknown:
+            submitted += resolve_and_submit(unknown)
+
+        counts = {}
+        for r, future in submitted:
+            outcome = future.result()
+            counts[outcome] = counts.get(outcome, 0) + 1
+            if outcome == "queued":
+                metrics.incr(f"{source.name}_queued")
+            else:
+                metrics.skip(source.name, outcome)
+            source.on_result(state, r, outcome)
+        source.finish(state)
+
+    stats = {
+        "records": len(submitted),
+        "queued": counts.pop("queued", 0),
+        "skipped": {**source.skipped, **counts},
+    }
+    print(
+        f"[{source.name}] records: {stats['records']} | encolados: {stats['queued']} | "
+        "descartados: "
+        + (", ".join(f"{k}={v}" for k, v in sorted(stats["skipped"].items())) or "0")
     )
+    return stats
 
-    if time_tag and time_tag.has_attr("datetime"):
-        post_date = time_tag["datetime"][:10]
-
-    if post_date:
-        if post_date != today_str:
-            print(
-                f"    [SKIP DATE]: Script date {post_date} is not today ({today_str})."
-            )
-            return
-        else:
-            print(f"    [DATE OK]: {post_date}")
-    else:
-        print("    [WARNING]: Could not extract date. Proceeding with caution...")
-
-    target_title = "Unknown Script"
-
-    button = soup.find("a", string=lambda t: t and "Get Script" in t)
-    if not button:
-        button = soup.find(
-            "a", class_=lambda c: c and "button" in c and "wp-block-button__link" in c
-        )
-
-    if button:
-        container = button
-        for _ in range(3):
-            if container.parent and (
-                "buttons" in container.parent.get("class", [])
-                or "entry-content" in container.parent.get("class", [])
-            ):
-                break
-            container = container.parent
-
-        curr = container
-        found = False
-        limit = 5
-        while curr and limit > 0:
-            curr = curr.previous_sibling
-            if curr and curr.name in [
-                "p",
-                "div",
-                "h4",
-                "h3",
-                "h2",
-                "h1",
-                "strong",
-                "span",
-            ]:
-                text = curr.get_text(strip=True)
-                if text and len(text) > 3 and "Step" not in text:
-                    target_title = text
-                    found = True
-                    break
-            limit -= 1
 
-        if found:
-            print(f"    [TITLE ABOVE]: {target_title}")
-        else:
-            h1 = soup.find("h1")
-            if h1:
-                target_title = h1.get_text(strip=True)
-                print(f"    [FALLBACK H1]: {target_title}")
-
-        target_link = button.get("href")
-        scrape_tertiary(target_link, target_title)
-    else:
-        h1 = soup.find("h1")
-        if h1:
-            target_title = h1.get_text(strip=True)
-        scrape_tertiary(url, target_title)
-
-
-def run_rscripts(state, max_pages=3):
+def _deliver(jobs):
     """
-    Sube los scripts de rscripts.net publicados HOY cumpliendo:
-    - verifiedOnly=1 (autores verificados)
-    - noKeySystem=1 (sin sistema de keys)
-    - orderBy=date sort=desc + filtro lastUpdated >= hoy 00:00 UTC
-    Dedup: persiste set de _id ya subidos en state['rscripts_uploaded_ids'].
-    Como la API ordena desc, en cuanto encontramos uno anterior a hoy
-    cortamos la paginación.
+    Worker de la cola: sube los jobs cuya categoría existe. Un (ok, error)
+    por job; ok=None deja el job esperando la creación de su categoría.
     """
-    today_str = datetime.now(timezone.utc).date().isoformat()
-    seen_ids = set(state.get("rscripts_uploaded_ids", []))
-    new_uploaded = 0
-    skipped_seen = 0
-    skipped_nogame = 0
-    skipped_norawcode = 0
-    skipped_old = 0
-
-    print(f"[rscripts] filtrando solo lastUpdated == {today_str} (UTC)")
-    print(f"[rscripts] {len(seen_ids)} IDs previamente subidos.")
-
-    # NO romper el loop al primer "no-hoy": la API mezcla scripts pinneados al
-    # principio, así que iteramos toda la paginación y skipeamos por fecha.
-    for s in fetch_recent_verified(max_pages=max_pages):
-        last_updated = (s.get("lastUpdated") or "")[:10]
-        sid = s.get("_id")
-        title = (s.get("title") or "").strip()
-        if not sid or not title:
+    results = [None] * len(jobs)
+    ready = []
+    for i, job in enumerate(jobs):
+        category, status = ensure_category_exists(job["game"], job["place_id"])
+        if status == "pending":
+            results[i] = (None, "category_pending")  # espera al batch de categorías
             continue
-
-        if last_updated != today_str:
-            skipped_old += 1
-            continue
-
-        if sid in seen_ids:
-            skipped_seen += 1
-            continue
-
-        game = s.get("game") or {}
-        game_name = (game.get("title") or "").strip()
-        place_id = game.get("placeId")
-        try:
-            place_id = int(place_id) if place_id is not None else None
-        except (TypeError, ValueError):
-            place_id = None
-
-        if not game_name or not place_id:
-            print(f"  [SKIP] '{title[:60]}': sin game/placeId")
-            skipped_nogame += 1
+        if status == "failed":
+            results[i] = (False, "category_failed")
             continue
+        print(f"  [UPLOAD]: '{sanitize_title(job['title'])[:80]}' -> '{category}'")
+        ready.append(
+            (i, {"title": job["title"], "categories": [category], "code": job["code"],
+                 "key": job["key"]})
+        )
+    if ready:
+        with metrics.stage("upload"):
+            uploaded = upload_many([item for _, item in ready], workers=1)
+        for (i, _), res in zip(ready, uploaded):
+            results[i] = (res["ok"], None if res["ok"] else res.get("error") or "upload_failed")
+    return results
 
-        raw_url = s.get("rawScript")
-        code = fetch_raw_code(raw_url)
-        if not code:
-            print(f"  [SKIP] '{title[:60]}': raw vacío o inaccesible")
-            skipped_norawcode += 1
-            continue
 
-        category = ensure_category_exists(game_name, place_id)
-        if not category:
-            seen_ids.add(sid)
-            continue
+def _on_dead(job):
+    # Ya no se va a subir: el código deja de contar como subido en el dedup
+    dedup.get_index().release(job["code"])
+    metrics.incr("upload_dead")
 
-        clean_title = sanitize_title(title)
-        print(f"  [UPLOAD]: '{clean_title[:80]}' -> '{category}'")
-        ok = upload_script(title, [category], code)
-        if ok:
-            seen_ids.add(sid)
-            new_uploaded += 1
-        time.sleep(1)
 
-    state["rscripts_uploaded_ids"] = sorted(seen_ids)
+def run_sources(sources, state):
+    """
+    Corre las fuentes en paralelo (una por thread) sobre el mismo pipeline:
+    el run tarda lo que la fuente más lenta. Una fuente que falla no frena
+    a las demás; queda {"error": ...} en sus estadísticas.
+
+    Mientras tanto los workers de la cola (UPLOAD_WORKERS) suben lo que las
+    fuentes van encolando, más lo que quedó pendiente de corridas anteriores.
+    Al final se crean juntas las categorías nuevas y se suben los scripts
+    que las esperaban.
+    """
+    stats = {}
+    if not sources:
+        return stats
+    queue = upload_queue.get_queue()
+    CATEGORIES.reset_failed()
+    scraped = threading.Event()
+    with ThreadPoolExecutor(max_workers=PIPELINE_WORKERS) as pool, ThreadPoolExecutor(
+        max_workers=len(sources) + 1
+    ) as runners:
+        draining = runners.submit(
+            queue.drain, _deliver, UPLOAD_WORKERS, batch_size(), scraped, _on_dead
+        )
+        futures = {src.name: runners.submit(process_source, src, state, pool) for src in sources}
+        for name, future in futures.items():
+            try:
+                stats[name] = future.result()
+            except Exception as e:
+                print(f"[ERROR] {name}: {e}")
+                stats[name] = {"error": str(e)}
+        scraped.set()
+        delivered = [draining.result()]
+
+    create_pending_categories()
+    if queue.release_waiting():
+        delivered.append(queue.drain(_deliver, UPLOAD_WORKERS, batch_size(), on_dead=_on_dead))
+
+    for counts_by_source in delivered:
+        for name, counts in counts_by_source.items():
+            st = stats.setdefault(name, {})
+            for k, n in counts.items():
+                st[k] = st.get(k, 0) + n
+    for name, st in stats.items():
+        if "error" not in st:
+            for k in ("uploaded", "retrying", "dead"):
+                st.setdefault(k, 0)
+            print(f"[{name}] subidos: {st['uploaded']} | reintento: {st['retrying']} | "
+                  f"dead: {st['dead']}")
+    print(f"[QUEUE] Estado de la cola: {queue.counts() or 'vacía'}")
+    return stats
+
+
+def _open_run(state):
+    """Deja el StateStore, las categorías y el índice de juegos listos para procesar."""
+    global CATEGORIES, STATE
+
+    STATE = state
+    # Cargar categorias conocidas desde el estado persistido, colapsando
+    # los nombres repetidos de un mismo placeId
+    CATEGORIES = CategoryIndex.reconcile(state.categories(), state.category_aliases())
+    if CATEGORIES.collapsed:
+        state.replace_categories(CATEGORIES.categories(), CATEGORIES.aliases)
+        print(f"[INFO] Categorias reconciliadas: {CATEGORIES.collapsed} nombres duplicados "
+              "pasaron a ser alias.")
+    print(f"[INFO] {len(CATEGORIES)} categorias conocidas cargadas desde estado.")
+    index = build_game_index(CATEGORIES.categories())
+    for alias, placeid in CATEGORIES.aliases.items():
+        index.add(alias, placeid, display=CATEGORIES.by_place[placeid])
+    print(f"[INFO] Indice de juegos: {index.size} nombres.")
+
+
+def _persist(state, status, stats):
+    """Exporta estado, caches y el reporte del run (al final del run o de cada tick)."""
+    save_state(state)
+    page_cache = http_cache.get_cache()
+    if page_cache is not None:
+        page_cache.flush()
+        print(f"[INFO] Cache HTTP: {page_cache.report()}")
+    tape = cassette.get_cassette()
+    if tape is not None:
+        tape.save()
+        print(f"[INFO] Cassette HTTP: {tape.report()}")
+    cache = resolution_cache.get_cache()
+    cache.save()
     print(
-        f"[rscripts] subidos hoy: {new_uploaded} | ya vistos: {skipped_seen} | "
-        f"sin juego: {skipped_nogame} | sin raw: {skipped_norawcode} | "
-        f"no-hoy descartados: {skipped_old}"
+        f"[INFO] Cache de juegos: {cache.hits} hits / {cache.misses} misses "
+        f"(hit ratio {cache.hit_ratio():.0%})"
     )
 
+    # Reporte del run (junto al archivo de estado) + textfile de Prometheus opcional
+    report = metrics.get_metrics().write(
+        extra={
+            "status": status,
+            "sources": stats,
+            "resolution_cache": {"hits": cache.hits, "misses": cache.misses},
+            "game_matcher": game_matcher_report(),
+            "http_cache": None if page_cache is None else {
+                "fresh": page_cache.hits,
+                "revalidated": page_cache.revalidated,
+                "misses": page_cache.misses,
+                "bytes_saved": page_cache.bytes_saved,
+            },
+        }
+    )
+    print(f"[INFO] Reporte del run en {metrics.RUN_REPORT_FILE} ({report['duration_s']:.1f}s)")
 
-def main():
-    global KNOWN_CATEGORIES
 
+def main():
     state = load_state()
     last_run_date = state.get("last_successful_run", "")
     today_str = datetime.now().strftime("%Y-%m-%d")
 
     if last_run_date == today_str:
         print(f"[INFO] Script already ran successfully today ({today_str}). Exiting.")
+        state.close()
         return
 
-    # Cargar categorias conocidas desde el estado persistido
-    KNOWN_CATEGORIES = state.get("known_categories", {})
-    print(f"[INFO] {len(KNOWN_CATEGORIES)} categorias conocidas cargadas desde estado.")
+    _open_run(state)
+    run_id = state.start_run()
+    stats = {}
+    status = "success"
 
     try:
-        # ───── Fuente 1: rscripts.net API (verificados, sin keys, recientes) ─────
-        print("\n=== rscripts.net ===")
-        run_rscripts(state)
-
-        # ───── Fuente 2: scriptpastebin.com (HTML scrape, fallback) ─────
-        print("\n=== scriptpastebin.com ===")
-        base_url = "https://scriptpastebin.com/"
-        print(f"Fetching homepage: {base_url}")
-        soup = get_soup(base_url)
-        if soup:
-            article = soup.find("article")
-            items = []
-            if article:
-                headers = article.find_all("h3")
-                for h in headers:
-                    a = h.find("a")
-                    if a:
-                        items.append({"link": a.get("href")})
-            else:
-                headers = soup.find_all("h3")
-                for h in headers:
-                    a = h.find("a")
-                    if a:
-                        items.append({"link": a.get("href")})
+        print(f"\n=== Fuentes: {', '.join(cls.name for cls in SOURCE_TYPES)} ===")
+        stats = run_sources([cls() for cls in SOURCE_TYPES], state)
+        if any("error" in st for st in stats.values()):
+            status = "error"
+        else:
+            state.set("last_successful_run", today_str)
+        state.finish_run(run_id, status, stats)
+        if status == "success":
+            print(f"[SUCCESS] Process completed for {today_str}. State saved.")
+
+    except Exception as e:
+        print(f"[ERROR] {e}")
+        # Categorias y dedup ya quedaron en state.db; exportar el snapshot igual
+        status = "error"
+        state.finish_run(run_id, "error", {**stats, "error": str(e)})
 
-            print(f"Found {len(items)} items. Processing...")
+    _persist(state, status, stats)
+    state.close()
+    dedup.get_index().close()
+    upload_queue.get_queue().close()
+    archive.get_archive().close()
 
-            for i, item in enumerate(items):
-                print(f"Processing Item {i + 1}...")
-                scrape_detail(item["link"])
-                time.sleep(1)
 
-        state["last_successful_run"] = today_str
-        state["known_categories"] = KNOWN_CATEGORIES
-        save_state(state)
-        print(f"[SUCCESS] Process completed for {today_str}. State saved.")
+# ───── modo daemon ─────
 
-    except Exception as e:
-        print(f"[ERROR] {e}")
-        # Guardar categorias y dedup aunque haya error, para no perderlas
-        state["known_categories"] = KNOWN_CATEGORIES
-        save_state(state)
+_STOP = threading.Event()
+
+
+def _request_stop(signum, frame):
+    print(f"[INFO] Señal {signum} recibida: se termina al cerrar el tick actual.")
+    _STOP.set()
+
+
+def run_daemon(intervals=None, max_ticks=None):
+    """
+    Proceso de larga vida: estado, caches, índice de juegos y conexiones
+    quedan en memoria y cada fuente se consulta en su intervalo
+    (Source.poll_seconds, o intervals={nombre: segundos}); las que tocan en
+    el mismo tick corren en paralelo. Cada tick procesa solo lo nuevo
+    (watermark de rscripts, links vistos de scriptpastebin) y persiste
+    estado, caches y reporte. SIGTERM / SIGINT terminan el tick en curso y
+    cierran limpio.
+    """
+    every = {cls.name: (intervals or {}).get(cls.name, cls.poll_seconds) for cls in SOURCE_TYPES}
+    _STOP.clear()
+    previous = {}
+    if threading.current_thread() is threading.main_thread():
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            previous[sig] = signal.signal(sig, _request_stop)
+
+    state = load_state()
+    _open_run(state)
+    next_due = {name: 0.0 for name in every}
+    ticks = 0
+    print("[INFO] Daemon iniciado: " + ", ".join(f"{n} cada {s}s" for n, s in every.items()))
+    try:
+        while not _STOP.is_set():
+            due = [cls() for cls in SOURCE_TYPES if next_due[cls.name] <= time.monotonic()]
+            if due:
+                run_id = state.start_run()
+                stats = run_sources(due, state)
+                for src in due:
+                    next_due[src.name] = time.monotonic() + every[src.name]
+                status = "error" if any("error" in st for st in stats.values()) else "success"
+                if status == "success":
+                    state.set("last_successful_run", datetime.now().strftime("%Y-%m-%d"))
+                state.finish_run(run_id, status, stats)
+                _persist(state, status, stats)
+                ticks += 1
+                if max_ticks and ticks >= max_ticks:
+                    break
+            _STOP.wait(max(0.0, min(next_due.values()) - time.monotonic()))
+    finally:
+        state.close()
+        dedup.get_index().close()
+        upload_queue.get_queue().close()
+        archive.get_archive().close()
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+        print(f"[INFO] Daemon detenido tras {ticks} ticks.")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Scraper + uploader de scripts")
+    parser.add_argument(
+        "--daemon", action="store_true", help="quedarse corriendo y consultar las fuentes en intervalos"
+    )
+    if parser.parse_args().daemon:
+        run_daemon()
+    else:
+        main()
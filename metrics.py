@@ -0,0 +1,214 @@
+"""
+Instrumentación del run: tiempos por etapa, latencia HTTP por host, bytes
+transferidos y skips por motivo.
+
+- stage(nombre): context manager que acumula tiempo de pared por etapa
+  (fetch, parse, detect, dedup, category, upload y las fases rscripts /
+  scriptpastebin). En las etapas que corren en el pool de threads el total
+  es la suma de lo que tardó cada thread, no el tiempo de reloj del run.
+- observe_http(): lo llama http_client en cada intento; histograma de
+  latencia por host con buckets fijos.
+- skip(source, reason) / incr(nombre): contadores.
+
+Al final del run main.py escribe el reporte JSON junto al archivo de estado
+(RUN_REPORT_FILE, default run_report.json) y, si METRICS_TEXTFILE está
+configurado, el mismo contenido en formato textfile de Prometheus (para el
+textfile collector de node_exporter).
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+RUN_REPORT_FILE = os.getenv("RUN_REPORT_FILE", "run_report.json")
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE", "")
+
+# Límites superiores (segundos) de los buckets del histograma de latencia
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROM_PREFIX = "scraper"
+
+
+def _new_host():
+    return {
+        "requests": 0,
+        "errors": 0,
+        "bytes": 0,
+        "latency_sum_s": 0.0,
+        "buckets": [0] * (len(LATENCY_BUCKETS) + 1),  # el último es +Inf
+        "status": {},
+    }
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.stages = {}
+        self.hosts = {}
+        self.skips = {}
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                st = self.stages.setdefault(name, {"count": 0, "total_s": 0.0, "max_s": 0.0})
+                st["count"] += 1
+                st["total_s"] += elapsed
+                st["max_s"] = max(st["max_s"], elapsed)
+
+    def observe_http(self, host: str, seconds: float, status=None, nbytes: int = 0):
+        """status=None significa error de conexión / timeout."""
+        bucket = next(
+            (i for i, le in enumerate(LATENCY_BUCKETS) if seconds <= le), len(LATENCY_BUCKETS)
+        )
+        with self._lock:
+            h = self.hosts.setdefault(host, _new_host())
+            h["requests"] += 1
+            h["latency_sum_s"] += seconds
+            h["buckets"][bucket] += 1
+            h["bytes"] += nbytes
+            if status is None:
+                h["errors"] += 1
+            else:
+                key = str(status)
+                h["status"][key] = h["status"].get(key, 0) + 1
+
+    def add_bytes(self, host: str, nbytes: int):
+        with self._lock:
+            self.hosts.setdefault(host, _new_host())["bytes"] += nbytes
+
+    def skip(self, source: str, reason: str):
+        with self._lock:
+            by_reason = self.skips.setdefault(source, {})
+            by_reason[reason] = by_reason.get(reason, 0) + 1
+
+    def incr(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    # ── salida ──
+    def report(self, extra: dict | None = None) -> dict:
+        with self._lock:
+            data = {
+                "started": datetime.fromtimestamp(self.started, timezone.utc).isoformat(
+                    timespec="seconds"
+                ),
+                "duration_s": round(time.time() - self.started, 3),
+                "stages": {k: dict(v) for k, v in self.stages.items()},
+                "hosts": {
+                    k: {**v, "buckets": list(v["buckets"]), "status": dict(v["status"])}
+                    for k, v in self.hosts.items()
+                },
+                "latency_buckets_s": list(LATENCY_BUCKETS),
+                "skips": {k: dict(v) for k, v in self.skips.items()},
+                "counters": dict(self.counters),
+            }
+        data.update(extra or {})
+        return data
+
+    def prometheus(self, report: dict | None = None) -> str:
+        r = report or self.report()
+        p = PROM_PREFIX
+        lines = [
+            f"# TYPE {p}_run_duration_seconds gauge",
+            f"{p}_run_duration_seconds {r['duration_s']}",
+            f"# TYPE {p}_stage_seconds_total gauge",
+        ]
+        lines += [
+            f'{p}_stage_seconds_total{{stage="{k}"}} {v["total_s"]:.6f}'
+            for k, v in sorted(r["stages"].items())
+        ]
+        lines.append(f"# TYPE {p}_stage_calls_total gauge")
+        lines += [
+            f'{p}_stage_calls_total{{stage="{k}"}} {v["count"]}'
+            for k, v in sorted(r["stages"].items())
+        ]
+        lines.append(f"# TYPE {p}_http_request_duration_seconds histogram")
+        for host, h in sorted(r["hosts"].items()):
+            cumulative = 0
+            for le, n in zip(list(LATENCY_BUCKETS) + ["+Inf"], h["buckets"]):
+                cumulative += n
+                lines.append(
+                    f'{p}_http_request_duration_seconds_bucket{{host="{host}",le="{le}"}} '
+                    f"{cumulative}"
+                )
+            lines.append(
+                f'{p}_http_request_duration_seconds_sum{{host="{host}"}} {h["latency_sum_s"]:.6f}'
+            )
+            lines.append(f'{p}_http_request_duration_seconds_count{{host="{host}"}} {h["requests"]}')
+        lines.append(f"# TYPE {p}_http_bytes_total gauge")
+        lines += [
+            f'{p}_http_bytes_total{{host="{host}"}} {h["bytes"]}'
+            for host, h in sorted(r["hosts"].items())
+        ]
+        lines.append(f"# TYPE {p}_http_errors_total gauge")
+        lines += [
+            f'{p}_http_errors_total{{host="{host}"}} {h["errors"]}'
+            for host, h in sorted(r["hosts"].items())
+        ]
+        lines.append(f"# TYPE {p}_skips_total gauge")
+        for source, reasons in sorted(r["skips"].items()):
+            lines += [
+                f'{p}_skips_total{{source="{source}",reason="{reason}"}} {n}'
+                for reason, n in sorted(reasons.items())
+            ]
+        lines.append(f"# TYPE {p}_events_total gauge")
+        lines += [
+            f'{p}_events_total{{event="{k}"}} {v}' for k, v in sorted(r["counters"].items())
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str = None, textfile: str = None, extra: dict | None = None) -> dict:
+        """Escribe el reporte JSON (y el textfile de Prometheus si corresponde)."""
+        path = RUN_REPORT_FILE if path is None else path
+        textfile = METRICS_TEXTFILE if textfile is None else textfile
+        data = self.report(extra)
+        for target, text in (
+            (path, json.dumps(data, indent=2, sort_keys=True)),
+            (textfile, self.prometheus(data) if textfile else None),
+        ):
+            if not target:
+                continue
+            tmp = target + ".tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(text)
+                # rename atómico: el collector nunca lee un archivo a medias
+                os.replace(tmp, target)
+            except OSError as e:
+                print(f"Warning: Could not write metrics to {target}: {e}")
+        return data
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics()
+    return _metrics
+
+
+# Atajos sobre el Metrics global
+def stage(name: str):
+    return get_metrics().stage(name)
+
+
+def skip(source: str, reason: str):
+    get_metrics().skip(source, reason)
+
+
+def incr(name: str, n: int = 1):
+    get_metrics().incr(name, n)
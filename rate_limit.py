@@ -0,0 +1,135 @@
+"""
+Rate limiter adaptativo por host (token bucket).
+
+Reemplaza las pausas fijas (1 request/s para todo): cada host tiene su propio
+balde con la tasa configurada en RATE_LIMITS (requests/segundo, ráfaga de
+hasta BURST_SECONDS de tokens) y se usa tan rápido como ese host lo permite.
+
+Adaptativo (AIMD):
+- ante 429 / 503 la tasa del host se divide por 2 (hasta MIN_RATE) y, si
+  vino Retry-After, el host queda bloqueado hasta ese momento;
+- cada respuesta buena la sube un 5% de la tasa configurada, hasta volver a
+  la original.
+
+Lo usa http_client antes de cada intento (no en replay de cassette).
+Overrides: RATE_LIMITS="rscripts.net=2,api.openai.com=1" (sufijo de host).
+"""
+
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# requests/segundo por sufijo de host; el resto usa DEFAULT_RATE
+RATE_LIMITS = {
+    "scriptpastebin.com": 4.0,
+    "scriptpastebins.com": 4.0,
+    "rscripts.net": 4.0,
+    "roblox.com": 8.0,
+    "api.openai.com": 5.0,
+    "run.app": 10.0,  # Cloud Run (categorías / scripts)
+}
+DEFAULT_RATE = 10.0
+MIN_RATE = 0.2
+BURST_SECONDS = 1.0
+RETRY_AFTER_MAX = 120.0
+THROTTLE_STATUSES = frozenset({429, 503})
+
+
+def _load_overrides():
+    for part in os.getenv("RATE_LIMITS", "").split(","):
+        host, _, rate = part.strip().partition("=")
+        try:
+            RATE_LIMITS[host.strip().lower()] = float(rate)
+        except ValueError:
+            pass
+
+
+_load_overrides()
+
+
+def configured_rate(host: str) -> float:
+    host = host.lower().split(":")[0]
+    best = None
+    for suffix, rate in RATE_LIMITS.items():
+        if host == suffix or host.endswith("." + suffix):
+            if best is None or len(suffix) > len(best[0]):
+                best = (suffix, rate)
+    return best[1] if best else DEFAULT_RATE
+
+
+def parse_retry_after(value) -> float | None:
+    """Segundos a esperar según Retry-After (segundos o fecha HTTP)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), RETRY_AFTER_MAX)
+
+
+class HostLimiter:
+    def __init__(self, rate: float):
+        self.max_rate = rate
+        self.rate = rate
+        self.tokens = rate * BURST_SECONDS
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(
+            self.rate * BURST_SECONDS, self.tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Toma un token y retorna cuántos segundos hay que esperar para usarlo."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            deficit = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(deficit, self.blocked_until - now)
+
+    def acquire(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def feedback(self, status: int, retry_after=None) -> float | None:
+        """
+        Ajusta la tasa según la respuesta. Retorna los segundos de Retry-After
+        si el host pidió esperar (el próximo acquire ya los respeta).
+        """
+        with self._lock:
+            if status in THROTTLE_STATUSES:
+                self.rate = max(MIN_RATE, self.rate / 2)
+                self.tokens = min(self.tokens, 0.0)
+                delay = parse_retry_after(retry_after)
+                if delay is not None:
+                    self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+                return delay
+            if status < 500:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+            return None
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(host: str) -> HostLimiter:
+    host = host.lower()
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = HostLimiter(configured_rate(host))
+            _limiters[host] = limiter
+    return limiter
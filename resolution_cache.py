@@ -0,0 +1,133 @@
+"""
+Cache persistente (entre runs) de resolución de juegos.
+
+Dos tablas en un JSON al lado del estado:
+- titles: fingerprint del título -> nombre del juego que respondió la IA
+- places: nombre del juego (lower) -> placeId encontrado en Roblox
+
+Los resultados negativos (la IA respondió UNKNOWN, Roblox no encontró el
+juego) también se guardan, con un TTL más corto, para no repetir
+round-trips que ya fallaron. Un error de transporte (timeout, 429, 5xx,
+circuito abierto) no es un negativo: se devuelve FAILED y no se cachea. Cada tabla tiene un máximo de entradas y desaloja las usadas
+hace más tiempo (LRU, usando el orden de inserción del dict).
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+CACHE_FILE = os.getenv("RESOLUTION_CACHE_FILE", "game_cache.json")
+POSITIVE_TTL = 30 * 86400
+NEGATIVE_TTL = 2 * 86400
+MAX_ENTRIES = 5000
+
+# Valor centinela: "no está en cache" (None es un negativo cacheado)
+MISS = object()
+# Valor centinela: "no se pudo consultar" (no se guarda en el cache)
+FAILED = object()
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def title_fingerprint(title: str) -> str:
+    """Mismo fingerprint para variantes de mayúsculas, emojis y puntuación."""
+    norm = " ".join(_TOKEN_RE.findall((title or "").lower()))
+    return hashlib.sha1(norm.encode("utf-8")).hexdigest()[:20]
+
+
+class ResolutionCache:
+    def __init__(self, path: str = CACHE_FILE, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._tables = {"titles": {}, "places": {}}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for name in self._tables:
+                self._tables[name] = dict(data.get(name) or {})
+        except Exception as e:
+            print(f"Warning: Could not load resolution cache: {e}")
+
+    def _get(self, table: str, key: str):
+        now = time.time()
+        with self._lock:
+            entries = self._tables[table]
+            entry = entries.get(key)
+            if entry is not None:
+                ttl = POSITIVE_TTL if entry.get("v") else NEGATIVE_TTL
+                if now - entry.get("ts", 0) < ttl:
+                    # Mover al final = marcar como usado recientemente
+                    entries[key] = entries.pop(key)
+                    self.hits += 1
+                    return entry.get("v")
+                del entries[key]
+            self.misses += 1
+            return MISS
+
+    def _put(self, table: str, key: str, value):
+        with self._lock:
+            entries = self._tables[table]
+            entries.pop(key, None)
+            entries[key] = {"v": value or None, "ts": int(time.time())}
+            while len(entries) > self.max_entries:
+                del entries[next(iter(entries))]
+
+    def contains_game(self, title: str) -> bool:
+        """Como get_game pero sin contar hit/miss ni tocar el orden LRU."""
+        with self._lock:
+            entry = self._tables["titles"].get(title_fingerprint(title))
+        if entry is None:
+            return False
+        ttl = POSITIVE_TTL if entry.get("v") else NEGATIVE_TTL
+        return time.time() - entry.get("ts", 0) < ttl
+
+    def get_game(self, title: str):
+        return self._get("titles", title_fingerprint(title))
+
+    def put_game(self, title: str, game_name: str | None):
+        self._put("titles", title_fingerprint(title), game_name)
+
+    def get_placeid(self, game_name: str):
+        return self._get("places", game_name.strip().lower())
+
+    def put_placeid(self, game_name: str, placeid: int | None):
+        self._put("places", game_name.strip().lower(), placeid)
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def save(self):
+        with self._lock:
+            data = {name: dict(entries) for name, entries in self._tables.items()}
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"Warning: Could not save resolution cache: {e}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResolutionCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResolutionCache()
+    return _cache
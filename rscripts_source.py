@@ -11,11 +11,21 @@ La API trae directamente:
 
 Atribución: la API requiere mostrar "Powered by Rscripts.net" en cualquier
 app que la consuma.
+
+RscriptsSource es el plugin (ver sources.py): sync incremental desde un
+watermark (lastUpdated, _id) persistido en el StateStore.
 """
 
-import time
+import codecs
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlparse
 
-import requests
+import http_client
+import metrics
+from sources import RETRYABLE, Source, new_record
 
 API_URL = "https://rscripts.net/api/v2/scripts"
 DEFAULT_HEADERS = {
@@ -27,59 +37,299 @@ DEFAULT_HEADERS = {
     "Referer": "https://rscripts.net/",
 }
 
+# Tope de bytes por archivo raw y tamaño de cada chunk leído
+RAW_MAX_BYTES = int(os.getenv("RAW_MAX_BYTES", str(2 * 1024 * 1024)))
+RAW_CHUNK_SIZE = 16 * 1024
+
+# Firmas de archivos binarios que nunca son código Lua
+_BINARY_MAGIC = (
+    b"\x89PNG", b"GIF8", b"\xff\xd8\xff", b"PK\x03\x04", b"\x1f\x8b", b"\x7fELF", b"%PDF",
+)
+_CHARSET_RE = re.compile(r"charset=([\w.-]+)", re.I)
+
+# Tope de páginas por corrida; el corte normal es por watermark
+RSCRIPTS_MAX_PAGES = int(os.getenv("RSCRIPTS_MAX_PAGES", "20"))
+
+
+def item_key(s: dict) -> tuple:
+    """Clave de orden de un script: (lastUpdated, _id). Sirve de watermark."""
+    return (s.get("lastUpdated") or "", s.get("_id") or "")
+
+
+def _mark_pinned(scripts: list) -> None:
+    """
+    Marca con s["_pinned"] = True los scripts fijados al principio de la página.
+    La API no siempre trae el flag, así que además se considera fijado todo
+    script del prefijo que sea más viejo que alguno que viene después
+    (rompe el orden desc).
+    """
+    newest_after = [""] * (len(scripts) + 1)
+    for i in range(len(scripts) - 1, -1, -1):
+        newest_after[i] = max(newest_after[i + 1], item_key(scripts[i])[0])
+    for i, s in enumerate(scripts):
+        flagged = any(s.get(f) for f in ("pinned", "isPinned", "sticky"))
+        if not flagged and item_key(s)[0] >= newest_after[i + 1]:
+            break
+        s["_pinned"] = True
+
+
+def _fetch_page(page: int):
+    params = {
+        "page": page,
+        "orderBy": "date",
+        "sort": "desc",
+        # La API espera 1/0, NO strings "true"/"false" (los strings se ignoran).
+        "verifiedOnly": 1,
+        "noKeySystem": 1,
+    }
+    resp = http_client.get(API_URL, kind="rscripts", params=params, headers=DEFAULT_HEADERS)
+    resp.raise_for_status()
+    return resp.json()
+
 
-def fetch_recent_verified(max_pages: int = 2, sleep_between: float = 1.0):
+def fetch_recent_verified(
+    max_pages: int = 2, since: tuple | None = None, walk: dict | None = None
+):
     """
     Itera scripts: verificados, sin keys, ordenados por fecha desc.
-    Yields el dict completo del script tal como lo devuelve la API.
+    Yields el dict completo del script tal como lo devuelve la API; los
+    fijados llegan con s["_pinned"] = True.
+
+    since: watermark (lastUpdated, _id). Si se pasa, se sigue paginando
+    (hasta max_pages) mientras la página tenga algún script no fijado más
+    nuevo que el watermark. La página siguiente se pide en un thread mientras
+    el consumidor procesa la actual.
+
+    walk: si se pasa, al terminar queda walk["complete"] = False cuando el
+    recorrido no llegó hasta el watermark (falló una página o se alcanzó
+    max_pages con scripts todavía más nuevos): entre lo visto y el
+    watermark pueden quedar scripts sin bajar.
     """
-    for page in range(1, max_pages + 1):
-        params = {
-            "page": page,
-            "orderBy": "date",
-            "sort": "desc",
-            # La API espera 1/0, NO strings "true"/"false" (los strings se ignoran).
-            "verifiedOnly": 1,
-            "noKeySystem": 1,
-        }
-        try:
-            resp = requests.get(API_URL, params=params, headers=DEFAULT_HEADERS, timeout=15)
-            resp.raise_for_status()
-            data = resp.json()
-        except Exception as e:
-            print(f"  [rscripts] page {page} fetch fallo: {e}")
-            return
+    walk = {} if walk is None else walk
+    walk["complete"] = False
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        future = pool.submit(_fetch_page, 1)
+        page = 1
+        while future is not None:
+            try:
+                data = future.result()
+            except Exception as e:
+                print(f"  [rscripts] page {page} fetch fallo: {e}")
+                return
+            future = None
 
-        scripts = data.get("scripts") or []
-        info = data.get("info") or {}
-        print(
-            f"  [rscripts] page {page}/{info.get('maxPages', '?')}: "
-            f"{len(scripts)} scripts"
-        )
-        if not scripts:
-            return
+            scripts = data.get("scripts") or []
+            info = data.get("info") or {}
+            print(
+                f"  [rscripts] page {page}/{info.get('maxPages', '?')}: "
+                f"{len(scripts)} scripts"
+            )
+            if not scripts:
+                walk["complete"] = True
+                return
+            if page == 1:
+                _mark_pinned(scripts)
 
-        for s in scripts:
-            yield s
+            more = True
+            # Si pedimos más páginas que las que existen, cortamos.
+            if info.get("maxPages") and page >= int(info["maxPages"]):
+                more = False
+            if since is not None and all(
+                item_key(s) <= since for s in scripts if not s.get("_pinned")
+            ):
+                more = False
+            # Sin watermark, max_pages es el corte normal
+            walk["complete"] = not more or since is None
+            if more and page >= max_pages:
+                if since is not None:
+                    print(f"  [rscripts] tope de {max_pages} páginas antes del watermark")
+                more = False
+            if more:
+                walk["complete"] = False
+                future = pool.submit(_fetch_page, page + 1)
 
-        # Si pedimos más páginas que las que existen, cortamos.
-        if info.get("maxPages") and page >= int(info["maxPages"]):
-            return
+            for s in scripts:
+                yield s
+            page += 1
 
-        time.sleep(sleep_between)
 
+def _sniff(head: bytes, content_type: str) -> str | None:
+    """
+    Decide el encoding a partir de los primeros bytes (y el Content-Type).
+    Retorna None si parece binario (imagen, zip, ejecutable...), que no es Lua.
+    """
+    if head.startswith(_BINARY_MAGIC):
+        return None
+    if head.startswith(b"\xef\xbb\xbf"):
+        return "utf-8-sig"
+    if head.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return "utf-16"
+    if b"\x00" in head:
+        return None
+    m = _CHARSET_RE.search(content_type or "")
+    if m:
+        try:
+            codecs.lookup(m.group(1))
+            return m.group(1)
+        except LookupError:
+            pass
+    return "utf-8"
 
-def fetch_raw_code(url: str) -> str | None:
-    """Descarga el código del script. Retorna None si falla."""
+
+def fetch_raw_code(url: str, max_bytes: int | None = None, sink=None) -> str | None:
+    """
+    Descarga el código del script en streaming. Retorna None si el raw se
+    descarta para siempre: 4xx (p.ej. script borrado), binario, casi vacío
+    o más grande que max_bytes (RAW_MAX_BYTES por defecto; se aborta apenas
+    se pasa del límite, sin bajar el resto). Los errores transitorios (red,
+    timeout, 429, 5xx) se relanzan: el pipeline los cuenta como "error" y
+    se reintentan en otra corrida.
+    Si se pasa `sink` (objeto con write(bytes), p.ej. archive.writer()) el
+    código ya decodificado se le escribe en UTF-8 a medida que llega.
+    """
     if not url:
         return None
+    max_bytes = RAW_MAX_BYTES if max_bytes is None else max_bytes
+    size = 0
     try:
-        resp = requests.get(url, headers=DEFAULT_HEADERS, timeout=20)
-        resp.raise_for_status()
-        text = resp.text or ""
+        with http_client.get(url, kind="raw", headers=DEFAULT_HEADERS, stream=True) as resp:
+            if 400 <= resp.status_code < 500 and resp.status_code != 429:
+                print(f"  [rscripts] raw HTTP {resp.status_code}, descartado: {url}")
+                return None
+            resp.raise_for_status()
+            declared = resp.headers.get("Content-Length")
+            if declared and declared.isdigit() and int(declared) > max_bytes:
+                print(f"  [rscripts] raw demasiado grande ({declared} bytes): {url}")
+                return None
+
+            decoder = None
+            parts = []
+            for chunk in resp.iter_content(chunk_size=RAW_CHUNK_SIZE):
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if size > max_bytes:
+                    print(f"  [rscripts] raw supera {max_bytes} bytes, abortado: {url}")
+                    return None
+                if decoder is None:
+                    encoding = _sniff(chunk[:512], resp.headers.get("Content-Type"))
+                    if encoding is None:
+                        print(f"  [rscripts] raw binario descartado: {url}")
+                        return None
+                    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+                parts.append(decoder.decode(chunk))
+                if sink is not None:
+                    sink.write(parts[-1].encode("utf-8"))
+            if decoder is not None:
+                parts.append(decoder.decode(b"", final=True))
+                if sink is not None:
+                    sink.write(parts[-1].encode("utf-8"))
+        text = "".join(parts)
         if len(text.strip()) < 10:
             return None
         return text
     except Exception as e:
         print(f"  [rscripts] raw fetch fallo ({url}): {e}")
-        return None
+        raise
+    finally:
+        # Incluye lo leído de descargas abortadas
+        metrics.get_metrics().add_bytes(urlparse(url).netloc.lower(), size)
+
+
+class RscriptsSource(Source):
+    """
+    Scripts de rscripts.net nuevos desde la última corrida:
+    - verifiedOnly=1 (autores verificados)
+    - noKeySystem=1 (sin sistema de keys)
+    - orderBy=date sort=desc + filtro (lastUpdated, _id) > watermark
+    El watermark se persiste en el StateStore ('rscripts_watermark', que
+    también va al snapshot last_run.json); sin watermark previo se usa hoy
+    00:00 UTC. Cada _id subido (o descartado para siempre) queda en los IDs
+    vistos de la fuente 'rscripts'.
+    La API ya trae juego y placeId, así que no hace falta detectarlo.
+    """
+
+    name = "rscripts"
+    poll_seconds = int(os.getenv("RSCRIPTS_POLL_SECONDS", "300"))
+
+    def __init__(self, max_pages: int = RSCRIPTS_MAX_PAGES):
+        super().__init__()
+        self.max_pages = max_pages
+        self.watermark = None
+        # Claves terminadas (subidas, vistas o descartadas) y con fallo reintentable
+        self.done_keys = []
+        self.failed_keys = []
+        self.walk = {}
+
+    def records(self, state):
+        today_str = datetime.now(timezone.utc).date().isoformat()
+        saved = state.get("rscripts_watermark")
+        self.watermark = tuple(saved) if saved else (today_str, "")
+        seen_ids = state.seen_ids("rscripts")
+        print(f"[rscripts] watermark: {self.watermark[0] or '-'} {self.watermark[1]}".rstrip())
+        print(f"[rscripts] {len(seen_ids)} IDs previamente subidos.")
+
+        # Los fijados vienen primero aunque sean viejos: no cortan la paginación
+        # y se filtran por watermark igual que el resto.
+        self.done_keys, self.failed_keys, self.walk = [], [], {}
+        for s in fetch_recent_verified(
+            max_pages=self.max_pages, since=self.watermark, walk=self.walk
+        ):
+            sid = s.get("_id")
+            title = (s.get("title") or "").strip()
+            if not sid or not title:
+                continue
+
+            key = item_key(s)
+            if key <= self.watermark:
+                self.skip("before_watermark")
+                continue
+
+            if sid in seen_ids:
+                self.skip("seen")
+                self.done_keys.append(key)
+                continue
+
+            game = s.get("game") or {}
+            game_name = (game.get("title") or "").strip()
+            place_id = game.get("placeId")
+            try:
+                place_id = int(place_id) if place_id is not None else None
+            except (TypeError, ValueError):
+                place_id = None
+
+            if not game_name or not place_id:
+                print(f"  [SKIP] '{title[:60]}': sin game/placeId")
+                self.skip("no_game")
+                self.done_keys.append(key)
+                continue
+
+            yield new_record(
+                self.name, sid, title,
+                game=game_name,
+                place_id=place_id,
+                code_url=s.get("rawScript"),
+                timestamp=s.get("lastUpdated"),
+                watermark_key=key,
+            )
+
+    def on_result(self, state, record, outcome):
+        if outcome in RETRYABLE:
+            self.failed_keys.append(record["watermark_key"])
+            return
+        if outcome != "no_game":
+            state.mark_seen(self.name, record["id"])
+        self.done_keys.append(record["watermark_key"])
+
+    def finish(self, state):
+        if not self.walk.get("complete", True):
+            # Los scripts entre lo visto y el watermark no se bajaron: si el
+            # watermark avanzara quedarían debajo para siempre
+            print("[rscripts] paginación incompleta: el watermark no avanza.")
+            return
+        # El watermark avanza hasta el último terminado anterior al primer fallo,
+        # así lo que falló se vuelve a intentar en la próxima corrida.
+        oldest_failure = min(self.failed_keys, default=None)
+        candidates = [k for k in self.done_keys if oldest_failure is None or k < oldest_failure]
+        if candidates and max(candidates) > self.watermark:
+            state.set("rscripts_watermark", list(max(candidates)))
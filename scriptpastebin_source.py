@@ -0,0 +1,200 @@
+"""
+Source: scriptpastebin.com (scrape HTML).
+
+homepage -> páginas detail (solo las publicadas hoy) -> página tertiary con
+el código. Los links ya procesados quedan en los IDs vistos de la fuente
+'scriptpastebin' y no se vuelven a bajar; los que fallaron (detail o
+tertiary caída, outcome reintentable en el pipeline) se reintentan.
+
+El sitio no trae el juego: el pipeline lo detecta desde el título.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlparse
+
+import http_client
+import metrics
+from auto_uploader import idempotency_key
+from extract import extract_detail, extract_homepage_links, extract_tertiary_code
+from sources import RETRYABLE, Source, new_record
+
+BASE_URL = "https://scriptpastebin.com/"
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
+
+# Crawl concurrente: cantidad de items procesados en paralelo y máximo de
+# requests simultáneos contra un mismo host (cortesía con el sitio).
+# CRAWL_WORKERS=1 vuelve al modo secuencial original.
+CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", "8"))
+CRAWL_PER_HOST = int(os.getenv("CRAWL_PER_HOST", "4"))
+
+_HOST_SLOTS = {}
+_HOST_SLOTS_LOCK = threading.Lock()
+
+
+def _host_slot(url):
+    """Semáforo por host que limita los requests simultáneos a CRAWL_PER_HOST."""
+    host = urlparse(url).netloc.lower()
+    with _HOST_SLOTS_LOCK:
+        slot = _HOST_SLOTS.get(host)
+        if slot is None:
+            slot = threading.BoundedSemaphore(max(1, CRAWL_PER_HOST))
+            _HOST_SLOTS[host] = slot
+    return slot
+
+
+def get_html(url):
+    """
+    Body de la página (mismo decoding que response.text) o None si falla.
+    Un status != 200 (5xx tras los reintentos, 403, challenge de Cloudflare)
+    también es una falla: esa página no se puede dar por procesada.
+    """
+    try:
+        with _host_slot(url), metrics.stage("fetch"):
+            response = http_client.get(url, kind="scrape", headers=HEADERS)
+        if response.status_code != 200:
+            print(f"    [ERROR] fetching {url}: HTTP {response.status_code}")
+            return None
+        return response.text
+    except Exception as e:
+        print(f"    [ERROR] fetching {url}: {e}")
+        return None
+
+
+def scrape_tertiary(url, title, on_script, html=None):
+    """False si la página con el código no se pudo bajar (reintentar otro run)."""
+    if not url or (
+        url.startswith("https://scriptpastebin.com")
+        and "scriptpastebins.com" not in url
+    ):
+        return True
+    if html is None:
+        html = get_html(url)
+    if not html:
+        return False
+
+    with metrics.stage("parse"):
+        code = extract_tertiary_code(html)
+    if code:
+        on_script(title, code)
+    else:
+        print("      No code found on tertiary page.")
+        metrics.skip("scriptpastebin", "no_code")
+    return True
+
+
+def scrape_detail(url, on_script):
+    """True si las páginas se pudieron bajar y procesar (aunque no tengan código nuevo)."""
+    html = get_html(url)
+    if not html:
+        return False
+    with metrics.stage("parse"):
+        detail = extract_detail(html)
+
+    today_str = datetime.now().strftime("%Y-%m-%d")
+    post_date = detail["post_date"]
+
+    if post_date:
+        if post_date != today_str:
+            print(
+                f"    [SKIP DATE]: Script date {post_date} is not today ({today_str})."
+            )
+            metrics.skip("scriptpastebin", "date")
+            return True
+        else:
+            print(f"    [DATE OK]: {post_date}")
+    else:
+        print("    [WARNING]: Could not extract date. Proceeding with caution...")
+
+    target_title = detail["title"]
+
+    if detail["button"]:
+        if detail["title_source"] == "above":
+            print(f"    [TITLE ABOVE]: {target_title}")
+        elif detail["title_source"] == "h1":
+            print(f"    [FALLBACK H1]: {target_title}")
+        return scrape_tertiary(detail["link"], target_title, on_script)
+    # Sin botón el código está en la misma página: reusar el HTML
+    return scrape_tertiary(url, target_title, on_script, html=html)
+
+
+def _crawl_item(i, link, on_script):
+    print(f"Processing Item {i + 1}...")
+    try:
+        return scrape_detail(link, on_script)
+    except Exception as e:
+        # Un item roto no debe tumbar el resto del crawl
+        print(f"    [ERROR] item {i + 1} ({link}): {e}")
+        return False
+
+
+def crawl(links, workers=None):
+    """
+    Baja detail + tertiary de cada link (en paralelo con workers > 1; la
+    cortesía por host la aplica get_html vía _host_slot).
+    Retorna (links cuya página detail se pudo procesar, [(link, título, código)]).
+    """
+    workers = CRAWL_WORKERS if workers is None else workers
+    scraped = []
+
+    def one(i):
+        link = links[i]
+        return _crawl_item(i, link, lambda title, code: scraped.append((link, title, code)))
+
+    if workers <= 1:
+        fetched = [one(i) for i in range(len(links))]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # list() para propagar excepciones inesperadas del pool
+            fetched = list(pool.map(one, range(len(links))))
+    return [link for link, ok in zip(links, fetched) if ok], scraped
+
+
+class ScriptpastebinSource(Source):
+    name = "scriptpastebin"
+    poll_seconds = int(os.getenv("SCRIPTPASTEBIN_POLL_SECONDS", "900"))
+
+    def __init__(self, workers: int | None = None):
+        super().__init__()
+        self.workers = workers
+        self.fetched = []
+        self.retry = set()
+
+    def records(self, state):
+        self.fetched, self.retry = [], set()
+        print(f"Fetching homepage: {BASE_URL}")
+        html = get_html(BASE_URL)
+        if not html:
+            return
+        links = [link for link in extract_homepage_links(html) if link]
+        seen = state.seen_ids(self.name)
+        new = [link for link in links if link not in seen]
+        for _ in range(len(links) - len(new)):
+            self.skip("seen")
+
+        workers = CRAWL_WORKERS if self.workers is None else self.workers
+        print(
+            f"Found {len(links)} items ({len(links) - len(new)} ya vistos). "
+            f"Processing ({workers} workers)..."
+        )
+        self.fetched, scraped = crawl(new, workers)
+        for link, title, code in scraped:
+            yield new_record(self.name, link, title, code=code)
+
+    def upload_key(self, record, code):
+        # Un mismo post puede cambiar de URL: la clave sale del código
+        return idempotency_key(self.name, code=code)
+
+    def on_result(self, state, record, outcome):
+        # Si el pipeline no pudo con el post (sin código, error) se vuelve a bajar
+        if outcome in RETRYABLE:
+            self.retry.add(record["id"])
+
+    def finish(self, state):
+        for link in self.fetched:
+            if link not in self.retry:
+                state.mark_seen(self.name, link)
@@ -0,0 +1,73 @@
+"""
+Contrato de las fuentes de scripts (plugins).
+
+Una fuente solo sabe hablar con su sitio: records() hace el fetch / parseo y
+produce records normalizados (new_record). Todo lo demás lo hace el pipeline
+compartido de main.py: resolver el código (inline o bajando code_url),
+dedup, detectar el juego si el record no lo trae y encolarlo en la cola
+persistente de subidas (upload_queue.py), que crea la categoría y sube.
+Después, el pipeline avisa el resultado de cada record con on_result() y al
+final llama a finish() (acá la fuente persiste su cursor: watermark, links
+vistos, ...). Un record encolado ya no se pierde: la cola lo reintenta.
+
+main.run_sources() corre las fuentes en paralelo, cada una en su thread.
+
+Resultados posibles (outcome): "queued", "duplicate", "no_code", "no_game",
+"error".
+"""
+
+import metrics
+from auto_uploader import idempotency_key
+
+# Outcomes que vale la pena reintentar en una corrida posterior. "no_code" es
+# un descarte definitivo (raw borrado, binario, enorme): una falla transitoria
+# al bajarlo llega como "error"
+RETRYABLE = frozenset({"error"})
+
+
+def new_record(source, id, title, game=None, place_id=None, code=None, code_url=None,
+               timestamp=None, **extra):
+    """
+    Record normalizado. game/place_id pueden faltar (el pipeline los detecta
+    desde el título); hace falta code o code_url. extra: datos propios de la
+    fuente que vuelven en on_result().
+    """
+    return {
+        "source": source,
+        "id": str(id),
+        "title": title,
+        "game": game,
+        "place_id": place_id,
+        "code": code,
+        "code_url": code_url,
+        "timestamp": timestamp,
+        **extra,
+    }
+
+
+class Source:
+    name = ""
+    # Segundos entre consultas en modo daemon
+    poll_seconds = 300
+
+    def __init__(self):
+        # Items descartados por la propia fuente (antes del pipeline), por motivo
+        self.skipped = {}
+
+    def skip(self, reason: str):
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+        metrics.skip(self.name, reason)
+
+    def records(self, state):
+        """Genera los records nuevos de esta corrida."""
+        raise NotImplementedError
+
+    def upload_key(self, record: dict, code: str) -> str:
+        """Clave de idempotencia de la subida (por defecto: fuente + id)."""
+        return idempotency_key(self.name, record["id"])
+
+    def on_result(self, state, record: dict, outcome: str):
+        pass
+
+    def finish(self, state):
+        pass
@@ -0,0 +1,236 @@
+"""
+Estado persistente en SQLite en vez del last_run.json monolítico.
+
+Tablas:
+- kv:         valores sueltos (last_successful_run, rscripts_watermark, ...)
+- seen_ids:   (source, item_id) ya subidos, p.ej. los _id de rscripts
+- categories: categorías creadas en Bublox (nombre formateado -> placeid)
+- category_aliases: nombre normalizado -> placeid (ver categories.py)
+- runs:       historial de ejecuciones con sus contadores
+
+Cada escritura es su propia transacción (un script subido = un INSERT), así
+un crash a mitad de run no pierde lo ya subido.
+
+Los workflows commitean state.db junto a last_run.json: con journal clásico
+(no WAL, igual que dedup.db y upload_queue.db) cada transacción ya está en
+el .db, así que un job que muere por timeout igual guarda todo lo subido y
+el historial de runs. last_run.json queda como snapshot compacto legible:
+export_json() lo escribe al final del run y, si el snapshot cambió desde la
+última vez que lo vimos (p.ej. el primer run, o un run que arranca sin
+state.db), import_json() lo mezcla en la base.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+STATE_DB = os.getenv("STATE_DB", "state.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS seen_ids (
+    source TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    ts INTEGER,
+    PRIMARY KEY (source, item_id)
+);
+CREATE TABLE IF NOT EXISTS categories (
+    name TEXT PRIMARY KEY,
+    placeid INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS categories_placeid ON categories (placeid);
+CREATE TABLE IF NOT EXISTS category_aliases (
+    alias TEXT PRIMARY KEY,
+    placeid INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL,
+    finished REAL,
+    status TEXT,
+    stats TEXT
+);
+"""
+
+# Fuente cuyos IDs se exportan como rscripts_uploaded_ids en el snapshot
+_SNAPSHOT_SOURCES = {"rscripts": "rscripts_uploaded_ids"}
+
+
+def _file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+class StateStore:
+    def __init__(self, path: str = STATE_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # Sin WAL: los workflows commitean solo state.db (ver upload_queue)
+        self._db.execute("PRAGMA journal_mode=DELETE")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+
+    def _write(self, sql: str, params=()):
+        with self._lock, self._db:
+            return self._db.execute(sql, params)
+
+    def _read(self, sql: str, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    # ── kv ──
+    def get(self, key: str, default=None):
+        rows = self._read("SELECT value FROM kv WHERE key = ?", (key,))
+        return json.loads(rows[0][0]) if rows else default
+
+    def set(self, key: str, value):
+        self._write("INSERT OR REPLACE INTO kv VALUES (?, ?)", (key, json.dumps(value)))
+
+    # ── seen ids ──
+    def seen_ids(self, source: str) -> set:
+        return {r[0] for r in self._read("SELECT item_id FROM seen_ids WHERE source = ?", (source,))}
+
+    def is_seen(self, source: str, item_id) -> bool:
+        return bool(
+            self._read(
+                "SELECT 1 FROM seen_ids WHERE source = ? AND item_id = ?", (source, str(item_id))
+            )
+        )
+
+    def mark_seen(self, source: str, item_id):
+        self._write(
+            "INSERT OR IGNORE INTO seen_ids VALUES (?, ?, ?)",
+            (source, str(item_id), int(time.time())),
+        )
+
+    # ── categorías ──
+    def categories(self) -> dict:
+        return dict(self._read("SELECT name, placeid FROM categories ORDER BY rowid"))
+
+    def add_category(self, name: str, placeid: int):
+        self._write("INSERT OR REPLACE INTO categories VALUES (?, ?)", (name, int(placeid)))
+
+    def category_aliases(self) -> dict:
+        return dict(self._read("SELECT alias, placeid FROM category_aliases ORDER BY alias"))
+
+    def add_category_alias(self, alias: str, placeid: int):
+        self._write("INSERT OR REPLACE INTO category_aliases VALUES (?, ?)", (alias, int(placeid)))
+
+    def replace_categories(self, categories: dict, aliases: dict):
+        """Reemplaza categorías y alias de una vez (reconciliación), en una transacción."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM categories")
+            self._db.executemany(
+                "INSERT INTO categories VALUES (?, ?)",
+                [(name, int(placeid)) for name, placeid in categories.items()],
+            )
+            self._db.execute("DELETE FROM category_aliases")
+            self._db.executemany(
+                "INSERT INTO category_aliases VALUES (?, ?)",
+                [(alias, int(placeid)) for alias, placeid in aliases.items()],
+            )
+
+    # ── historial ──
+    def start_run(self) -> int:
+        return self._write("INSERT INTO runs (started) VALUES (?)", (time.time(),)).lastrowid
+
+    def finish_run(self, run_id: int, status: str, stats: dict | None = None):
+        self._write(
+            "UPDATE runs SET finished = ?, status = ?, stats = ? WHERE id = ?",
+            (time.time(), status, json.dumps(stats or {}), run_id),
+        )
+
+    def runs(self, limit: int = 20) -> list:
+        rows = self._read(
+            "SELECT id, started, finished, status, stats FROM runs ORDER BY id DESC LIMIT ?",
+            (limit,),
+        )
+        return [
+            {"id": r[0], "started": r[1], "finished": r[2], "status": r[3],
+             "stats": json.loads(r[4]) if r[4] else {}}
+            for r in rows
+        ]
+
+    # ── snapshot JSON ──
+    def import_json(self, path: str) -> bool:
+        """
+        Mezcla un last_run.json en la base (idempotente). Se saltea si el
+        archivo no cambió desde el último import/export. Retorna True si importó.
+        """
+        if not os.path.exists(path):
+            return False
+        digest = _file_digest(path)
+        if self.get("snapshot_digest") == digest:
+            return False
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Warning: Could not import state snapshot: {e}")
+            return False
+        now = int(time.time())
+        with self._lock, self._db:
+            for name, placeid in (data.get("known_categories") or {}).items():
+                self._db.execute(
+                    "INSERT OR IGNORE INTO categories VALUES (?, ?)", (name, int(placeid))
+                )
+            for alias, placeid in (data.get("category_aliases") or {}).items():
+                self._db.execute(
+                    "INSERT OR IGNORE INTO category_aliases VALUES (?, ?)", (alias, int(placeid))
+                )
+            for source, key in _SNAPSHOT_SOURCES.items():
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO seen_ids VALUES (?, ?, ?)",
+                    [(source, str(i), now) for i in data.get(key) or []],
+                )
+            # El watermark de rscripts solo avanza (state.db no sobrevive en CI)
+            watermark = data.get("rscripts_watermark")
+            if watermark and list(watermark) > (self._kv_unlocked("rscripts_watermark") or []):
+                self._db.execute(
+                    "INSERT OR REPLACE INTO kv VALUES (?, ?)",
+                    ("rscripts_watermark", json.dumps(list(watermark))),
+                )
+            last_run = data.get("last_successful_run")
+            if last_run and last_run > (self._kv_unlocked("last_successful_run") or ""):
+                self._db.execute(
+                    "INSERT OR REPLACE INTO kv VALUES (?, ?)",
+                    ("last_successful_run", json.dumps(last_run)),
+                )
+            self._db.execute(
+                "INSERT OR REPLACE INTO kv VALUES (?, ?)", ("snapshot_digest", json.dumps(digest))
+            )
+        return True
+
+    def _kv_unlocked(self, key: str):
+        row = self._db.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def snapshot(self) -> dict:
+        data = {
+            "last_successful_run": self.get("last_successful_run", ""),
+            "known_categories": self.categories(),
+            "category_aliases": self.category_aliases(),
+            "rscripts_watermark": self.get("rscripts_watermark"),
+        }
+        for source, key in _SNAPSHOT_SOURCES.items():
+            data[key] = sorted(self.seen_ids(source))
+        return data
+
+    def export_json(self, path: str):
+        """Escribe el snapshot compacto (una línea) de forma atómica."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, separators=(",", ":"))
+        os.replace(tmp, path)
+        self.set("snapshot_digest", _file_digest(path))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,99 @@
+import json
+import re
+from http.server import BaseHTTPRequestHandler
+
+import auto_uploader
+import resolution_cache
+from resolution_cache import ResolutionCache
+
+GAMES = {"doors": "Doors", "obby": "Tower Obby", "grow": "Grow a Garden"}
+
+
+class _ChatStub(BaseHTTPRequestHandler):
+    """Stub de /v1/chat/completions: batch si viene response_format, si no individual."""
+
+    requests_seen = []
+    broken_batch = False
+    status = 200
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).requests_seen.append(body)
+        user = body["messages"][-1]["content"]
+        if "response_format" in body:
+            if type(self).broken_batch:
+                content = "Sorry, here you go: 0 -> Doors"
+            else:
+                answers = {}
+                for num, title in re.findall(r"^(\d+): (.*)$", user, re.M):
+                    answers[num] = next(
+                        (g for k, g in GAMES.items() if k in title.lower()), "UNKNOWN"
+                    )
+                content = json.dumps(answers)
+        else:
+            content = next((g for k, g in GAMES.items() if k in user.lower()), "UNKNOWN")
+        out = json.dumps({"choices": [{"message": {"content": content}}]}).encode()
+        self.send_response(type(self).status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+
+def _setup(monkeypatch, tmp_path, stub_server, broken=False, status=200):
+    _ChatStub.requests_seen = []
+    _ChatStub.broken_batch = broken
+    _ChatStub.status = status
+    monkeypatch.setattr(auto_uploader, "OPENAI_API_URL", stub_server(_ChatStub) + "/")
+    cache = ResolutionCache(str(tmp_path / "c.json"))
+    monkeypatch.setattr(resolution_cache, "_cache", cache)
+    return cache
+
+
+TITLES = [
+    "DOORS entity notifier",
+    "Tower Obby auto win",
+    "Grow garden dupe",
+    "mystery thing",
+    "Blox Fruits leaf hub",  # lo resuelve el índice, no va a la IA
+]
+
+
+def test_batch_maps_results_back_to_titles(monkeypatch, tmp_path, stub_server):
+    monkeypatch.setattr(auto_uploader, "AI_BATCH_SIZE", 3)
+    cache = _setup(monkeypatch, tmp_path, stub_server)
+    asked = auto_uploader.resolve_games_batch(TITLES + TITLES[:2])
+    assert asked == 4
+    assert len(_ChatStub.requests_seen) == 2  # 4 títulos en batches de 3
+    assert cache.get_game("DOORS entity notifier") == "Doors"
+    assert cache.get_game("Tower Obby auto win") == "Tower Obby"
+    assert cache.get_game("Grow garden dupe") == "Grow a Garden"
+    assert cache.get_game("mystery thing") is None
+
+
+def test_unparseable_batch_falls_back_per_title(monkeypatch, tmp_path, stub_server):
+    cache = _setup(monkeypatch, tmp_path, stub_server, broken=True)
+    auto_uploader.resolve_games_batch(TITLES[:3])
+    # 1 batch fallido + 3 individuales
+    assert len(_ChatStub.requests_seen) == 4
+    assert cache.get_game("DOORS entity notifier") == "Doors"
+    assert cache.get_game("Grow garden dupe") == "Grow a Garden"
+
+
+def test_failed_batch_is_not_retried_per_title(monkeypatch, tmp_path, stub_server):
+    cache = _setup(monkeypatch, tmp_path, stub_server, status=401)
+    results = auto_uploader._ask_ai_game_names(TITLES[:3], "sk-test")
+    auto_uploader.resolve_games_batch(TITLES[:3])
+    assert results == dict.fromkeys(TITLES[:3], resolution_cache.FAILED)
+    # Un request por batch, sin fallback individual ni negativos cacheados
+    assert len(_ChatStub.requests_seen) == 2
+    assert not cache.contains_game("DOORS entity notifier")
+
+
+def test_transport_error_fails_the_whole_batch(monkeypatch):
+    def down(*args, **kwargs):
+        raise auto_uploader.requests.ConnectionError("sin red")
+
+    monkeypatch.setattr(auto_uploader.http_client, "post", down)
+    results = auto_uploader._ask_ai_game_names(TITLES[:2], "sk-test")
+    assert results == dict.fromkeys(TITLES[:2], resolution_cache.FAILED)
@@ -0,0 +1,88 @@
+import os
+import threading
+
+import archive
+from archive import ScriptArchive
+
+LOADER = "-- loader\n" + "game:GetService('Players').LocalPlayer.Character.Humanoid.WalkSpeed = 100\n" * 40
+
+
+def test_same_title_does_not_overwrite_and_compresses(tmp_path):
+    store = ScriptArchive(str(tmp_path))
+    a = store.put(LOADER, "rscripts", "1", "Blox Fruits Script", "Blox Fruits")
+    b = store.put("print('otro')", "scriptpastebin", "/p/2", "Blox Fruits Script")
+    assert a != b
+    assert store.get(a) == LOADER and store.get(b) == "print('otro')"
+
+    path = store._object_path(a)
+    assert path == os.path.join(str(tmp_path), "objects", a[:2], f"{a[2:]}.z")
+    st = store.stats()
+    assert st["entries"] == st["objects"] == 2
+    assert st["stored_bytes"] < st["raw_bytes"] / 5
+    store.close()
+
+
+def test_index_lookups(tmp_path):
+    store = ScriptArchive(str(tmp_path))
+    digest = store.put(LOADER, "rscripts", "1", "Walkspeed", None)
+    assert digest == archive.content_hash(LOADER)
+    store.put(LOADER, "scriptpastebin", "/p/9", "Walkspeed (copia)", "Arsenal")
+    store.set_game("rscripts", "1", "Arsenal")
+
+    assert store.lookup("rscripts", "1")["game"] == "Arsenal"
+    assert store.lookup("rscripts", "nope") is None
+    assert sorted(e["source"] for e in store.by_hash(digest)) == ["rscripts", "scriptpastebin"]
+    assert len(store.by_game("Arsenal")) == 2
+    assert store.stats()["objects"] == 1
+    store.close()
+
+
+def test_concurrent_writes_of_same_content(tmp_path):
+    store = ScriptArchive(str(tmp_path))
+    threads = [
+        threading.Thread(target=store.put, args=(LOADER, "rscripts", str(i), f"t{i}"))
+        for i in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert store.stats()["entries"] == 8
+    assert store.get(archive.content_hash(LOADER)) == LOADER
+    leftovers = [f for _, _, files in os.walk(tmp_path) for f in files if f.endswith(".tmp")]
+    assert leftovers == []
+    store.close()
+
+
+def test_streamed_object_matches_put(tmp_path):
+    store = ScriptArchive(str(tmp_path))
+    writer = store.writer()
+    data = LOADER.encode("utf-8")
+    for i in range(0, len(data), 100):
+        writer.write(data[i : i + 100])
+    digest = store.put(LOADER, "rscripts", "1", "Walkspeed", writer=writer)
+    assert digest == archive.content_hash(LOADER)
+    assert store.get(digest) == LOADER
+
+    # Mismo contenido ya archivado: no se duplica; un writer abortado no deja tmp
+    again = store.writer()
+    again.write(data)
+    assert store.put(LOADER, "scriptpastebin", "/p/1", "copia", writer=again) == digest
+    store.writer().abort()
+    st = store.stats()
+    assert (st["entries"], st["objects"], st["raw_bytes"]) == (2, 1, len(data))
+    leftovers = [f for _, _, files in os.walk(tmp_path) for f in files if f.endswith(".tmp")]
+    assert leftovers == []
+    store.close()
+
+
+def test_write_errors_are_reported(tmp_path, capsys):
+    blocker = tmp_path / "objects"
+    store = ScriptArchive(str(tmp_path))
+    # Un archivo donde debería ir el directorio del shard
+    digest = archive.content_hash(LOADER)
+    (blocker / digest[:2]).write_text("no soy un directorio")
+    assert store.put(LOADER, "rscripts", "1", "Walkspeed") is None
+    assert "Could not archive" in capsys.readouterr().out
+    assert store.lookup("rscripts", "1") is None
+    store.close()
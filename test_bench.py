@@ -0,0 +1,25 @@
+import json
+
+import auto_uploader
+import bench
+
+
+def test_suite_runs_and_restores_globals(tmp_path):
+    known = dict(auto_uploader.KNOWN_GAMES)
+    ai = auto_uploader._ask_ai_game_name
+    out = tmp_path / "r.json"
+    assert bench.main(["--rounds", "1", "--titles", "50", "--out", str(out)]) == 0
+    report = json.loads(out.read_text())
+    assert set(report["results"]) >= {
+        "sanitize_title/frio", "format_category_name", "detect_game", "extract/detail"
+    }
+    assert all(r["median_s"] > 0 for r in report["results"].values())
+    assert auto_uploader.KNOWN_GAMES == known
+    assert auto_uploader._ask_ai_game_name is ai
+
+
+def test_compare_flags_regressions():
+    base = {"results": {"a": {"median_s": 1.0, "us_per_item": 1.0}}}
+    slow = {"results": {"a": {"median_s": 1.5, "us_per_item": 1.5}}}
+    assert bench.compare(base, slow) == [("a", 1.5)]
+    assert bench.compare(base, base) == []
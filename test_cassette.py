@@ -0,0 +1,85 @@
+import json
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+import cassette
+import http_client
+import rscripts_source
+
+LUA = b"-- loader\nprint('hola desde el cassette')\n"
+
+
+class _Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, status, body, ctype="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith("/api"):
+            base = f"http://127.0.0.1:{self.server.server_address[1]}"
+            scripts = [{"_id": "a1", "title": "Leaf", "lastUpdated": "2026-10-18T10:00:00Z",
+                        "rawScript": f"{base}/raw/a1"}]
+            return self._reply(200, json.dumps({"scripts": scripts, "info": {"maxPages": 1}}).encode())
+        self._reply(200, LUA, "text/plain")
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self._reply(201, json.dumps({"echo": body["n"]}).encode())
+
+
+def _use(monkeypatch, tape):
+    monkeypatch.setattr(cassette, "CASSETTE_FILE", tape.path)
+    monkeypatch.setattr(cassette, "_cassette", tape)
+
+
+def _run(base):
+    scripts = list(rscripts_source.fetch_recent_verified(max_pages=1))
+    code = rscripts_source.fetch_raw_code(scripts[0]["rawScript"])
+    posts = [http_client.post(f"{base}/upload", kind="upload", json={"n": n}).json() for n in (1, 2)]
+    return scripts, code, posts
+
+
+def test_record_then_replay_offline(monkeypatch, tmp_path, stub_server):
+    path = str(tmp_path / "run.cassette.json")
+    base = stub_server(_Stub)
+    monkeypatch.setattr(rscripts_source, "API_URL", f"{base}/api")
+
+    recorder = cassette.Cassette(path, "record")
+    _use(monkeypatch, recorder)
+    live = _run(base)
+    stub_server.stop()  # el replay no puede tocar la red
+    recorder.save()
+    assert recorder.recorded == 4
+
+    player = cassette.Cassette(path, "replay", latency="50")
+    _use(monkeypatch, player)
+    t0 = time.monotonic()
+    assert _run(base) == live
+    assert time.monotonic() - t0 >= 4 * 0.05
+    assert live[1] == LUA.decode()
+    assert [p["echo"] for p in live[2]] == [1, 2]  # emparejado por body
+
+    with pytest.raises(cassette.CassetteMiss):
+        http_client.get(f"{base}/nunca-grabado")
+    assert player.missed == 1
+
+
+def test_recorded_connection_errors_are_replayed(monkeypatch, tmp_path):
+    path = str(tmp_path / "err.cassette.json")
+    monkeypatch.setattr(http_client, "BACKOFF_BASE", 0.001)
+    recorder = cassette.Cassette(path, "record")
+    _use(monkeypatch, recorder)
+    with pytest.raises(http_client.requests.ConnectionError):
+        http_client.get("http://127.0.0.1:9/", retries=1)
+    recorder.save()
+
+    _use(monkeypatch, cassette.Cassette(path, "replay"))
+    with pytest.raises(http_client.requests.ConnectionError):
+        http_client.get("http://127.0.0.1:9/", retries=1)
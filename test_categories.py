@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+import archive
+import dedup
+import main
+import upload_queue
+from categories import CategoryIndex, normalize_category
+from sources import Source, new_record
+from state_store import StateStore
+
+
+def _persisted():
+    with open("last_run.json", encoding="utf-8") as f:
+        return json.load(f)["known_categories"]
+
+
+def test_normalize_strips_emoji_annotations_and_case():
+    assert normalize_category("Rivals [❄️freeze ray❄️]") == "rivals"
+    assert normalize_category("99 nights in the forest 🔦") == "99 nights in the forest"
+    assert normalize_category("[release] dueling grounds") == "dueling grounds"
+    assert normalize_category("[UPDATE]") == "update"
+
+
+def test_reconcile_collapses_persisted_state_by_placeid():
+    persisted = _persisted()
+    index = CategoryIndex.reconcile(persisted)
+    assert index.collapsed == len(persisted) - len(set(persisted.values()))
+    cats = index.categories()
+    assert cats["Rivals"] == 17625359962 and "Rivals [❄️freeze ray❄️]" not in cats
+    assert cats["Dueling grounds"] == 94217045453265
+    # Variantes del mismo juego resuelven a la categoría ya existente
+    assert index.lookup("RIVALS 🔫") == "Rivals"
+    assert index.lookup("Some new name", 79546208627805) == "99 nights in the forest"
+    assert index.lookup("Unknown game", 1) is None
+
+
+def test_request_defers_new_categories():
+    index = CategoryIndex.reconcile({"Rivals": 17625359962})
+    assert index.request("Rivals [UPD]", 17625359962) == ("Rivals", "ready")
+    assert index.request("Grow A Garden 🌱", 126884695634066) == ("Grow a garden 🌱", "pending")
+    assert index.request("grow a garden", 126884695634066)[1] == "pending"
+    assert index.take_pending() == {126884695634066: "Grow a garden 🌱"}
+    index.mark_failed(126884695634066)
+    assert index.request("Grow a garden", 126884695634066) == (None, "failed")
+
+
+@pytest.fixture
+def run(monkeypatch, tmp_path):
+    monkeypatch.setattr(dedup, "_index", dedup.DedupIndex(str(tmp_path / "dedup.db")))
+    monkeypatch.setattr(upload_queue, "_queue", upload_queue.UploadQueue(str(tmp_path / "q.db")))
+    monkeypatch.setattr(archive, "_archive", archive.ScriptArchive(str(tmp_path / "archive")))
+    monkeypatch.setattr(main, "batch_size", lambda: 1)
+    monkeypatch.setattr(main, "register_game", lambda *a, **k: None)
+    state = StateStore(str(tmp_path / "state.db"))
+    for name, placeid in _persisted().items():
+        state.add_category(name, placeid)
+    main._open_run(state)
+    yield state
+    state.close()
+    dedup._index.close()
+    upload_queue._queue.close()
+    archive._archive.close()
+
+
+class _Games(Source):
+    name = "games"
+
+    def __init__(self, games):
+        super().__init__()
+        self.games = games
+
+    def records(self, state):
+        for i, (game, placeid) in enumerate(self.games):
+            yield new_record(self.name, i, f"script {i}", game=game, place_id=placeid,
+                             code=f"print('script numero {i} para {game}')")
+
+
+def test_new_categories_created_once_at_end_of_run(monkeypatch, run):
+    created, uploaded = [], []
+    monkeypatch.setattr(
+        main, "create_category", lambda name, pid: created.append((name, pid)) or pid != 2
+    )
+    monkeypatch.setattr(
+        main, "upload_many",
+        lambda items, workers: [uploaded.append(it["categories"][0]) or {"ok": True} for it in items],
+    )
+    stats = main.run_sources([_Games([
+        ("Rivals [❄️freeze ray❄️]", 17625359962),  # existe: sin create
+        ("New Game", 1), ("New game 🎮", 1), ("new game", 1),
+        ("Broken Game", 2),
+    ])], run)["games"]
+
+    # un solo create por placeId, con el nombre del primer record que lo pidió
+    assert sorted(pid for _, pid in created) == [1, 2]
+    new_name = next(name for name, pid in created if pid == 1)
+    assert normalize_category(new_name) == "new game"
+    assert sorted(uploaded) == [new_name] * 3 + ["Rivals"]
+    assert stats["uploaded"] == 4 and stats["retrying"] == 1
+    assert run.categories()[new_name] == 1
+    assert run.category_aliases()["new game"] == 1
+    assert upload_queue.get_queue().counts() == {"pending": 1}
+
+
+def test_reconciled_state_is_persisted(run):
+    names = run.categories()
+    assert "Rivals" in names and "Rivals [❄️freeze ray❄️]" not in names
+    assert len(names) == len(set(names.values()))
+    assert run.category_aliases()["rivals"] == 17625359962
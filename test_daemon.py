@@ -0,0 +1,68 @@
+import os
+import signal
+import threading
+
+import pytest
+
+import archive
+import dedup
+import main
+import metrics
+import resolution_cache
+import upload_queue
+from sources import Source
+
+
+@pytest.fixture
+def sandbox(monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "STATE_DB", str(tmp_path / "state.db"))
+    monkeypatch.setattr(main, "STATE_FILE", str(tmp_path / "last_run.json"))
+    monkeypatch.setattr(metrics, "RUN_REPORT_FILE", str(tmp_path / "run_report.json"))
+    monkeypatch.setattr(metrics, "_metrics", metrics.Metrics())
+    monkeypatch.setattr(dedup, "_index", dedup.DedupIndex(str(tmp_path / "dedup.db")))
+    monkeypatch.setattr(upload_queue, "_queue", upload_queue.UploadQueue(str(tmp_path / "q.db")))
+    monkeypatch.setattr(main, "batch_size", lambda: 1)
+    monkeypatch.setattr(archive, "_archive", archive.ScriptArchive(str(tmp_path / "archive")))
+    monkeypatch.setattr(
+        resolution_cache, "_cache", resolution_cache.ResolutionCache(str(tmp_path / "cache.json"))
+    )
+    return tmp_path
+
+
+def _fake_source(name, calls, on_records=None):
+    class Fake(Source):
+        def records(self, state):
+            calls.append(name)
+            if on_records:
+                on_records()
+            return iter(())
+
+    Fake.name = name
+    return Fake
+
+
+def test_daemon_polls_each_source_on_its_interval(monkeypatch, sandbox):
+    calls = []
+    monkeypatch.setattr(main, "SOURCE_TYPES", [_fake_source("r", calls), _fake_source("s", calls)])
+    main.run_daemon(intervals={"r": 0.05, "s": 10}, max_ticks=3)
+    assert sorted(calls[:2]) == ["r", "s"]
+    assert calls[2:] == ["r", "r"]
+    assert os.path.exists(sandbox / "last_run.json")
+    assert os.path.exists(sandbox / "run_report.json")
+
+
+def test_sigterm_finishes_tick_and_shuts_down(monkeypatch, sandbox):
+    calls = []
+    # SIGTERM llega en medio del tick: se termina igual
+    sigterm = lambda: os.kill(os.getpid(), signal.SIGTERM)  # noqa: E731
+    monkeypatch.setattr(main, "SOURCE_TYPES", [_fake_source("r", calls, sigterm)])
+    handler = signal.getsignal(signal.SIGTERM)
+    timer = threading.Timer(5, main._STOP.set)  # red de seguridad
+    timer.start()
+    try:
+        main.run_daemon(intervals={"r": 0.01})
+    finally:
+        timer.cancel()
+    assert calls == ["r"]
+    assert signal.getsignal(signal.SIGTERM) is handler
+    assert os.path.exists(sandbox / "last_run.json")
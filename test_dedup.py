@@ -0,0 +1,68 @@
+import random
+
+from dedup import DedupIndex, code_hash, normalize_code
+
+LOADER = """
+-- Leaf Hub loader
+local Players = game:GetService("Players")
+local player = Players.LocalPlayer
+--[[ multi
+line ]]
+for i, v in pairs(workspace:GetChildren()) do
+    if v:IsA("Model") and v:FindFirstChild("Humanoid") then
+        print(v.Name, v.Humanoid.Health)
+    end
+end
+loadstring(game:HttpGet("https://example.com/leaf.lua"))()
+"""
+
+
+def _random_code(seed, lines=40):
+    rnd = random.Random(seed)
+    words = ["local", "x", "=", "game", ":", "GetService", "(", ")", "print", "end",
+             "if", "then", "for", "do", "workspace", "Part", "Size", "CFrame", "1", "2"]
+    return "\n".join(" ".join(rnd.choice(words) for _ in range(8)) for _ in range(lines))
+
+
+def test_normalization_ignores_comments_and_whitespace():
+    variant = LOADER.replace("-- Leaf Hub loader", "-- v2 by someone").replace("    ", "\t")
+    assert normalize_code(variant) == normalize_code(LOADER)
+    assert code_hash(variant) == code_hash(LOADER)
+
+
+def test_exact_and_near_duplicates(tmp_path):
+    idx = DedupIndex(str(tmp_path / "d.db"))
+    code = _random_code(1, lines=80)
+    assert idx.claim(code, "rscripts", "abc", "Original") == (None, None)
+
+    kind, match = idx.check("-- reposted\n" + code)
+    assert kind == "exact" and match == ("rscripts", "abc", "Original")
+
+    near = code + "\nprint('discord.gg/xyz')"
+    kind, match = idx.check(near)
+    assert kind == "near" and match[2] == "Original"
+
+    assert idx.check(_random_code(2, lines=80)) == (None, None)
+
+
+def test_release_and_persistence(tmp_path):
+    path = str(tmp_path / "d.db")
+    idx = DedupIndex(path)
+    idx.add(LOADER, "scriptpastebin", "Leaf", "Leaf")
+    idx.claim(_random_code(3), "rscripts", "1", "tmp")
+    idx.release(_random_code(3))
+    idx.close()
+
+    idx = DedupIndex(path)
+    assert len(idx) == 1
+    assert idx.check(LOADER)[0] == "exact"
+    assert idx.check(_random_code(3)) == (None, None)
+
+    # Sin close() (timeout del workflow): el .db solo ya tiene lo agregado
+    idx.add(_random_code(4), "rscripts", "2", "otro")
+    copy = tmp_path / "copy.db"
+    copy.write_bytes((tmp_path / "d.db").read_bytes())
+    idx.close()
+    idx = DedupIndex(str(copy))
+    assert len(idx) == 2
+    idx.close()
@@ -0,0 +1,110 @@
+from bs4 import BeautifulSoup
+
+import extract
+
+FIXTURES = ["debug_tertiary.html", "page_dump_home.html", "page_dump_auth.html", "page_dump_login.html"]
+
+BUTTON = (
+    '<p>Step 1: copy</p><h2>Leaf Hub Keyless</h2>'
+    '<div class="wp-block-buttons"><div class="wp-block-button">'
+    '<a class="wp-block-button__link" href="https://scriptpastebins.com/leaf/">Get Script</a>'
+    "</div></div>"
+)
+TIME = '<time class="entry-date published" datetime="2026-10-18T09:00:00+00:00">Oct 18</time>'
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def detail_pages():
+    """Páginas detail sintéticas armadas sobre el fixture real de WordPress."""
+    base = _read("debug_tertiary.html")
+    content = '<div class="entry-content" itemprop="text">'
+    header = '<header class="entry-header">'
+    yield base.replace(content, content + BUTTON).replace(header, header + TIME)
+    # botón directo en entry-content, sin título encima -> fallback h1
+    yield base.replace(content, content + '<a class="wp-block-button__link" href="/x">Get Script</a>')
+    # "Get Script" también fuera del artículo -> tiene que caer al parse completo
+    yield base.replace("<body", '<body><nav><a href="/nav">Get Script</a></nav>', 1).replace(
+        content, content + BUTTON
+    )
+    # sin <article>
+    yield "<html><body><h1>Solo</h1><div><p>Blox Hub</p><a href='/g'>Get Script</a></div></body></html>"
+
+
+def _full(html):
+    return BeautifulSoup(html, "html.parser")
+
+
+def legacy_detail(soup):
+    """Lógica original de main.scrape_detail, sin fetch ni prints."""
+    post_date = None
+    time_tag = soup.find("time", class_="entry-date") or soup.find("time", class_="published")
+    if time_tag and time_tag.has_attr("datetime"):
+        post_date = time_tag["datetime"][:10]
+    target_title = "Unknown Script"
+    button = soup.find("a", string=lambda t: t and "Get Script" in t)
+    if not button:
+        button = soup.find(
+            "a", class_=lambda c: c and "button" in c and "wp-block-button__link" in c
+        )
+    if button:
+        container = button
+        for _ in range(3):
+            if container.parent and (
+                "buttons" in container.parent.get("class", [])
+                or "entry-content" in container.parent.get("class", [])
+            ):
+                break
+            container = container.parent
+        curr = container
+        found = False
+        limit = 5
+        while curr and limit > 0:
+            curr = curr.previous_sibling
+            if curr and curr.name in ["p", "div", "h4", "h3", "h2", "h1", "strong", "span"]:
+                text = curr.get_text(strip=True)
+                if text and len(text) > 3 and "Step" not in text:
+                    target_title = text
+                    found = True
+                    break
+            limit -= 1
+        if not found:
+            h1 = soup.find("h1")
+            if h1:
+                target_title = h1.get_text(strip=True)
+        return post_date, target_title, button.get("href")
+    h1 = soup.find("h1")
+    if h1:
+        target_title = h1.get_text(strip=True)
+    return post_date, target_title, None
+
+
+def test_detail_matches_full_parse():
+    pages = list(detail_pages()) + [_read(p) for p in FIXTURES]
+    for html in pages:
+        fast = extract.extract_detail(html)
+        assert fast == extract.detail_from_soup(_full(html))
+        assert (fast["post_date"], fast["title"], fast["link"]) == legacy_detail(_full(html))
+
+
+def test_detail_values():
+    first = next(detail_pages())
+    detail = extract.extract_detail(first)
+    assert detail == {
+        "post_date": "2026-10-18",
+        "button": True,
+        "title": "Leaf Hub Keyless",
+        "title_source": "above",
+        "link": "https://scriptpastebins.com/leaf/",
+    }
+
+
+def test_tertiary_and_homepage_match_full_parse():
+    for path in FIXTURES:
+        html = _read(path)
+        assert extract.extract_tertiary_code(html) == extract.tertiary_code_from_soup(_full(html))
+        assert extract.extract_homepage_links(html) == extract.homepage_links_from_soup(_full(html))
+    assert extract.extract_tertiary_code(_read("debug_tertiary.html"))
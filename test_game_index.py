@@ -0,0 +1,38 @@
+import auto_uploader
+from auto_uploader import GameIndex, build_game_index, detect_game
+
+
+def test_longest_match_wins():
+    idx = GameIndex()
+    idx.add("pet simulator", 1)
+    idx.add("pet simulator 99", 2)
+    assert idx.find("NEW Pet Simulator 99 Dupe") == ("Pet simulator 99", 2)
+    assert idx.find("pet simulator x") == ("Pet simulator", 1)
+    assert idx.find("pet") is None
+
+
+def test_annotations_and_emoji_are_ignored():
+    idx = GameIndex()
+    idx.add("🍀basketball legends🍀", 14259168147, display="🍀basketball legends🍀")
+    idx.add("Operation one [map changes]", 72920620366355)
+    assert idx.find("Basketball Legends auto green")[1] == 14259168147
+    assert idx.find("operation one silent aim") == ("Operation one", 72920620366355)
+
+
+def test_short_single_token_names_are_skipped():
+    idx = GameIndex()
+    assert not idx.add("Fut ⚽", 1)
+    assert idx.find("futbol") is None
+
+
+def test_detect_game_uses_persisted_categories(monkeypatch):
+    def no_ai(*args):
+        raise AssertionError("no debería consultar a la IA")
+
+    monkeypatch.setattr(auto_uploader, "_ask_ai_game_name", no_ai)
+    build_game_index({"Catch and cook!": 90316083466771})
+    try:
+        assert detect_game("Catch And Cook Auto Fish") == ("Catch and cook!", 90316083466771)
+        assert detect_game("Blox Fruits Leaf Hub") == ("Blox fruits", 2753915549)
+    finally:
+        build_game_index()
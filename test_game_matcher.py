@@ -0,0 +1,113 @@
+import json
+import threading
+
+import auto_uploader
+import game_matcher
+import metrics
+import resolution_cache
+from auto_uploader import _game_tokens, build_game_index, detect_game, local_match
+from game_matcher import FuzzyMatcher
+from resolution_cache import ResolutionCache
+
+
+def _matcher(*names):
+    fm = FuzzyMatcher()
+    for placeid, name in enumerate(names, 1):
+        fm.add(_game_tokens(name), name.title(), placeid)
+    return fm
+
+
+def test_typos_and_extra_words():
+    fm = _matcher("blox fruits", "jailbreak", "pet simulator 99", "natural disaster survival")
+    assert fm.match("NEW Blox Frutis Leaf Hub")[:2] == ("Blox Fruits", 1)
+    assert fm.match("Jailbrek autorob")[1] == 2
+    assert fm.match("pet simulator99 dupe")[1] == 3
+    assert fm.match("Natural Disaster Survivl godmode")[1] == 4
+    assert fm.match("universal aimbot") is None
+
+
+def test_missing_word_is_not_a_match():
+    fm = _matcher("my dealership")
+    # 'dealership' solo no es 'my dealership'
+    assert fm.match("Car Dealership Tycoon auto race") is None
+
+
+def test_only_explicit_abbreviations():
+    fm = _matcher("tower of hell", "murder mystery 2", "blox fruits")
+    assert fm.add_abbreviation("bf", ("blox", "fruits"))
+    assert fm.add_abbreviation("mm2", ("murder", "mystery", "2"))
+    assert not fm.add_abbreviation("zz", ("no", "existe"))
+    assert fm.match("MM2 silent aim")[1] == 2
+    assert fm.match("BF auto farm") == ("Blox Fruits", 3, game_matcher.ABBREVIATION_SCORE)
+    # Sin siglas generadas: 'toh' no está en la tabla
+    assert fm.match("TOH godmode") is None
+
+
+def test_words_that_look_like_acronyms_are_not_matches():
+    fm = _matcher("merge anime defender", "merge a nuke", "zoo or oof")
+    assert fm.match("Mad City Auto Rob") is None
+    assert fm.match("Iron Man Simulator") is None
+    assert fm.match("Zoo Tycoon") is None
+
+
+def test_sequels_and_variants_must_match_exactly():
+    fm = _matcher("football fusion 3", "grow a garden 2", "anime warriors iii",
+                  "murder mystery 2", "pet simulator x")
+    assert fm.match("Football Fusion 2 script") is None
+    assert fm.match("Grow a Garden") is None
+    assert fm.match("Anime Warriors II") is None
+    assert fm.match("Murder Mystery 3") is None
+    assert fm.match("Pet Simulator") is None
+    assert fm.match("Murder Mystery 2 silent aim")[1] == 4
+    assert fm.match("Pet Simulater X dupe")[1] == 5
+
+
+def test_add_while_matching():
+    fm = _matcher("blox fruits")
+    errors = []
+
+    def matcher():
+        try:
+            for _ in range(300):
+                fm.match("blox fruits zzq auto farm")
+        except Exception as e:  # 'Set changed size during iteration'
+            errors.append(e)
+
+    t = threading.Thread(target=matcher)
+    t.start()
+    for i in range(3000):
+        fm.add(("blox", f"zzq{i}"), f"Game {i}", 100 + i)
+    t.join()
+    assert errors == []
+
+
+def test_ties_are_rejected():
+    fm = _matcher("doors hotel", "doors motel")
+    assert fm.match("doors xotel") is None
+
+
+def test_detect_game_fuzzy_skips_ai(monkeypatch, tmp_path):
+    def no_ai(*args):
+        raise AssertionError("no debería consultar a la IA")
+
+    monkeypatch.setattr(auto_uploader, "_ask_ai_game_name", no_ai)
+    monkeypatch.setattr(resolution_cache, "_cache", ResolutionCache(str(tmp_path / "c.json")))
+    monkeypatch.setattr(metrics, "_metrics", metrics.Metrics())
+    build_game_index()
+    assert detect_game("Blox Frutis auto farm") == ("Blox fruits", 2753915549)
+    assert detect_game("MM2 autofarm coins")[1] == 142823291
+    assert metrics.get_metrics().counters["ai_calls_avoided"] == 2
+    # Ya no van al batch de la IA
+    assert auto_uploader.resolve_games_batch(["Jailbrek autorob", "Blox Frutis"]) == 0
+
+
+def test_labelled_set_precision():
+    # Mismo índice que un run real: KNOWN_GAMES + categorías persistidas
+    with open("last_run.json", encoding="utf-8") as f:
+        build_game_index(json.load(f)["known_categories"])
+    report = auto_uploader.game_matcher_report()
+    assert report["local"]["labelled"] >= 50
+    assert report["local"]["precision"] >= 0.9
+    assert report["fuzzy"]["precision"] >= 0.95
+    assert local_match("Blox Fruits Leaf Hub") == ("Blox fruits", 2753915549)
+    build_game_index()
@@ -0,0 +1,74 @@
+from http.server import BaseHTTPRequestHandler
+
+import http_cache
+import http_client
+
+BODY = "<html><textarea>print('hola')</textarea></html>".encode()
+
+
+class _PageStub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    log = []
+    cache_control = None
+
+    def do_GET(self):
+        type(self).log.append((self.path, self.headers.get("If-None-Match")))
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", '"v1"')
+        if type(self).cache_control:
+            self.send_header("Cache-Control", type(self).cache_control)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+
+def _setup(monkeypatch, tmp_path, stub_server, cache_control=None, max_bytes=10**6):
+    _PageStub.log = []
+    _PageStub.cache_control = cache_control
+    cache = http_cache.HttpCache(str(tmp_path / "hc"), max_bytes)
+    monkeypatch.setattr(http_cache, "HTTP_CACHE_DIR", str(tmp_path / "hc"))
+    monkeypatch.setattr(http_cache, "_cache", cache)
+    return cache, stub_server(_PageStub)
+
+
+def test_conditional_get_serves_304_from_disk(monkeypatch, tmp_path, stub_server):
+    cache, base = _setup(monkeypatch, tmp_path, stub_server)
+    first = http_client.get(f"{base}/post", kind="scrape")
+    second = http_client.get(f"{base}/post", kind="scrape")
+    assert first.text == second.text == BODY.decode()
+    assert _PageStub.log == [("/post", None), ("/post", '"v1"')]
+    assert cache.revalidated == 1 and cache.bytes_saved == len(BODY)
+
+
+def test_max_age_skips_the_request(monkeypatch, tmp_path, stub_server):
+    cache, base = _setup(monkeypatch, tmp_path, stub_server, cache_control="max-age=600")
+    http_client.get(f"{base}/raw", kind="raw", params={"a": 1})
+    resp = http_client.get(f"{base}/raw", kind="raw", params={"a": 1})
+    assert resp.status_code == 200 and resp.content == BODY
+    assert len(_PageStub.log) == 1 and cache.hits == 1
+
+
+def test_no_store_and_uncached_kinds(monkeypatch, tmp_path, stub_server):
+    cache, base = _setup(monkeypatch, tmp_path, stub_server, cache_control="no-store")
+    http_client.get(f"{base}/a", kind="scrape")
+    http_client.get(f"{base}/a", kind="scrape")
+    http_client.get(f"{base}/api", kind="rscripts")
+    assert [h for _, h in _PageStub.log] == [None, None, None]
+
+
+def test_lru_eviction_by_size(monkeypatch, tmp_path, stub_server):
+    cache, base = _setup(monkeypatch, tmp_path, stub_server, max_bytes=len(BODY) * 2)
+    for path in ("/1", "/2", "/3"):
+        http_client.get(base + path, kind="scrape")
+    assert cache.lookup(base + "/1") is None
+    assert cache.lookup(base + "/3") is not None
+    cache.flush()
+    reloaded = http_cache.HttpCache(str(tmp_path / "hc"), 10**6)
+    assert reloaded.lookup(base + "/2")["etag"] == '"v1"'
@@ -0,0 +1,94 @@
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+import requests
+
+import http_client
+import rate_limit
+
+
+class _FlakyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        status = 503 if type(self).hits < 3 else 200
+        body = b"ok"
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_retries_5xx_until_success(monkeypatch, stub_server):
+    monkeypatch.setattr(http_client, "BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(rate_limit, "DEFAULT_RATE", 1000.0)
+    _FlakyHandler.hits = 0
+    resp = http_client.get(stub_server(_FlakyHandler), kind="scrape")
+    assert resp.status_code == 200
+    assert _FlakyHandler.hits == 3
+
+
+def test_returns_last_response_when_retries_exhausted(monkeypatch, stub_server):
+    monkeypatch.setattr(http_client, "BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(rate_limit, "DEFAULT_RATE", 1000.0)
+    _FlakyHandler.hits = -10
+    resp = http_client.get(stub_server(_FlakyHandler), retries=1)
+    assert resp.status_code == 503
+    assert _FlakyHandler.hits == -8
+
+
+class _PostHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits = 0
+    status = 503
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        type(self).hits += 1
+        self.send_response(type(self).status if type(self).hits < 3 else 200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+def test_post_is_not_retried_once_it_may_have_been_delivered(monkeypatch, stub_server):
+    monkeypatch.setattr(http_client, "BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(rate_limit, "DEFAULT_RATE", 1000.0)
+    url = stub_server(_PostHandler)
+    _PostHandler.hits, _PostHandler.status = 0, 503
+    assert http_client.post(url, kind="upload", json={}).status_code == 503
+    assert _PostHandler.hits == 1
+
+    _PostHandler.hits = 0
+    assert http_client.post(url, kind="openai", json={}, retry_unsafe=True).status_code == 200
+    assert _PostHandler.hits == 3
+
+    # 429: el servidor rechazó el request sin procesarlo
+    _PostHandler.hits, _PostHandler.status = 0, 429
+    assert http_client.post(url, kind="upload", json={}).status_code == 200
+    assert _PostHandler.hits == 3
+
+
+def test_post_retries_when_it_never_connected(monkeypatch, stub_server):
+    monkeypatch.setattr(http_client, "BACKOFF_BASE", 0.01)
+    attempts = []
+    real = http_client.get_session().request
+
+    def refused(method, url, **kwargs):
+        attempts.append(url)
+        return real(method, url, **kwargs)
+
+    monkeypatch.setattr(http_client.get_session(), "request", refused)
+    url = stub_server(_PostHandler)
+    stub_server.stop()  # nadie escucha: connection refused
+    with pytest.raises(requests.ConnectionError):
+        http_client.post(url, kind="upload", json={}, retries=2)
+    assert len(attempts) == 3
+
+
+def test_timeout_per_endpoint_class(monkeypatch):
+    assert http_client.get_timeout("upload") == 60
+    assert http_client.get_timeout("nope") == http_client.TIMEOUTS["default"]
+    monkeypatch.setenv("HTTP_TIMEOUT_UPLOAD", "5")
+    assert http_client.get_timeout("upload") == 5.0
@@ -0,0 +1,54 @@
+import json
+from http.server import BaseHTTPRequestHandler
+
+import http_client
+import metrics
+
+
+class _Stub(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b"x" * 1000
+        self.send_response(200 if self.path == "/ok" else 404)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_stages_skips_and_outputs(tmp_path):
+    m = metrics.Metrics()
+    for _ in range(2):
+        with m.stage("parse"):
+            pass
+    m.observe_http("a.example", 0.07, 200, 100)
+    m.observe_http("a.example", 40.0)  # error -> bucket +Inf
+    m.skip("rscripts", "seen")
+    m.skip("rscripts", "seen")
+    m.incr("rscripts_uploaded", 3)
+
+    path, textfile = tmp_path / "run_report.json", tmp_path / "scraper.prom"
+    m.write(str(path), str(textfile), extra={"status": "success"})
+    report = json.loads(path.read_text())
+    assert report["status"] == "success"
+    assert report["stages"]["parse"]["count"] == 2
+    host = report["hosts"]["a.example"]
+    assert host["buckets"][1] == 1 and host["buckets"][-1] == 1
+    assert (host["requests"], host["errors"], host["bytes"]) == (2, 1, 100)
+    assert report["skips"] == {"rscripts": {"seen": 2}}
+
+    prom = textfile.read_text()
+    assert 'scraper_http_request_duration_seconds_bucket{host="a.example",le="0.1"} 1' in prom
+    assert 'scraper_http_request_duration_seconds_bucket{host="a.example",le="+Inf"} 2' in prom
+    assert 'scraper_skips_total{source="rscripts",reason="seen"} 2' in prom
+    assert 'scraper_events_total{event="rscripts_uploaded"} 3' in prom
+
+
+def test_http_client_reports_per_host(monkeypatch, stub_server):
+    m = metrics.Metrics()
+    monkeypatch.setattr(metrics, "_metrics", m)
+    base = stub_server(_Stub)
+    http_client.get(f"{base}/ok")
+    http_client.get(f"{base}/missing")
+    host = m.report()["hosts"][base.removeprefix("http://")]
+    assert host["requests"] == 2
+    assert host["bytes"] == 2000
+    assert host["status"] == {"200": 1, "404": 1}
@@ -0,0 +1,59 @@
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler
+
+import http_client
+import rate_limit
+
+
+class _ThrottledHandler(BaseHTTPRequestHandler):
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        self.send_response(429 if type(self).hits == 1 else 200)
+        if type(self).hits == 1:
+            self.send_header("Retry-After", "1")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+
+def test_configured_rate_by_host_suffix():
+    assert rate_limit.configured_rate("rscripts.net") == rate_limit.RATE_LIMITS["rscripts.net"]
+    assert rate_limit.configured_rate("games.roblox.com") == rate_limit.RATE_LIMITS["roblox.com"]
+    assert rate_limit.configured_rate("x-abc.a.run.app:443") == rate_limit.RATE_LIMITS["run.app"]
+    assert rate_limit.configured_rate("example.org") == rate_limit.DEFAULT_RATE
+
+
+def test_retry_after_formats():
+    assert rate_limit.parse_retry_after("3") == 3.0
+    assert rate_limit.parse_retry_after("999999") == rate_limit.RETRY_AFTER_MAX
+    assert 8 <= rate_limit.parse_retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10
+    assert rate_limit.parse_retry_after("mañana") is None
+
+
+def test_bucket_paces_bursts_and_adapts():
+    limiter = rate_limit.HostLimiter(10.0)
+    waits = [limiter.reserve() for _ in range(15)]
+    assert waits[:10] == [0.0] * 10  # ráfaga de 1s
+    assert 0.45 <= waits[-1] <= 0.55  # el resto a 10/s
+
+    assert limiter.feedback(429, "2") == 2.0
+    assert limiter.rate == 5.0
+    assert limiter.reserve() >= 1.9
+    for _ in range(20):
+        limiter.feedback(200)
+    assert limiter.rate == 10.0
+
+
+def test_http_client_honours_retry_after(monkeypatch, stub_server):
+    monkeypatch.setattr(http_client, "BACKOFF_BASE", 100.0)  # si se usara el backoff, colgaría
+    _ThrottledHandler.hits = 0
+    url = stub_server(_ThrottledHandler)
+    t0 = time.monotonic()
+    resp = http_client.get(url)
+    elapsed = time.monotonic() - t0
+    assert resp.status_code == 200
+    assert _ThrottledHandler.hits == 2
+    assert 0.9 <= elapsed < 3
@@ -0,0 +1,77 @@
+import io
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+import requests
+
+import http_client
+import rate_limit
+import rscripts_source
+
+LUA = "-- ñandú loader\nprint('hola mundo desde lua')\n".encode("utf-8")
+
+
+class _RawStub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    sent = 0
+
+    def do_GET(self):
+        if self.path == "/big":
+            # Sin Content-Length (chunked): el cliente tiene que cortar solo
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for _ in range(2000):
+                    block = b"x" * 4096
+                    self.wfile.write(f"{len(block):x}\r\n".encode() + block + b"\r\n")
+                    type(self).sent += len(block)
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            return
+        if self.path in ("/gone", "/down"):
+            self.send_response(404 if self.path == "/gone" else 503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = {
+            "/lua": LUA,
+            "/bom": b"\xef\xbb\xbf" + LUA,
+            "/png": b"\x89PNG\r\n\x1a\n" + b"\x00" * 64,
+            "/declared": b"y" * 5000,
+        }[self.path]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_stream_decodes_and_writes_through(stub_server):
+    base = stub_server(_RawStub)
+    sink = io.BytesIO()
+    code = rscripts_source.fetch_raw_code(f"{base}/lua", sink=sink)
+    bom = rscripts_source.fetch_raw_code(f"{base}/bom")
+    assert code == LUA.decode("utf-8")
+    assert sink.getvalue() == LUA
+    assert bom == LUA.decode("utf-8")
+
+
+def test_size_cap_and_binary_are_rejected(stub_server):
+    _RawStub.sent = 0
+    base = stub_server(_RawStub)
+    assert rscripts_source.fetch_raw_code(f"{base}/declared", max_bytes=1000) is None
+    assert rscripts_source.fetch_raw_code(f"{base}/png") is None
+    assert rscripts_source.fetch_raw_code(f"{base}/big", max_bytes=64 * 1024) is None
+    # Se abortó mucho antes de los ~8 MB que el servidor quería mandar
+    assert _RawStub.sent < 8 * 1024 * 1024
+
+
+def test_deleted_raw_is_rejected_but_outage_raises(monkeypatch, stub_server):
+    monkeypatch.setattr(http_client, "BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(rate_limit, "DEFAULT_RATE", 1000.0)
+    base = stub_server(_RawStub)
+    assert rscripts_source.fetch_raw_code(f"{base}/gone") is None
+    with pytest.raises(requests.HTTPError):
+        rscripts_source.fetch_raw_code(f"{base}/down")
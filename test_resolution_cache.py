@@ -0,0 +1,60 @@
+import auto_uploader
+import resolution_cache
+from resolution_cache import MISS, ResolutionCache
+
+
+def test_roundtrip_and_fingerprint(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = ResolutionCache(path)
+    cache.put_game("Doors Script | Entity ESP 🔥", "Doors")
+    cache.put_placeid("Doors", 6516141723)
+    cache.put_placeid("Nope Game", 0)
+    cache.save()
+
+    cache = ResolutionCache(path)
+    assert cache.get_game("doors script entity esp") == "Doors"
+    assert cache.get_placeid("doors") == 6516141723
+    assert cache.get_placeid("nope game") is None
+    assert cache.get_game("otro titulo") is MISS
+    assert cache.hit_ratio() == 0.75
+
+
+def test_negative_ttl_is_shorter(tmp_path, monkeypatch):
+    cache = ResolutionCache(str(tmp_path / "c.json"))
+    cache.put_game("a", "Game")
+    cache.put_game("b", None)
+    now = resolution_cache.time.time()
+    monkeypatch.setattr(
+        resolution_cache.time, "time", lambda: now + resolution_cache.NEGATIVE_TTL + 1
+    )
+    assert cache.get_game("a") == "Game"
+    assert cache.get_game("b") is MISS
+
+
+def test_lru_eviction(tmp_path):
+    cache = ResolutionCache(str(tmp_path / "c.json"), max_entries=2)
+    cache.put_placeid("a", 1)
+    cache.put_placeid("b", 2)
+    cache.get_placeid("a")
+    cache.put_placeid("c", 3)
+    assert cache.get_placeid("b") is MISS
+    assert cache.get_placeid("a") == 1
+
+
+def test_detect_game_reuses_cached_resolution(tmp_path, monkeypatch):
+    cache = ResolutionCache(str(tmp_path / "c.json"))
+    cache.put_game("Some Unknown Obby auto win", "Some Unknown Obby")
+    cache.put_placeid("Some Unknown Obby", 123456)
+    monkeypatch.setattr(resolution_cache, "_cache", cache)
+
+    def no_network(*args):
+        raise AssertionError("no debería salir a la red")
+
+    monkeypatch.setattr(auto_uploader, "_ask_ai_game_name", no_network)
+    monkeypatch.setattr(auto_uploader, "_search_roblox_placeid", no_network)
+    try:
+        game, placeid = auto_uploader.detect_game("Some Unknown Obby auto win")
+        assert (game, placeid) == ("Some unknown obby", 123456)
+    finally:
+        auto_uploader.KNOWN_GAMES.pop("some unknown obby", None)
+        auto_uploader.build_game_index()
@@ -0,0 +1,98 @@
+import time
+
+import pytest
+
+import auto_uploader
+import resolution_cache
+from resolution_cache import FAILED, MISS, ResolutionCache
+
+
+def _setup(monkeypatch, strategies, hedge=0.05):
+    calls = []
+
+    def wrap(name, fn):
+        def run(game_name):
+            calls.append(name)
+            return fn(game_name)
+
+        return (name, run)
+
+    monkeypatch.setattr(auto_uploader, "_ROBLOX_STRATEGIES", [wrap(n, f) for n, f in strategies])
+    monkeypatch.setattr(auto_uploader, "_ROBLOX_HEALTH", auto_uploader.EndpointHealth(3))
+    monkeypatch.setattr(auto_uploader, "ROBLOX_HEDGE_DELAY", hedge)
+    return calls
+
+
+def _hang(name):
+    time.sleep(1.0)
+    raise auto_uploader.LookupFailed("timeout")
+
+
+def _broken(name):
+    raise auto_uploader.LookupFailed("HTTP 500")
+
+
+def test_slow_endpoint_is_hedged(monkeypatch):
+    _setup(monkeypatch, [("omni", _hang), ("universes", lambda n: 1234), ("legacy", lambda n: 9)])
+    t0 = time.monotonic()
+    assert auto_uploader._search_roblox_placeid("Leaf Game") == 1234
+    assert time.monotonic() - t0 < 0.5
+
+
+def test_empty_answer_falls_through_to_next(monkeypatch):
+    calls = _setup(monkeypatch, [("omni", lambda n: 0), ("universes", lambda n: 0), ("legacy", lambda n: 77)], hedge=5)
+    assert auto_uploader._search_roblox_placeid("Leaf Game") == 77
+    assert calls == ["omni", "universes", "legacy"]
+
+
+def test_ranking_prefers_healthy_endpoint(monkeypatch):
+    calls = _setup(monkeypatch, [("omni", _broken), ("universes", lambda n: 5)], hedge=5)
+    for _ in range(3):
+        assert auto_uploader._search_roblox_placeid("Leaf Game") == 5
+    # Tras la 1ra falla, universes (que anda) ya va primero
+    assert calls == ["omni", "universes", "universes", "universes"]
+
+
+def test_breaker_skips_failing_endpoint_while_open(monkeypatch):
+    calls = _setup(monkeypatch, [("omni", _broken)], hedge=5)
+    for _ in range(3):
+        assert auto_uploader._search_roblox_placeid("x") is FAILED
+    assert auto_uploader._ROBLOX_HEALTH.is_open("omni")
+    calls.clear()
+    assert auto_uploader._search_roblox_placeid("x") is FAILED
+    assert calls == []
+
+
+def test_breaker_lets_a_probe_through_after_cooldown(monkeypatch):
+    health = auto_uploader.EndpointHealth(2, cooldown=0.05)
+    for _ in range(2):
+        health.record("omni", False, 0.1)
+    assert health.is_open("omni")
+    time.sleep(0.06)
+    assert not health.is_open("omni")  # half-open: pasa un request de prueba
+    health.record("omni", False, 0.1)
+    assert health.is_open("omni")  # la prueba falló: otro cooldown
+    time.sleep(0.06)
+    health.record("omni", True, 0.1)
+    assert not health.is_open("omni")
+    health.record("omni", False, 0.1)
+    assert not health.is_open("omni")  # la racha volvió a empezar
+
+
+def test_outage_is_not_cached_as_negative(monkeypatch, tmp_path):
+    _setup(monkeypatch, [("omni", _broken), ("universes", lambda n: 0)], hedge=5)
+    # Un endpoint respondió "no existe": eso sí es un negativo
+    assert auto_uploader._search_roblox_placeid("x") == 0
+
+    cache = ResolutionCache(str(tmp_path / "c.json"))
+    monkeypatch.setattr(resolution_cache, "_cache", cache)
+    monkeypatch.setattr(auto_uploader, "_ask_ai_game_name", lambda *a: FAILED)
+    with pytest.raises(auto_uploader.LookupFailed):
+        auto_uploader.detect_game("Some Unknown Obby auto win")
+    assert not cache.contains_game("Some Unknown Obby auto win")
+
+    monkeypatch.setattr(auto_uploader, "_ask_ai_game_name", lambda *a: "Some Unknown Obby")
+    monkeypatch.setattr(auto_uploader, "_search_roblox_placeid", lambda n: FAILED)
+    with pytest.raises(auto_uploader.LookupFailed):
+        auto_uploader.detect_game("Some Unknown Obby auto win")
+    assert cache.get_placeid("Some Unknown Obby") is MISS
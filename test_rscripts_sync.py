@@ -0,0 +1,162 @@
+import json
+import time
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+import archive
+import dedup
+import main
+import rscripts_source
+import upload_queue
+from state_store import StateStore
+
+
+def _script(i, day, hour, **extra):
+    return {
+        "_id": f"id{i:03d}",
+        "title": f"Script {i}",
+        "lastUpdated": f"2026-10-{day:02d}T{hour:02d}:00:00.000Z",
+        **extra,
+    }
+
+
+# 3 páginas de 4; los 2 primeros de la página 1 están fijados (viejos)
+PINNED = [_script(900, 1, 0, pinned=True), _script(901, 2, 0)]
+NEWER = [_script(i, 18, 23 - i) for i in range(6)]
+OLDER = [_script(100 + i, 17, 23 - i) for i in range(4)]
+PAGES = [PINNED + NEWER[:2], NEWER[2:6], OLDER]
+
+
+class _ApiStub(BaseHTTPRequestHandler):
+    requested = []
+    broken_page = None
+    pages = PAGES
+
+    def do_GET(self):
+        page = int(parse_qs(urlparse(self.path).query)["page"][0])
+        type(self).requested.append((page, time.monotonic()))
+        time.sleep(0.05)
+        if page == type(self).broken_page:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        pages = type(self).pages
+        out = json.dumps({"scripts": pages[page - 1], "info": {"maxPages": len(pages)}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+
+def _serve(monkeypatch, stub_server, broken_page=None, pages=PAGES):
+    _ApiStub.requested = []
+    _ApiStub.broken_page = broken_page
+    _ApiStub.pages = pages
+    monkeypatch.setattr(rscripts_source, "API_URL", stub_server(_ApiStub) + "/")
+
+
+def test_pinned_prefix_is_detected():
+    page = [dict(s) for s in PAGES[0]]
+    rscripts_source._mark_pinned(page)
+    assert [bool(s.get("_pinned")) for s in page] == [True, True, False, False]
+
+
+def test_stops_at_watermark_and_prefetches(monkeypatch, stub_server):
+    _serve(monkeypatch, stub_server)
+    since = rscripts_source.item_key(NEWER[2])
+    seen = []
+    for s in rscripts_source.fetch_recent_verified(max_pages=10, since=since):
+        seen.append(s["_id"])
+        time.sleep(0.05)
+    # Los fijados viejos no cortan la página 1; la 2 ya es toda <= watermark
+    assert [p for p, _ in _ApiStub.requested] == [1, 2]
+    assert len(seen) == 8
+    # La página 2 se pidió antes de terminar de consumir la 1
+    assert _ApiStub.requested[1][1] - _ApiStub.requested[0][1] < 0.05 + 2 * 0.05
+
+
+def test_incomplete_walk_is_reported(monkeypatch, stub_server):
+    since = rscripts_source.item_key(OLDER[2])
+    _serve(monkeypatch, stub_server, broken_page=2)
+    walk = {}
+    seen = list(rscripts_source.fetch_recent_verified(max_pages=10, since=since, walk=walk))
+    assert len(seen) == 4 and walk == {"complete": False}
+    # Tope de páginas con scripts todavía más nuevos que el watermark
+    _ApiStub.broken_page = None
+    list(rscripts_source.fetch_recent_verified(max_pages=2, since=since, walk=walk))
+    assert walk == {"complete": False}
+    list(rscripts_source.fetch_recent_verified(max_pages=10, since=since, walk=walk))
+    assert walk == {"complete": True}
+
+
+def test_watermark_holds_when_a_page_fails(monkeypatch, tmp_path, stub_server):
+    monkeypatch.setattr(dedup, "_index", dedup.DedupIndex(str(tmp_path / "dedup.db")))
+    monkeypatch.setattr(archive, "_archive", archive.ScriptArchive(str(tmp_path / "archive")))
+    monkeypatch.setattr(main, "fetch_raw_code", lambda url, sink=None: f"print('{url}' .. 1)")
+    monkeypatch.setattr(main, "ensure_category_exists", lambda name, pid: (name, "ready"))
+    monkeypatch.setattr(main, "batch_size", lambda: 1)
+    monkeypatch.setattr(main, "upload_many", lambda items, workers: [{"ok": True} for _ in items])
+    monkeypatch.setattr(upload_queue, "_queue", upload_queue.UploadQueue(str(tmp_path / "q.db")))
+    pages = [[dict(s, game={"title": "Blox Fruits", "placeId": 1}, rawScript=s["_id"]) for s in p]
+             for p in PAGES]
+    _serve(monkeypatch, stub_server, broken_page=2, pages=pages)
+    state = StateStore(str(tmp_path / "state.db"))
+    start = list(rscripts_source.item_key(OLDER[0]))
+    state.set("rscripts_watermark", start)
+    try:
+        main.run_sources([rscripts_source.RscriptsSource()], state)
+        # La página 1 se subió, pero NEWER[2:] (página 2) sigue arriba del watermark
+        assert state.get("rscripts_watermark") == start
+        assert state.is_seen("rscripts", NEWER[0]["_id"])
+    finally:
+        state.close()
+        dedup._index.close()
+        upload_queue._queue.close()
+        archive._archive.close()
+
+
+def test_watermark_advances_only_past_finished_items(monkeypatch, tmp_path):
+    monkeypatch.setattr(dedup, "_index", dedup.DedupIndex(str(tmp_path / "dedup.db")))
+    state = StateStore(str(tmp_path / "state.db"))
+    state.set("rscripts_watermark", list(rscripts_source.item_key(OLDER[0])))
+    items = [dict(s, game={"title": "Blox Fruits", "placeId": 1}, rawScript=s["_id"]) for s in NEWER]
+
+    def fake_fetch(max_pages, since, walk):
+        assert since == rscripts_source.item_key(OLDER[0])
+        yield from [dict(s) for s in PINNED] + items
+        walk["complete"] = True
+
+    def fake_raw(url, sink=None):
+        # rawScript == _id. NEWER[2]: falla transitoria; NEWER[4]: raw borrado
+        if url == NEWER[2]["_id"]:
+            raise requests.ConnectionError("reset")
+        if url == NEWER[4]["_id"]:
+            return None
+        code = f"print('{url}' .. {url[-1]})"
+        sink.write(code.encode("utf-8"))
+        return code
+
+    monkeypatch.setattr(rscripts_source, "fetch_recent_verified", fake_fetch)
+    monkeypatch.setattr(main, "fetch_raw_code", fake_raw)
+    monkeypatch.setattr(archive, "_archive", archive.ScriptArchive(str(tmp_path / "archive")))
+    monkeypatch.setattr(main, "ensure_category_exists", lambda name, pid: (name, "ready"))
+    monkeypatch.setattr(main, "batch_size", lambda: 1)
+    monkeypatch.setattr(main, "upload_many", lambda items, workers: [{"ok": True} for _ in items])
+    monkeypatch.setattr(upload_queue, "_queue", upload_queue.UploadQueue(str(tmp_path / "q.db")))
+    try:
+        stats = main.run_sources([rscripts_source.RscriptsSource()], state)["rscripts"]
+        assert stats["queued"] == stats["uploaded"] == 4
+        assert stats["skipped"] == {"before_watermark": 2, "error": 1, "no_code": 1}
+        # El descarte definitivo no frena el watermark; la falla transitoria sí
+        assert tuple(state.get("rscripts_watermark")) == rscripts_source.item_key(NEWER[3])
+        assert not state.is_seen("rscripts", NEWER[2]["_id"])
+        assert state.is_seen("rscripts", NEWER[4]["_id"])
+    finally:
+        state.close()
+        dedup._index.close()
+        upload_queue._queue.close()
+        archive._archive.close()
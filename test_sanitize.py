@@ -0,0 +1,61 @@
+import json
+import random
+import re
+
+from auto_uploader import FORBIDDEN_PATTERNS, FORBIDDEN_WORDS, sanitize_title, sanitize_titles
+
+
+def legacy_sanitize_title(title):
+    """Implementación original (40 re.sub por título), usada como referencia."""
+    if not title:
+        return title
+    cleaned = title
+    for pat in FORBIDDEN_PATTERNS:
+        cleaned = re.sub(pat, " ", cleaned, flags=re.IGNORECASE)
+    cleaned = re.sub(r"[\(\[\{]\s*[\)\]\}]", " ", cleaned)
+    cleaned = re.sub(r"\s+([,;|])", r"\1", cleaned)
+    cleaned = re.sub(r"([,;|/\\\-]\s*){2,}", lambda m: m.group(0)[0] + " ", cleaned)
+    cleaned = re.sub(r"\s+", " ", cleaned)
+    cleaned = re.sub(r"^[\s\-|:•·,.;/\\\(\[\{]+|[\s\-|:•·,.;/\\\)\]\}]+$", "", cleaned)
+    cleaned = cleaned.strip()
+    return cleaned or title
+
+
+def _corpus(n=3000, seed=7):
+    with open("last_run.json", encoding="utf-8") as f:
+        games = list(json.load(f)["known_categories"])
+    rnd = random.Random(seed)
+    words = FORBIDDEN_WORDS + [
+        "AUTO FARM", "Auto-Parry", "autorob", "INF JUMP", "No-Key", "[NO KEY]",
+        "ſcript", "ınject", "Aımbot", "SCRİPT", "Aİmbot", "OP", "|", "-", ",", "(", ")", "[", "]",
+        "automatic", "GUI", "2025", "🔥", "Hub", "silent", "aim",
+    ]
+    out = []
+    for _ in range(n):
+        parts = [rnd.choice(games)] + rnd.sample(words, rnd.randint(0, 6))
+        rnd.shuffle(parts)
+        out.append(rnd.choice([" ", " | ", " - ", ", ", ""]).join(parts))
+    return out
+
+
+def test_identical_to_legacy():
+    for title in _corpus():
+        assert sanitize_title(title) == legacy_sanitize_title(title), title
+
+
+def test_edge_cases():
+    for title in ["", None, "script", "Blox Fruits", "auto silent aim fly", "[ ] - -"]:
+        assert sanitize_title(title) == legacy_sanitize_title(title)
+
+
+def test_dotted_capital_i():
+    # 'İ' casefoldea a 'i' + punto combinante, pero el regex la matchea como 'i'
+    assert sanitize_title("Blox Fruits SCRİPT hub") == "Blox Fruits hub"
+    assert "Aİmbot" not in sanitize_title("Arsenal Aİmbot")
+    assert sanitize_title("Arsenal Aİmbot") == legacy_sanitize_title("Arsenal Aİmbot")
+
+
+def test_batch_api():
+    titles = _corpus(50, seed=1)
+    assert sanitize_titles(titles) == [legacy_sanitize_title(t) for t in titles]
+    assert sanitize_titles(iter(titles[:3])) == sanitize_titles(titles[:3])
@@ -0,0 +1,197 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import archive
+import dedup
+import main
+import scriptpastebin_source
+import upload_queue
+from sources import Source, new_record
+from state_store import StateStore
+
+
+@pytest.fixture
+def state(monkeypatch, tmp_path):
+    monkeypatch.setattr(dedup, "_index", dedup.DedupIndex(str(tmp_path / "dedup.db")))
+    monkeypatch.setattr(archive, "_archive", archive.ScriptArchive(str(tmp_path / "archive")))
+    monkeypatch.setattr(main, "ensure_category_exists", lambda name, pid: (name, "ready"))
+    monkeypatch.setattr(main, "batch_size", lambda: 1)
+    monkeypatch.setattr(upload_queue, "_queue", upload_queue.UploadQueue(str(tmp_path / "q.db")))
+    store = StateStore(str(tmp_path / "state.db"))
+    yield store
+    store.close()
+    dedup._index.close()
+    upload_queue._queue.close()
+    archive._archive.close()
+
+
+class _SlowSource(Source):
+    def __init__(self, name, code):
+        super().__init__()
+        self.name = name
+        self.code = code
+        self.results = []
+
+    def records(self, state):
+        time.sleep(0.3)
+        yield new_record(self.name, "1", f"{self.name} script", game="Blox Fruits", place_id=1,
+                         code=self.code)
+
+    def on_result(self, state, record, outcome):
+        self.results.append(outcome)
+
+
+def test_sources_run_in_parallel_on_shared_pipeline(monkeypatch, state):
+    uploaded = []
+    monkeypatch.setattr(main, "upload_many", lambda items, workers: [uploaded.append(i) or {"ok": True} for i in items])
+    shared = "print('mismo script en dos sitios')\n" * 3
+    a, b, c = _SlowSource("a", shared), _SlowSource("b", shared), _SlowSource("c", "print('otro')" * 5)
+
+    t0 = time.monotonic()
+    stats = main.run_sources([a, b, c], state)
+    assert time.monotonic() - t0 < 0.6  # ~la fuente más lenta, no la suma
+
+    # El dedup es compartido: el código repetido se sube una sola vez
+    assert sorted(a.results + b.results) == ["duplicate", "queued"]
+    assert c.results == ["queued"]
+    assert len(uploaded) == 2
+    assert sum(st["uploaded"] for st in stats.values()) == 2
+
+    # Mismo contenido en dos fuentes: un solo objeto en el archivo, dos entradas
+    entries = archive.get_archive().by_hash(archive.content_hash(shared))
+    assert sorted(e["source"] for e in entries) == ["a", "b"]
+    assert archive.get_archive().stats()["objects"] == 2
+
+
+def test_failing_source_does_not_stop_others(monkeypatch, state):
+    class Broken(Source):
+        name = "broken"
+
+        def records(self, state):
+            raise RuntimeError("sitio caído")
+
+    monkeypatch.setattr(main, "upload_many", lambda items, workers: [{"ok": True} for _ in items])
+    stats = main.run_sources([Broken(), _SlowSource("ok", "print('hola mundo')")], state)
+    assert stats["broken"] == {"error": "sitio caído"}
+    assert stats["ok"]["uploaded"] == 1
+
+
+def test_records_are_processed_while_the_source_keeps_yielding(monkeypatch, state):
+    prepared = threading.Event()
+    real_prepare = main._safe_prepare
+
+    def prepare(source, record):
+        try:
+            return real_prepare(source, record)
+        finally:
+            prepared.set()
+
+    class Paged(Source):
+        name = "paged"
+
+        def records(self, state):
+            yield new_record(self.name, "1", "p1", game="Blox Fruits", place_id=1, code="print(1)")
+            # La "página siguiente": el primer record ya tiene que estar en proceso
+            self.overlapped = prepared.wait(2)
+            yield new_record(self.name, "2", "p2", game="Blox Fruits", place_id=1, code="print(2)")
+
+    monkeypatch.setattr(main, "_safe_prepare", prepare)
+    monkeypatch.setattr(main, "upload_many", lambda items, workers: [{"ok": True} for _ in items])
+    src = Paged()
+    stats = main.run_sources([src], state)
+    assert src.overlapped
+    assert stats["paged"]["uploaded"] == 2
+
+
+def test_duplicates_are_not_sent_to_the_ai(monkeypatch, state):
+    asked = []
+    monkeypatch.setattr(main, "resolve_games_batch", lambda titles: asked.extend(titles) or 0)
+    monkeypatch.setattr(main, "detect_game", lambda title: ("Doors", 2))
+    monkeypatch.setattr(main, "upload_many", lambda items, workers: [{"ok": True} for _ in items])
+    code = "print('ya subido antes')\n" * 3
+    dedup.get_index().add(code, "old", "0", "viejo")
+
+    class Unknown(Source):
+        name = "unknown"
+
+        def records(self, state):
+            yield new_record(self.name, "1", "repetido", code=code)
+            yield new_record(self.name, "2", "nuevo", code="print('nuevo')" * 5)
+
+    stats = main.run_sources([Unknown()], state)
+    assert asked == ["nuevo"]
+    assert stats["unknown"]["uploaded"] == 1
+
+
+def test_scriptpastebin_only_crawls_new_links(monkeypatch, state):
+    home = "<article>" + "".join(f'<h3><a href="/p{i}">p{i}</a></h3>' for i in range(4)) + "</article>"
+    crawled = []
+
+    def fake_crawl(links, workers):
+        crawled.extend(links)
+        return links[:3], [(link, f"title {link}", "print(1)") for link in links]
+
+    monkeypatch.setattr(scriptpastebin_source, "get_html", lambda url: home)
+    monkeypatch.setattr(scriptpastebin_source, "crawl", fake_crawl)
+
+    src = scriptpastebin_source.ScriptpastebinSource()
+    records = list(src.records(state))
+    assert [r["id"] for r in records] == ["/p0", "/p1", "/p2", "/p3"]
+    assert records[0]["game"] is None and records[0]["code"] == "print(1)"
+    for r, outcome in zip(records, ["queued", "error", "no_game", "queued"]):
+        src.on_result(state, r, outcome)
+    src.finish(state)
+
+    # /p1: error en el pipeline; /p3: la página no se pudo bajar
+    crawled.clear()
+    src = scriptpastebin_source.ScriptpastebinSource()
+    assert [r["id"] for r in src.records(state)] == ["/p1", "/p3"]
+    assert crawled == ["/p1", "/p3"]
+    assert src.skipped == {"seen": 2}
+
+
+def test_scriptpastebin_error_pages_are_not_marked_seen(monkeypatch, state):
+    detail = (
+        '<html><body><div class="entry-content"><h2>Leaf Hub</h2><div class="wp-block-buttons">'
+        '<div class="wp-block-button"><a class="wp-block-button__link" '
+        'href="https://scriptpastebins.com/leaf/">Get Script</a></div></div></div></body></html>'
+    )
+    home = '<article><h3><a href="/p0">p0</a></h3><h3><a href="/p1">p1</a></h3></article>'
+    pages = {
+        scriptpastebin_source.BASE_URL: (200, home),
+        "/p0": (503, "<html>Service Unavailable</html>"),
+        "/p1": (200, detail),
+        "https://scriptpastebins.com/leaf/": (403, "<html>Just a moment...</html>"),
+    }
+
+    def fake_get(url, kind, headers):
+        status, text = pages[url]
+        return SimpleNamespace(status_code=status, text=text)
+
+    monkeypatch.setattr(scriptpastebin_source.http_client, "get", fake_get)
+    src = scriptpastebin_source.ScriptpastebinSource(workers=1)
+    assert list(src.records(state)) == []
+    src.finish(state)
+    assert not state.is_seen("scriptpastebin", "/p0")
+    assert not state.is_seen("scriptpastebin", "/p1")
+
+
+def test_scriptpastebin_failed_tertiary_is_not_fetched(monkeypatch):
+    detail = (
+        '<html><body><div class="entry-content"><h2>Leaf Hub</h2><div class="wp-block-buttons">'
+        '<div class="wp-block-button"><a class="wp-block-button__link" '
+        'href="https://scriptpastebins.com/leaf/">Get Script</a></div></div></div></body></html>'
+    )
+    fetched_urls = []
+
+    def get_html(url):
+        fetched_urls.append(url)
+        return detail if url == "/p0" else None  # la tertiary está caída
+
+    monkeypatch.setattr(scriptpastebin_source, "get_html", get_html)
+    fetched, scraped = scriptpastebin_source.crawl(["/p0"], workers=1)
+    assert fetched_urls == ["/p0", "https://scriptpastebins.com/leaf/"]
+    assert fetched == [] and scraped == []
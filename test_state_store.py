@@ -0,0 +1,83 @@
+import json
+import shutil
+
+from state_store import StateStore
+
+
+def _store(tmp_path):
+    snapshot = tmp_path / "last_run.json"
+    shutil.copy("last_run.json", snapshot)
+    return StateStore(str(tmp_path / "state.db")), str(snapshot)
+
+
+def test_migration_from_json(tmp_path):
+    store, snapshot = _store(tmp_path)
+    with open(snapshot, encoding="utf-8") as f:
+        original = json.load(f)
+
+    assert store.import_json(snapshot)
+    assert not store.import_json(snapshot)  # sin cambios: no re-importa
+    assert store.get("last_successful_run") == original["last_successful_run"]
+    assert store.categories() == original["known_categories"]
+    assert store.seen_ids("rscripts") == set(original["rscripts_uploaded_ids"])
+
+
+def test_incremental_writes_survive_reopen(tmp_path):
+    store, snapshot = _store(tmp_path)
+    store.import_json(snapshot)
+    store.mark_seen("rscripts", "new-id")
+    store.add_category("Grow a garden", 126884695634066)
+    # simula un crash: no hay export ni close ordenado
+    reopened = StateStore(str(tmp_path / "state.db"))
+    assert reopened.is_seen("rscripts", "new-id")
+    assert reopened.categories()["Grow a garden"] == 126884695634066
+
+
+def test_export_is_compact_and_roundtrips(tmp_path):
+    store, snapshot = _store(tmp_path)
+    store.import_json(snapshot)
+    store.mark_seen("rscripts", "zzz")
+    store.set("last_successful_run", "2099-01-01")
+    store.set("rscripts_watermark", ["2099-01-01T22:30:00.000Z", "abc"])
+    run_id = store.start_run()
+    store.finish_run(run_id, "success", {"rscripts": {"uploaded": 1}})
+
+    out = tmp_path / "out.json"
+    store.export_json(str(out))
+    text = out.read_text(encoding="utf-8")
+    assert "\n" not in text
+    data = json.loads(text)
+    assert "zzz" in data["rscripts_uploaded_ids"]
+    assert data["last_successful_run"] == "2099-01-01"
+    assert store.runs(1)[0]["stats"] == {"rscripts": {"uploaded": 1}}
+
+    fresh = StateStore(str(tmp_path / "other.db"))
+    assert fresh.import_json(str(out))
+    assert fresh.snapshot() == data
+    assert fresh.get("rscripts_watermark") == ["2099-01-01T22:30:00.000Z", "abc"]
+
+    # Un snapshot viejo no hace retroceder el watermark
+    fresh.set("rscripts_watermark", ["2099-01-02T00:00:00.000Z", ""])
+    fresh.set("snapshot_digest", "")
+    assert fresh.import_json(str(out))
+    assert fresh.get("rscripts_watermark")[0] == "2099-01-02T00:00:00.000Z"
+
+
+def test_committed_db_file_alone_keeps_the_state(tmp_path):
+    # El workflow commitea solo state.db: un run cortado por timeout no llega
+    # a export_json() ni a close(), y aun así no se pierde nada
+    store, snapshot = _store(tmp_path)
+    store.import_json(snapshot)
+    store.mark_seen("rscripts", "new-id")
+    store.set("rscripts_watermark", ["2099-01-01", "new-id"])
+    run_id = store.start_run()
+    store.finish_run(run_id, "timeout", {"uploaded": 3})
+    copy = tmp_path / "copy.db"
+    copy.write_bytes((tmp_path / "state.db").read_bytes())
+    store.close()
+
+    store = StateStore(str(copy))
+    assert store.is_seen("rscripts", "new-id")
+    assert store.get("rscripts_watermark") == ["2099-01-01", "new-id"]
+    assert store.runs()[0]["stats"] == {"uploaded": 3}
+    store.close()
@@ -0,0 +1,182 @@
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler
+
+import auto_uploader
+import http_client
+import rate_limit
+import upload_client
+
+
+class _UploadStub(BaseHTTPRequestHandler):
+    """
+    Backend falso: guarda scripts por Idempotency-Key; el 1er POST de cada
+    clave "flaky" da 503. Con refs / gzip implementa el protocolo liviano
+    (PUT /refs/<hash>, promptRef / forbiddenWordsRef, bodies gzip).
+    """
+
+    batch = False
+    refs = False
+    gzip = False
+    accepts_gzip = True
+    known_refs = {}
+    stored = {}
+    posts = 0
+    body_bytes = 0
+    lock = threading.Lock()
+
+    def _reply(self, status, obj):
+        out = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def do_GET(self):
+        cls = type(self)
+        caps = {"batch": cls.batch, "maxBatch": 2, "refs": cls.refs, "gzip": cls.gzip}
+        if self.path == "/capabilities" and any((cls.batch, cls.refs, cls.gzip)):
+            return self._reply(200, caps)
+        self._reply(404, {})
+
+    def do_PUT(self):
+        cls = type(self)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        cls.known_refs[self.path.rsplit("/", 1)[1]] = body["value"]
+        self._reply(201, {})
+
+    def _resolve(self, item):
+        """Expande promptRef / forbiddenWordsRef; None si alguna no existe."""
+        for field in ("prompt", "forbiddenWords"):
+            ref = item.pop(f"{field}Ref", None)
+            if ref is not None:
+                if ref not in type(self).known_refs:
+                    return None
+                item[field] = type(self).known_refs[ref]
+        return item
+
+    def do_POST(self):
+        cls = type(self)
+        raw = self.rfile.read(int(self.headers["Content-Length"]))
+        cls.body_bytes += len(raw)
+        if self.headers.get("Content-Encoding") == "gzip":
+            if not cls.accepts_gzip:
+                return self._reply(415, {})
+            raw = gzip.decompress(raw)
+        body = json.loads(raw)
+        items = body["items"] if self.path == "/batch" else [body]
+        if any(self._resolve(item) is None for item in items):
+            return self._reply(422, {"error": "unknown ref"})
+        with cls.lock:
+            cls.posts += 1
+            if self.path == "/batch":
+                results = []
+                for item in body["items"]:
+                    cls.stored.setdefault(item["idempotencyKey"], item)
+                    results.append({"idempotencyKey": item["idempotencyKey"], "ok": True})
+                return self._reply(200, {"results": results})
+            key = self.headers["Idempotency-Key"]
+            assert key == body["idempotencyKey"]
+            first_time = key not in cls.stored
+            cls.stored.setdefault(key, body)
+        if first_time and "flaky" in body["originalTitle"]:
+            return self._reply(503, {})
+        self._reply(201, {"ok": True})
+
+
+def _setup(monkeypatch, stub_server, batch, refs=False, gzip=False, accepts_gzip=True):
+    _UploadStub.batch = batch
+    _UploadStub.refs = refs
+    _UploadStub.gzip = gzip
+    _UploadStub.accepts_gzip = accepts_gzip
+    _UploadStub.known_refs = {}
+    _UploadStub.stored = {}
+    _UploadStub.posts = 0
+    _UploadStub.body_bytes = 0
+    monkeypatch.setattr(auto_uploader, "SCRIPT_API", stub_server(_UploadStub))
+    monkeypatch.setattr(upload_client, "_capabilities", None)
+    monkeypatch.setattr(upload_client, "_registered", set())
+    monkeypatch.setattr(upload_client, "_gzip_rejected", False)
+    monkeypatch.setattr(http_client, "BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(rate_limit, "DEFAULT_RATE", 1000.0)
+
+
+def _items(n):
+    return [
+        {
+            "title": f"Game {i} {'flaky' if i % 2 else ''} script",
+            "categories": ["Blox fruits"],
+            "code": f"print({i})",
+            "key": auto_uploader.idempotency_key("rscripts", f"id{i}"),
+        }
+        for i in range(n)
+    ]
+
+
+def test_idempotency_key_is_deterministic():
+    k = auto_uploader.idempotency_key
+    assert k("rscripts", "abc") == k("rscripts", "abc")
+    assert k("rscripts", "abc") != k("scriptpastebin", "abc")
+    assert k("x", code="print(1) -- a") == k("x", code="print(1)   -- b")
+
+
+def test_concurrent_uploads_with_retries_never_duplicate(monkeypatch, stub_server):
+    _setup(monkeypatch, stub_server, batch=False)
+    items = _items(6)
+    results = upload_client.upload_many(items, workers=3)
+    # Un 5xx no se reintenta en el momento (la subida pudo completarse):
+    # vuelve a la cola y el reintento lleva la misma clave
+    failed = [it for it, r in zip(items, results) if not r["ok"]]
+    retried = upload_client.upload_many(failed + items[:1], workers=3)
+    assert [r["key"] for r in results] == [it["key"] for it in items]
+    assert len(failed) == 3 and all(r["ok"] for r in retried)
+    assert len(_UploadStub.stored) == 6
+    assert _UploadStub.posts == 10
+
+
+def test_batch_mode_when_advertised(monkeypatch, stub_server):
+    _setup(monkeypatch, stub_server, batch=True)
+    results = upload_client.upload_many(_items(5), workers=2)
+    assert all(r["ok"] for r in results)
+    assert len(_UploadStub.stored) == 5
+    assert _UploadStub.posts == 3  # maxBatch=2 -> 3 requests
+
+
+def _full_payloads_stored():
+    for body in _UploadStub.stored.values():
+        assert body["prompt"] == auto_uploader.TITLE_DESCRIPTION_PROMPT
+        assert body["forbiddenWords"] == auto_uploader.FORBIDDEN_WORDS
+    return len(_UploadStub.stored)
+
+
+def test_slim_gzip_payloads_are_much_smaller(monkeypatch, stub_server):
+    _setup(monkeypatch, stub_server, batch=False)
+    upload_client.upload_many(_items(4)[::2], workers=1)
+    full_bytes = _UploadStub.body_bytes
+    _setup(monkeypatch, stub_server, batch=False, refs=True, gzip=True)
+    upload_client.upload_many(_items(4)[::2], workers=2)
+    assert len(_UploadStub.known_refs) == 2  # prompt + palabras, una sola vez
+    assert _full_payloads_stored() == 2
+    assert _UploadStub.body_bytes * 5 < full_bytes
+
+
+def test_unknown_ref_falls_back_to_full_payload(monkeypatch, stub_server):
+    _setup(monkeypatch, stub_server, batch=True, refs=True)
+    assert all(r["ok"] for r in upload_client.upload_many(_items(2)))
+    _UploadStub.known_refs.clear()  # el backend se reinició y perdió las refs
+    results = upload_client.upload_many(_items(4)[2:])
+    # el próximo upload vuelve a registrarlas
+    upload_client.upload_many(_items(6)[4:])
+    assert all(r["ok"] for r in results)
+    assert _full_payloads_stored() == 6
+    assert len(_UploadStub.known_refs) == 2
+
+
+def test_gzip_rejected_falls_back_to_plain_json(monkeypatch, stub_server):
+    _setup(monkeypatch, stub_server, batch=False, gzip=True, accepts_gzip=False)
+    results = upload_client.upload_many(_items(4)[::2], workers=1)
+    assert all(r["ok"] for r in results)
+    assert _full_payloads_stored() == 2
+    assert upload_client._gzip_rejected
@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+import upload_queue
+from upload_queue import UploadQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = UploadQueue(str(tmp_path / "q.db"))
+    yield q
+    q.close()
+
+
+def _enqueue(q, n, source="rscripts"):
+    for i in range(n):
+        q.enqueue(f"k{i}", source, i, f"title {i}", "Blox Fruits", 1, f"print({i})")
+
+
+def test_inflight_jobs_survive_a_crash(tmp_path):
+    path = str(tmp_path / "q.db")
+    q = UploadQueue(path)
+    _enqueue(q, 3)
+    assert not q.enqueue("k0", "rscripts", 0, "otra vez", "Blox Fruits", 1, "print(0)")
+    assert len(q.take(2)) == 2
+    q.ack("k0")
+    q.close()  # "crash" con k1 en vuelo
+
+    q = UploadQueue(path)
+    assert q.counts() == {"pending": 2}
+    assert sorted(j["key"] for j in q.take(5)) == ["k1", "k2"]
+    q.close()
+
+
+def test_committed_db_file_alone_keeps_the_jobs(tmp_path):
+    # El workflow solo commitea q.db: sin close() ni checkpoint tiene que alcanzar
+    q = UploadQueue(str(tmp_path / "q.db"))
+    _enqueue(q, 5)
+    copy = tmp_path / "copy.db"
+    copy.write_bytes((tmp_path / "q.db").read_bytes())
+    q.close()
+
+    q = UploadQueue(str(copy))
+    assert q.counts() == {"pending": 5}
+    q.close()
+
+
+def test_retry_schedule_and_dead_letter(monkeypatch, queue):
+    monkeypatch.setattr(upload_queue, "UPLOAD_MAX_ATTEMPTS", 3)
+    assert [upload_queue.retry_delay(n) for n in (1, 2, 3)] == [60, 240, 960]
+    _enqueue(queue, 1)
+
+    queue.take()
+    assert queue.fail("k0", "500") == "pending"
+    assert queue.take() == []  # reintento programado a futuro
+
+    monkeypatch.setattr(upload_queue, "UPLOAD_RETRY_BASE", 0)
+    queue.fail("k0", "500")  # el siguiente vence ya
+    job = queue.take()[0]
+    assert job["attempts"] == 2
+    assert queue.fail(job["key"], "500") == "dead"
+    assert queue.dead()[0]["attempts"] == 3
+    assert queue.requeue_dead() == 1
+    assert queue.take()[0]["attempts"] == 0
+
+
+def test_drain_with_worker_pool(monkeypatch, queue):
+    monkeypatch.setattr(upload_queue, "UPLOAD_MAX_ATTEMPTS", 1)
+    _enqueue(queue, 20)
+    threads, dead = set(), []
+
+    def deliver(jobs):
+        threads.add(threading.current_thread().name)
+        return [(job["key"] != "k7", "boom") for job in jobs]
+
+    counts = queue.drain(deliver, workers=4, batch=2, on_dead=dead.append)
+    assert counts == {"rscripts": {"uploaded": 19, "retrying": 0, "dead": 1}}
+    assert [j["key"] for j in dead] == ["k7"]
+    assert len(threads) > 1
+    assert queue.counts() == {"dead": 1}
+
+
+def test_drain_waits_for_jobs_until_scraping_ends(queue):
+    done = threading.Event()
+    delivered = []
+    drainer = threading.Thread(
+        target=lambda: delivered.append(
+            queue.drain(lambda jobs: [(True, None)] * len(jobs), until=done, poll=0.01)
+        )
+    )
+    drainer.start()
+    _enqueue(queue, 3, source="scriptpastebin")
+    done.set()
+    drainer.join(5)
+    assert delivered == [{"scriptpastebin": {"uploaded": 3, "retrying": 0, "dead": 0}}]
+    assert queue.counts() == {}
@@ -0,0 +1,239 @@
+"""
+Subida concurrente de scripts a SCRIPT_API.
+
+upload_many() recibe una lista de items
+    {"title", "categories", "code", "key"}
+y devuelve, en el mismo orden, un resultado por item
+    {"key", "ok", "status", "error"}.
+
+- Concurrencia acotada (UPLOAD_WORKERS requests simultáneos).
+- Cada item lleva su clave de idempotencia (auto_uploader.idempotency_key),
+  así un reintento de la cola o un re-run nunca duplica el script (si el
+  backend la respeta; http_client no repite un POST que pudo haber llegado).
+- Si el backend anuncia soporte batch en GET {SCRIPT_API}/capabilities
+  ({"batch": true, "maxBatch": N}), los items se mandan en grupos de N a
+  POST {SCRIPT_API}/batch. Si no, un POST por item como siempre.
+
+Payloads livianos (UPLOAD_SLIM=1, default): el prompt y la lista de palabras
+prohibidas son iguales en cada subida, así que si el backend anuncia
+{"refs": true} se registran una vez con PUT {SCRIPT_API}/refs/<hash> y los
+uploads mandan solo promptRef / forbiddenWordsRef. Con {"gzip": true} el
+body va comprimido (Content-Encoding: gzip). Si el backend no conoce una
+referencia (409 / 422) se reenvía el payload completo y las referencias se
+vuelven a registrar; ante 415 se deja de comprimir. Sin esas capabilities
+todo queda como antes: JSON completo sin comprimir.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import auto_uploader
+import http_client
+import metrics
+
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+UPLOAD_SLIM = os.getenv("UPLOAD_SLIM", "1") != "0"
+
+# Campos del payload que se mandan por referencia: campo -> valor compartido
+_REF_FIELDS = ("prompt", "forbiddenWords")
+_registered = set()
+_refs_lock = threading.Lock()
+_gzip_rejected = False
+
+_capabilities = None
+_capabilities_lock = threading.Lock()
+
+
+def get_capabilities() -> dict:
+    """Consulta (una vez por proceso) si el backend acepta uploads batch."""
+    global _capabilities
+    with _capabilities_lock:
+        if _capabilities is None:
+            caps = {}
+            try:
+                resp = http_client.get(
+                    f"{auto_uploader.SCRIPT_API}/capabilities", kind="upload", retries=0
+                )
+                if resp.status_code == 200:
+                    caps = resp.json() or {}
+            except Exception:
+                pass
+            _capabilities = caps if isinstance(caps, dict) else {}
+        return _capabilities
+
+
+def batch_size() -> int:
+    """Items por request: maxBatch si el backend acepta batch, si no 1."""
+    caps = get_capabilities()
+    return max(1, int(caps.get("maxBatch") or 20)) if caps.get("batch") else 1
+
+
+# ───── payloads livianos ─────
+
+
+def ref_hash(value) -> str:
+    """Versión (hash de contenido) de un valor compartido entre uploads."""
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def _shared_values() -> dict:
+    return {
+        "prompt": auto_uploader.TITLE_DESCRIPTION_PROMPT,
+        "forbiddenWords": auto_uploader.FORBIDDEN_WORDS,
+    }
+
+
+def shared_refs() -> dict | None:
+    """
+    {campo: hash} con el prompt y las palabras prohibidas ya registrados en
+    el backend, o None si no se usan referencias (sin soporte o falló el
+    registro: se manda el payload completo).
+    """
+    if not UPLOAD_SLIM or not get_capabilities().get("refs"):
+        return None
+    refs = {}
+    with _refs_lock:
+        for field, value in _shared_values().items():
+            digest = ref_hash(value)
+            if digest not in _registered:
+                try:
+                    resp = http_client.request(
+                        "PUT", f"{auto_uploader.SCRIPT_API}/refs/{digest}", kind="upload",
+                        json={"field": field, "value": value},
+                    )
+                except Exception as e:
+                    print(f"  [API] No se pudo registrar {field}: {e}")
+                    return None
+                if resp.status_code not in (200, 201, 204):
+                    print(f"  [API] No se pudo registrar {field}: {resp.status_code}")
+                    return None
+                _registered.add(digest)
+            refs[field] = digest
+    return refs
+
+
+def _slim(payload: dict, refs: dict) -> dict:
+    if "items" in payload:
+        return {**payload, "items": [_slim(it, refs) for it in payload["items"]]}
+    slim = {k: v for k, v in payload.items() if k not in refs}
+    slim.update({f"{field}Ref": digest for field, digest in refs.items()})
+    return slim
+
+
+def _body(payload: dict, compress: bool) -> dict:
+    """kwargs de http_client.post para el payload (gzip o JSON plano)."""
+    if not compress:
+        return {"json": payload}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return {"data": gzip.compress(raw, mtime=0), "headers": {"Content-Encoding": "gzip"}}
+
+
+def post_payload(url: str, payload: dict, headers: dict | None = None):
+    """
+    POST de un payload de subida en el formato más liviano que acepte el
+    backend, con fallback al payload completo sin comprimir.
+    """
+    global _gzip_rejected
+    refs = shared_refs()
+    compress = UPLOAD_SLIM and bool(get_capabilities().get("gzip")) and not _gzip_rejected
+
+    def send(use_refs, gz):
+        kwargs = _body(_slim(payload, refs) if use_refs else payload, gz)
+        kwargs["headers"] = {
+            **(headers or {}), **kwargs.get("headers", {}), "Content-Type": "application/json"
+        }
+        size = len(kwargs["data"]) if gz else len(json.dumps(kwargs["json"]))
+        metrics.incr("upload_body_bytes", size)
+        return http_client.post(url, kind="upload", **kwargs)
+
+    resp = send(bool(refs), compress)
+    if resp.status_code == 415 and compress:
+        print("  [API] El backend no acepta gzip: se mandan bodies sin comprimir.")
+        _gzip_rejected = True
+        compress = False
+        resp = send(bool(refs), False)
+    if resp.status_code in (409, 422) and refs:
+        # El backend perdió (o nunca tuvo) las referencias: payload completo
+        print(f"  [API] Referencia desconocida ({resp.status_code}): reenviando payload completo.")
+        with _refs_lock:
+            _registered.difference_update(refs.values())
+        resp = send(False, compress)
+    return resp
+
+
+def _upload_one(item: dict) -> dict:
+    title, key = item["title"], item["key"]
+    try:
+        payload = auto_uploader.build_script_payload(title, item["categories"], item["code"], key)
+        if payload["baseTitle"] != title:
+            print(f"  [SANITIZE] '{title}' -> '{payload['baseTitle']}'")
+        resp = post_payload(auto_uploader.SCRIPT_API, payload, {"Idempotency-Key": key})
+        if resp.status_code in (200, 201):
+            print(f"  [API] Script '{payload['baseTitle']}' subido correctamente.")
+            return {"key": key, "ok": True, "status": resp.status_code, "error": None}
+        err = f"{resp.status_code} - {resp.text[:200]}"
+        print(f"  [API] Error subiendo script: {err}")
+        return {"key": key, "ok": False, "status": resp.status_code, "error": err}
+    except Exception as e:
+        print(f"  [API] Excepcion subiendo script: {e}")
+        return {"key": key, "ok": False, "status": None, "error": str(e)}
+
+
+def _upload_batch(items: list) -> list:
+    payload = {
+        "items": [
+            auto_uploader.build_script_payload(
+                it["title"], it["categories"], it["code"], it["key"]
+            )
+            for it in items
+        ]
+    }
+    try:
+        resp = post_payload(f"{auto_uploader.SCRIPT_API}/batch", payload)
+        if resp.status_code not in (200, 201, 207):
+            err = f"{resp.status_code} - {resp.text[:200]}"
+            print(f"  [API] Error en batch upload: {err}")
+            return [
+                {"key": it["key"], "ok": False, "status": resp.status_code, "error": err}
+                for it in items
+            ]
+        by_key = {r.get("idempotencyKey"): r for r in resp.json().get("results") or []}
+    except Exception as e:
+        print(f"  [API] Excepcion en batch upload: {e}")
+        return [{"key": it["key"], "ok": False, "status": None, "error": str(e)} for it in items]
+
+    results = []
+    for it in items:
+        r = by_key.get(it["key"])
+        if r is None:
+            results.append({"key": it["key"], "ok": False, "status": None, "error": "sin resultado"})
+        else:
+            results.append(
+                {"key": it["key"], "ok": bool(r.get("ok")), "status": r.get("status"),
+                 "error": r.get("error")}
+            )
+    ok = sum(1 for r in results if r["ok"])
+    print(f"  [API] Batch: {ok}/{len(items)} scripts subidos.")
+    return results
+
+
+def upload_many(items: list, workers: int | None = None) -> list:
+    """Sube todos los items y retorna un resultado por item (mismo orden)."""
+    if not items:
+        return []
+    workers = UPLOAD_WORKERS if workers is None else workers
+    caps = get_capabilities()
+
+    if caps.get("batch"):
+        size = batch_size()
+        chunks = [items[i : i + size] for i in range(0, len(items), size)]
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            return [r for chunk in pool.map(_upload_batch, chunks) for r in chunk]
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(_upload_one, items))
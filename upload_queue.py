@@ -0,0 +1,236 @@
+"""
+Cola persistente de subidas (SQLite).
+
+El pipeline ya no sube directo: cada script listo (código + juego) se
+encola con su clave de idempotencia y un pool de workers drena la cola en
+paralelo con el scraping (UPLOAD_WORKERS; el scraping usa PIPELINE_WORKERS).
+Los jobs cuyo juego todavía no tiene categoría esperan ("waiting") a que
+main cree juntas las categorías nuevas al final del run. Si la subida o la
+categoría fallan, el job vuelve a la cola con backoff exponencial
+(UPLOAD_RETRY_BASE segundos, x4 por intento, tope UPLOAD_RETRY_MAX) y tras
+UPLOAD_MAX_ATTEMPTS intentos pasa a "dead" (dead-letter) para revisarlo a
+mano:
+
+    python upload_queue.py               # resumen + últimos dead
+    python upload_queue.py --requeue     # devuelve los dead a la cola
+
+Cada enqueue / ack / fallo es su propia transacción y queda escrita en
+upload_queue.db (sin WAL aparte): un crash o el timeout del workflow no
+pierden nada. Los jobs que quedaron "inflight" vuelven a "pending" al
+abrir la cola; re-subirlos es seguro por la clave de idempotencia. Los
+jobs subidos se borran; la base solo guarda lo pendiente y lo muerto, así
+que los workflows la commitean junto a dedup.db.
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+UPLOAD_QUEUE_DB = os.getenv("UPLOAD_QUEUE_DB", "upload_queue.db")
+UPLOAD_MAX_ATTEMPTS = int(os.getenv("UPLOAD_MAX_ATTEMPTS", "5"))
+UPLOAD_RETRY_BASE = float(os.getenv("UPLOAD_RETRY_BASE", "60"))
+UPLOAD_RETRY_MAX = float(os.getenv("UPLOAD_RETRY_MAX", str(6 * 3600)))
+
+_FIELDS = ("key", "source", "item_id", "title", "game", "place_id", "code", "attempts", "last_error")
+
+
+def retry_delay(attempts: int) -> float:
+    """Segundos hasta el próximo intento después de `attempts` fallos."""
+    return min(UPLOAD_RETRY_MAX, UPLOAD_RETRY_BASE * 4 ** (attempts - 1))
+
+
+class UploadQueue:
+    def __init__(self, path: str = UPLOAD_QUEUE_DB):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # Journal clásico, no WAL: lo commiteado queda en el .db mismo, que es
+        # lo único que los workflows commitean (un -wal se perdería con el
+        # runner si el job muere por timeout)
+        self._db.execute("PRAGMA journal_mode=DELETE")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                key TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                item_id TEXT,
+                title TEXT,
+                game TEXT,
+                place_id INTEGER,
+                code TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_at REAL NOT NULL DEFAULT 0,
+                last_error TEXT,
+                created REAL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, next_at);
+            """
+        )
+        # Lo que estaba en vuelo (o esperando su categoría) cuando murió el
+        # proceso anterior se reintenta
+        recovered = self._db.execute(
+            "UPDATE jobs SET status = 'pending' WHERE status IN ('inflight', 'waiting')"
+        ).rowcount
+        self._db.commit()
+        if recovered:
+            print(f"[QUEUE] {recovered} subidas interrumpidas vuelven a la cola.")
+
+    def enqueue(self, key, source, item_id, title, game, place_id, code) -> bool:
+        """Encola un job; False si la clave ya estaba en la cola."""
+        with self._lock, self._db:
+            cur = self._db.execute(
+                "INSERT OR IGNORE INTO jobs (key, source, item_id, title, game, place_id, code, "
+                "created) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, source, str(item_id), title, game, place_id, code, time.time()),
+            )
+            return cur.rowcount > 0
+
+    def take(self, limit: int = 1) -> list:
+        """Marca como inflight y retorna hasta `limit` jobs vencidos."""
+        with self._lock, self._db:
+            rows = self._db.execute(
+                f"SELECT {', '.join(_FIELDS)} FROM jobs WHERE status = 'pending' AND next_at <= ? "
+                "ORDER BY next_at, created LIMIT ?",
+                (time.time(), limit),
+            ).fetchall()
+            self._db.executemany(
+                "UPDATE jobs SET status = 'inflight' WHERE key = ?", [(r[0],) for r in rows]
+            )
+        return [dict(zip(_FIELDS, r)) for r in rows]
+
+    def ack(self, key: str):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM jobs WHERE key = ?", (key,))
+
+    def fail(self, key: str, error: str) -> str:
+        """Registra un intento fallido; retorna el nuevo estado ('pending' o 'dead')."""
+        with self._lock, self._db:
+            row = self._db.execute("SELECT attempts FROM jobs WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return "dead"
+            attempts = row[0] + 1
+            status = "dead" if attempts >= UPLOAD_MAX_ATTEMPTS else "pending"
+            self._db.execute(
+                "UPDATE jobs SET status = ?, attempts = ?, next_at = ?, last_error = ? WHERE key = ?",
+                (status, attempts, time.time() + retry_delay(attempts), error, key),
+            )
+        return status
+
+    def defer(self, key: str):
+        """Deja el job esperando (sin contar intento) hasta release_waiting()."""
+        with self._lock, self._db:
+            self._db.execute("UPDATE jobs SET status = 'waiting' WHERE key = ?", (key,))
+
+    def release_waiting(self) -> int:
+        with self._lock, self._db:
+            return self._db.execute(
+                "UPDATE jobs SET status = 'pending' WHERE status = 'waiting'"
+            ).rowcount
+
+    def counts(self) -> dict:
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+
+    def dead(self, limit: int = 20) -> list:
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(_FIELDS)} FROM jobs WHERE status = 'dead' "
+                "ORDER BY next_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [dict(zip(_FIELDS, r)) for r in rows]
+
+    def requeue_dead(self) -> int:
+        with self._lock, self._db:
+            return self._db.execute(
+                "UPDATE jobs SET status = 'pending', attempts = 0, next_at = 0 WHERE status = 'dead'"
+            ).rowcount
+
+    def drain(self, deliver, workers: int = 1, batch: int = 1, until=None, on_dead=None,
+              poll: float = 0.2) -> dict:
+        """
+        Drena la cola con `workers` threads. deliver(jobs) recibe hasta
+        `batch` jobs y retorna un (ok, error) por job; ok=None difiere el job
+        (defer) sin contarlo como intento. Si se pasa `until`
+        (threading.Event) los workers esperan jobs nuevos hasta que se
+        setee; si no, terminan cuando no queda nada vencido. Los jobs con
+        reintento programado a futuro quedan para la próxima corrida.
+
+        Retorna {source: {"uploaded", "retrying", "dead"}}.
+        """
+        counts = {}
+        counts_lock = threading.Lock()
+
+        def worker():
+            while True:
+                finished = until is None or until.is_set()
+                jobs = self.take(batch)
+                if not jobs:
+                    if finished:
+                        return
+                    until.wait(poll)
+                    continue
+                try:
+                    results = deliver(jobs)
+                except Exception as e:
+                    results = [(False, str(e))] * len(jobs)
+                for job, (ok, error) in zip(jobs, results):
+                    if ok is None:
+                        self.defer(job["key"])
+                        continue
+                    if ok:
+                        self.ack(job["key"])
+                        outcome = "uploaded"
+                    elif self.fail(job["key"], error or "error") == "dead":
+                        outcome = "dead"
+                        print(f"  [QUEUE DEAD] '{job['title'][:60]}' tras {job['attempts'] + 1} "
+                              f"intentos: {error}")
+                        if on_dead:
+                            on_dead(job)
+                    else:
+                        outcome = "retrying"
+                    with counts_lock:
+                        by_outcome = counts.setdefault(
+                            job["source"], {"uploaded": 0, "retrying": 0, "dead": 0}
+                        )
+                        by_outcome[outcome] += 1
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, workers))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> UploadQueue:
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = UploadQueue()
+    return _queue
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estado de la cola de subidas")
+    parser.add_argument("--requeue", action="store_true", help="devolver los dead a la cola")
+    args = parser.parse_args()
+    queue = get_queue()
+    if args.requeue:
+        print(f"[QUEUE] {queue.requeue_dead()} jobs devueltos a la cola.")
+    print(f"[QUEUE] {queue.counts() or 'vacía'}")
+    for job in queue.dead():
+        print(f"  [DEAD] {job['source']}/{job['item_id']} '{job['title'][:60]}' "
+              f"({job['attempts']} intentos): {job['last_error']}")
+    queue.close()